@@ -0,0 +1,5 @@
+"""Benchmarks for the hot paths of rank-predictor.
+
+Run with `python -m benchmarks`. No real game records are needed, since
+all inputs are generated synthetically.
+"""
@@ -0,0 +1,414 @@
+"""Runs the benchmarks and saves the results as JSON.
+
+Examples:
+    $ python -m benchmarks -o results.json
+    $ python -m benchmarks -o new.json --compare results.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import tempfile
+import time
+import warnings
+from collections.abc import Callable
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import polars as pl
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, log_loss
+
+from rank_predictor.convert import convert
+from rank_predictor.generate import (
+    generate_annotated_data,
+    generate_game_records,
+)
+from rank_predictor.predict import (
+    GameState,
+    Predictor,
+    calculate_expected_rank,
+    calculate_player_rank_proba,
+    create_feature,
+    predict_proba,
+)
+from rank_predictor.split import split
+from rank_predictor.train import train
+from rank_predictor.types import DataName, GameLength, NumPlayer, Round
+from rank_predictor.validate import validate_annotated_data
+
+NUM_PLAYER = NumPlayer.FOUR
+GAME_LENGTH = GameLength.HANCHAN
+# A Hanchan game has at least 8 rounds unless a player goes bust, and
+# about 10 on average.
+ROWS_PER_GAME_LOWER_BOUND = 5
+
+Result = dict[str, Any]
+
+
+def _best_time(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def create_annotated_data(num_rows: int) -> pl.DataFrame:
+    """Creates synthetic annotated data with `num_rows` rows."""
+    with tempfile.TemporaryDirectory() as tmp:
+        annotated_data = Path(tmp) / "annotated-data.parquet"
+        generate_annotated_data(
+            NUM_PLAYER,
+            GAME_LENGTH,
+            annotated_data,
+            math.ceil(num_rows / ROWS_PER_GAME_LOWER_BOUND),
+            output_final_score=False,
+            output_filename=False,
+        )
+        return pl.read_parquet(annotated_data).head(num_rows)
+
+
+def _create_classifier() -> LogisticRegression:
+    # Same as `examples/config.example.toml`.
+    return LogisticRegression(random_state=0, max_iter=100)
+
+
+def bench_convert(num_file: int, repeat: int) -> Result:
+    """Measures `convert` over synthetic mjlog files."""
+    with tempfile.TemporaryDirectory() as tmp:
+        game_record_dir = Path(tmp) / "game_record"
+        annotated_data = Path(tmp) / "annotated-data.csv"
+        generate_game_records(
+            NUM_PLAYER,
+            GAME_LENGTH,
+            game_record_dir,
+            "xml",
+            num_file,
+        )
+
+        seconds = _best_time(
+            lambda: convert(
+                NUM_PLAYER,
+                GAME_LENGTH,
+                game_record_dir,
+                "xml",
+                annotated_data,
+                output_final_score=False,
+                output_filename=False,
+            ),
+            repeat,
+        )
+        with annotated_data.open() as f:
+            num_rows = sum(1 for _ in f) - 1
+
+    return {
+        "benchmark": "convert",
+        "size": num_file,
+        "seconds": seconds,
+        "files_per_second": num_file / seconds,
+        "rows_per_second": num_rows / seconds,
+    }
+
+
+def bench_validate(num_rows: int, repeat: int) -> Result:
+    """Measures `validate_annotated_data` over synthetic data."""
+    data = create_annotated_data(num_rows)
+    seconds = _best_time(
+        lambda: validate_annotated_data(NUM_PLAYER, GAME_LENGTH, data),
+        repeat,
+    )
+    return {
+        "benchmark": "validate_annotated_data",
+        "size": num_rows,
+        "seconds": seconds,
+        "rows_per_second": num_rows / seconds,
+    }
+
+
+def bench_split(num_rows: int, repeat: int) -> Result:
+    """Measures `split` over a synthetic CSV file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_data_path = Path(tmp) / "annotated-data.csv"
+        create_annotated_data(num_rows).write_csv(
+            input_data_path,
+        )
+        seconds = _best_time(
+            lambda: split(
+                input_data_path,
+                Path(tmp) / "training-data.csv",
+                Path(tmp) / "test-data.csv",
+                random_state=0,
+            ),
+            repeat,
+        )
+    return {
+        "benchmark": "split",
+        "size": num_rows,
+        "seconds": seconds,
+        "rows_per_second": num_rows / seconds,
+    }
+
+
+def bench_train(num_rows: int, repeat: int) -> Result:
+    """Measures `train` with the example hyper-parameters."""
+    data = create_annotated_data(num_rows)
+    seconds = _best_time(
+        lambda: train(NUM_PLAYER, GAME_LENGTH, data, _create_classifier()),
+        repeat,
+    )
+    return {
+        "benchmark": "train",
+        "size": num_rows,
+        "fit_seconds": seconds,
+        "rows_per_second": num_rows / seconds,
+    }
+
+
+def bench_predict(num_rows: int, num_sample: int) -> list[Result]:
+    """Measures single-prediction latency and batch throughput."""
+    data = create_annotated_data(num_rows)
+    model = train(NUM_PLAYER, GAME_LENGTH, data, _create_classifier())
+    score_columns = [f"{DataName.SCORE}_{i}" for i in range(NUM_PLAYER)]
+    states = data.head(num_sample).rows(named=True)
+
+    latencies = []
+    for state in states:
+        start = time.perf_counter()
+        feature = create_feature(
+            Round(state[DataName.ROUND]),
+            state[DataName.NUM_COUNTER_STICK],
+            state[DataName.NUM_RIICHI_DEPOSIT],
+            [state[c] for c in score_columns],
+        )
+        proba = predict_proba(model, feature)
+        player_rank_proba = calculate_player_rank_proba(NUM_PLAYER, proba)
+        calculate_expected_rank(player_rank_proba)
+        latencies.append(time.perf_counter() - start)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+
+    results: list[Result] = [
+        {
+            "benchmark": "predict_single",
+            "size": len(latencies),
+            "p50_seconds": p50,
+            "p90_seconds": p90,
+            "p99_seconds": p99,
+        },
+    ]
+
+    predictor = Predictor(model, NUM_PLAYER, GAME_LENGTH)
+    latencies = []
+    for state in states:
+        start = time.perf_counter()
+        predictor.predict(
+            GameState(
+                Round(state[DataName.ROUND]),
+                state[DataName.NUM_COUNTER_STICK],
+                state[DataName.NUM_RIICHI_DEPOSIT],
+                [state[c] for c in score_columns],
+            ),
+        )
+        latencies.append(time.perf_counter() - start)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    results.append(
+        {
+            "benchmark": "predictor_single",
+            "size": len(latencies),
+            "p50_seconds": p50,
+            "p90_seconds": p90,
+            "p99_seconds": p99,
+        },
+    )
+
+    feature_columns = [
+        DataName.ROUND,
+        DataName.NUM_COUNTER_STICK,
+        DataName.NUM_RIICHI_DEPOSIT,
+        *score_columns,
+    ]
+    for batch_size in sorted(
+        {min(b, num_rows) for b in (100, 10_000, num_rows)},
+    ):
+        feature_matrix = (
+            data.head(batch_size).select(feature_columns).to_numpy()
+        )
+        start = time.perf_counter()
+        proba_matrix = model.classifier.predict_proba(feature_matrix)
+        player_rank_proba = calculate_player_rank_proba(
+            NUM_PLAYER,
+            proba_matrix,
+        )
+        calculate_expected_rank(player_rank_proba)
+        seconds = time.perf_counter() - start
+        results.append(
+            {
+                "benchmark": "predict_batch",
+                "size": len(feature_matrix),
+                "seconds": seconds,
+                "rows_per_second": len(feature_matrix) / seconds,
+            },
+        )
+    return results
+
+
+def bench_precision(num_rows: int) -> list[Result]:
+    """Compares float32 models with float64 ones on held-out data."""
+    data = create_annotated_data(num_rows)
+    num_train = num_rows * 4 // 5
+    training_data, test_data = data.head(num_train), data.tail(-num_train)
+    feature = test_data.select(
+        DataName.ROUND,
+        DataName.NUM_COUNTER_STICK,
+        DataName.NUM_RIICHI_DEPOSIT,
+        *[f"{DataName.SCORE}_{i}" for i in range(NUM_PLAYER)],
+    ).to_numpy()
+    label = test_data.get_column(DataName.RANK_CLASS).to_numpy()
+
+    results: list[Result] = []
+    predictions = {}
+    for dtype in (np.float64, np.float32):
+        classifier = _create_classifier()
+        model = train(
+            NUM_PLAYER,
+            GAME_LENGTH,
+            training_data,
+            classifier,
+            dtype=dtype,
+        )
+        predictor = Predictor(model, NUM_PLAYER, GAME_LENGTH)
+        matrix = feature.astype(dtype)
+        start = time.perf_counter()
+        prediction = predictor.predict_feature(matrix)
+        seconds = time.perf_counter() - start
+        proba = classifier.predict_proba(matrix)
+        predictions[dtype] = prediction
+        results.append(
+            {
+                "benchmark": f"precision_{np.dtype(dtype).name}",
+                "size": len(matrix),
+                "rows_per_second": len(matrix) / seconds,
+                "log_loss": log_loss(
+                    label,
+                    proba,
+                    labels=classifier.classes_,
+                ),
+                "accuracy": accuracy_score(label, proba.argmax(axis=1)),
+            },
+        )
+
+    base, single = predictions[np.float64], predictions[np.float32]
+    rank_proba_delta = single.player_rank_proba - base.player_rank_proba
+    expected_rank_delta = single.expected_rank - base.expected_rank
+    results.append(
+        {
+            "benchmark": "precision_delta",
+            "size": len(feature),
+            "log_loss": results[1]["log_loss"] - results[0]["log_loss"],
+            "accuracy": results[1]["accuracy"] - results[0]["accuracy"],
+            "max_abs_rank_proba": float(np.abs(rank_proba_delta).max()),
+            "max_abs_expected_rank": float(
+                np.abs(expected_rank_delta).max(),
+            ),
+        },
+    )
+    return results
+
+
+def _get_version(package: str) -> str:
+    # The package is not installed when the suite runs from a source
+    # checkout.
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        **{
+            package: _get_version(package)
+            for package in (
+                "rank-predictor",
+                "numpy",
+                "polars",
+                "scikit-learn",
+            )
+        },
+    }
+
+
+def _compare(results: list[Result], baseline: list[Result]) -> None:
+    # Prints the relative change of each throughput or time metric.
+    baseline_map = {(r["benchmark"], r["size"]): r for r in baseline}
+    for result in results:
+        base = baseline_map.get((result["benchmark"], result["size"]))
+        if base is None:
+            continue
+        for key, value in result.items():
+            if key in ("benchmark", "size") or key not in base:
+                continue
+            change = (value - base[key]) / base[key] * 100
+            print(  # noqa: T201
+                f"{result['benchmark']}[{result['size']}] {key}:"
+                f" {base[key]:.6g} -> {value:.6g} ({change:+.1f}%)",
+            )
+
+
+def main() -> None:
+    """Runs the benchmarks."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("-c", "--compare", type=Path)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument(
+        "--files",
+        type=int,
+        nargs="+",
+        default=[100, 1_000],
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--predict-samples", type=int, default=1_000)
+    args = parser.parse_args()
+
+    # Collected first, so that a failure does not waste a long run.
+    environment = _environment()
+
+    # The solver does not converge with the example hyper-parameters.
+    warnings.simplefilter("ignore", ConvergenceWarning)
+
+    results = [bench_convert(num_file, args.repeat) for num_file in args.files]
+    for num_rows in args.rows:
+        results.append(bench_validate(num_rows, args.repeat))
+        results.append(bench_split(num_rows, args.repeat))
+        results.append(bench_train(num_rows, args.repeat))
+    results.extend(bench_predict(max(args.rows), args.predict_samples))
+    results.extend(bench_precision(max(args.rows)))
+
+    with args.output.open("w") as f:
+        json.dump(
+            {"environment": environment, "results": results},
+            f,
+            indent=2,
+        )
+
+    if args.compare is not None:
+        with args.compare.open() as f:
+            _compare(results, json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,18 @@
 # ruff: noqa: D103
 
 import argparse
-from logging import INFO, Formatter, StreamHandler, basicConfig
+from logging import INFO, Formatter, StreamHandler, basicConfig, getLogger
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+from rank_predictor.report import RunReport, run_with_profiling
 from rank_predictor.types import GameLength, NumPlayer, Round
 
+if TYPE_CHECKING:
+    import numpy as np
+
+    from rank_predictor.model import Model
+
 LOG_LEVEL = INFO
 
 stream_handler = StreamHandler()
@@ -18,6 +25,8 @@ stream_handler.setFormatter(formatter)
 
 basicConfig(level=LOG_LEVEL, handlers=[stream_handler])
 
+logger = getLogger(__name__)
+
 
 def convert(args: argparse.Namespace) -> int:
     import rank_predictor.convert
@@ -33,10 +42,63 @@ def convert(args: argparse.Namespace) -> int:
         args.annotated_data,
         output_final_score=args.final_score,
         output_filename=args.filename,
+        report=args.run_report,
+        cache_path=args.cache,
+        fast=args.fast,
+        cross_check=args.cross_check,
+        prefetch_bytes=args.prefetch_bytes,
+        num_prefetch_thread=args.prefetch_threads,
+        seen_path=args.dedup,
+        num_hash_thread=args.hash_threads,
+    )
+    return 0
+
+
+def relabel(args: argparse.Namespace) -> int:
+    import rank_predictor.relabel
+
+    num_player = NumPlayer(args.num_player)
+
+    rank_predictor.relabel.relabel(
+        num_player,
+        args.input_data_path,
+        args.output_data_path,
+        output_final_rank=args.final_rank,
     )
     return 0
 
 
+def generate(args: argparse.Namespace) -> int:
+    import rank_predictor.generate
+
+    num_player = NumPlayer(args.num_player)
+    game_length = GameLength(args.game_length)
+
+    if args.annotated_data:
+        rank_predictor.generate.generate_annotated_data(
+            num_player,
+            game_length,
+            args.output_path,
+            args.num_game,
+            args.seed,
+            args.num_worker,
+            args.game_record_extension,
+            output_final_score=args.final_score,
+            output_filename=args.filename,
+        )
+    else:
+        rank_predictor.generate.generate_game_records(
+            num_player,
+            game_length,
+            args.output_path,
+            args.game_record_extension,
+            args.num_game,
+            args.seed,
+            args.num_worker,
+        )
+    return 0
+
+
 def int_or_float(arg: str) -> int | float:
     try:
         return int(arg)
@@ -60,6 +122,7 @@ def split(args: argparse.Namespace) -> int:
         args.random_state,
         shuffle=(not args.shuffle_false),
         stratify=args.stratify_y,
+        report=args.run_report,
     )
     return 0
 
@@ -69,12 +132,13 @@ def train(args: argparse.Namespace) -> int:
     import tomllib
 
     import polars as pl
-    from sklearn.linear_model import LogisticRegression
 
     import rank_predictor.train
+    from rank_predictor.backend import DEFAULT_BACKEND, create_classifier
 
     num_player = NumPlayer(args.num_player)
     game_length = GameLength(args.game_length)
+    report: RunReport = args.run_report
     training_data_path: Path = args.training_data_path
     config_path: Path = args.config_path
     model_path: Path = args.model_path
@@ -94,98 +158,643 @@ def train(args: argparse.Namespace) -> int:
         raise FileExistsError(msg)
 
     with config_path.open("rb") as fp:
-        hyper_parameter = tomllib.load(fp)["hyper-parameter"]
-    classifier = LogisticRegression(**hyper_parameter)
-    training_data = pl.read_csv(training_data_path)
+        config = tomllib.load(fp)
+    classifier = create_classifier(
+        config.get("backend", DEFAULT_BACKEND),
+        config.get("hyper-parameter"),
+        config.get("partition"),
+    )
+
+    if args.feature_cache is None:
+        with report.time("read"):
+            training_data = pl.read_csv(training_data_path)
+        report.count("bytes_read", training_data_path.stat().st_size)
+
+        model = rank_predictor.train.train(
+            num_player,
+            game_length,
+            training_data,
+            classifier,
+            report,
+            args.dtype,
+        )
+    else:
+        feature, label = rank_predictor.train.load_training_arrays(
+            num_player,
+            game_length,
+            training_data_path,
+            report,
+            args.dtype,
+            args.feature_cache,
+        )
+        model = rank_predictor.train.fit(
+            num_player,
+            game_length,
+            feature,
+            label,
+            classifier,
+            report,
+        )
+
+    with report.time("write"), model_path.open("wb") as f:
+        pickle.dump(model, f)
+
+    return 0
+
+
+def train_all(args: argparse.Namespace) -> int:
+    import tomllib
+
+    import rank_predictor.train
+    from rank_predictor.backend import DEFAULT_BACKEND, create_classifier
+    from rank_predictor.bundle import save_model_bundle
+
+    report: RunReport = args.run_report
+    config_path: Path = args.config_path
+    bundle_path: Path = args.bundle_path
+
+    if not config_path.is_file():
+        msg = f"`config_path` is not a file: {config_path}"
+        raise FileNotFoundError(msg)
+
+    if bundle_path.is_dir():
+        msg = (
+            "A directory with the same name as `bundle_path` exists:"
+            f" {bundle_path}"
+        )
+        raise FileExistsError(msg)
+
+    with config_path.open("rb") as fp:
+        config = tomllib.load(fp)
+    backend = config.get("backend", DEFAULT_BACKEND)
+    hyper_parameter = config.get("hyper-parameter", {})
+    partition = config.get("partition")
+    entries = config.get("model", [])
+    if not entries:
+        msg = f"The configuration has no `model` entries: {config_path}"
+        raise ValueError(msg)
+
+    jobs = []
+    for entry in entries:
+        # Relative paths are relative to the configuration file.
+        training_data_path = config_path.parent / entry["training_data"]
+        if not training_data_path.is_file():
+            msg = f"`training_data` is not a file: {training_data_path}"
+            raise FileNotFoundError(msg)
+
+        dtype = entry.get("dtype", "float64")
+        if dtype not in ("float64", "float32"):
+            msg = f"`dtype` must be float64 or float32: {dtype}"
+            raise ValueError(msg)
+
+        jobs.append(
+            rank_predictor.train.TrainingJob(
+                NumPlayer(entry["num_player"]),
+                GameLength(entry["game_length"]),
+                training_data_path,
+                create_classifier(
+                    entry.get("backend", backend),
+                    hyper_parameter | entry.get("hyper-parameter", {}),
+                    entry.get("partition", partition),
+                ),
+                dtype,
+            ),
+        )
+
+    models = rank_predictor.train.train_all(
+        jobs,
+        args.num_worker,
+        args.num_thread,
+        report,
+    )
+
+    with report.time("write"):
+        save_model_bundle(models, bundle_path)
+    logger.info("The bundle is saved.: %s", bundle_path)
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    import json
+    import tomllib
+    from dataclasses import asdict
+
+    import polars as pl
+
+    from rank_predictor.backend import create_classifier
+    from rank_predictor.compare import Candidate, compare
+
+    num_player = NumPlayer(args.num_player)
+    game_length = GameLength(args.game_length)
+    report: RunReport = args.run_report
+    training_data_path: Path = args.training_data_path
+    test_data_path: Path = args.test_data_path
+    config_path: Path = args.config_path
+    output_path: Path | None = args.output
+
+    for name, path in (
+        ("training_data_path", training_data_path),
+        ("test_data_path", test_data_path),
+        ("config_path", config_path),
+    ):
+        if not path.is_file():
+            msg = f"`{name}` is not a file: {path}"
+            raise FileNotFoundError(msg)
+
+    with config_path.open("rb") as fp:
+        entries = tomllib.load(fp).get("candidate", [])
+    if not entries:
+        msg = f"The configuration has no `candidate` entries: {config_path}"
+        raise ValueError(msg)
+    candidates = [
+        Candidate(
+            entry.get("name", entry["backend"]),
+            entry["backend"],
+            create_classifier(
+                entry["backend"],
+                entry.get("hyper-parameter"),
+                entry.get("partition"),
+            ),
+        )
+        for entry in entries
+    ]
+
+    with report.time("read"):
+        training_data = pl.read_csv(training_data_path)
+        test_data = pl.read_csv(test_data_path)
+    report.count(
+        "bytes_read",
+        training_data_path.stat().st_size + test_data_path.stat().st_size,
+    )
 
-    model = rank_predictor.train.train(
+    comparisons = compare(
         num_player,
         game_length,
         training_data,
-        classifier,
+        test_data,
+        candidates,
+        report,
+        args.dtype,
+        args.batch_size,
+        args.repeat,
     )
 
-    with model_path.open("wb") as f:
-        pickle.dump(model, f)
+    print(  # noqa: T201
+        f"{'name':<24} {'fit [s]':>9} {'size [KiB]':>10}"
+        f" {'single [us]':>11} {'batch [us]':>10} {'log-loss':>8}",
+    )
+    for c in comparisons:
+        print(  # noqa: T201
+            f"{c.name:<24} {c.fit_seconds:>9.3f} {c.model_bytes / 1024:>10.1f}"
+            f" {c.single_seconds * 1e6:>11.1f} {c.batch_seconds * 1e6:>10.1f}"
+            f" {c.log_loss:>8.4f}",
+        )
 
+    if output_path is not None:
+        with output_path.open("w") as f:
+            json.dump([asdict(c) for c in comparisons], f, indent=2)
     return 0
 
 
-def predict(args: argparse.Namespace) -> int:
+def update(args: argparse.Namespace) -> int:
+    import math
     import pickle
 
-    from rank_predictor.model import Model
-    from rank_predictor.predict import (
-        calculate_expected_rank,
-        calculate_player_rank_proba,
-        create_feature,
-        predict_proba,
+    import rank_predictor.train
+
+    num_player = NumPlayer(args.num_player)
+    game_length = GameLength(args.game_length)
+    report: RunReport = args.run_report
+    new_data_path: Path = args.new_data_path
+    output_model_path: Path = args.output_model_path
+    replay_data_path: Path | None = args.replay_data
+
+    if not new_data_path.is_file():
+        msg = f"`new_data_path` is not a file: {new_data_path}"
+        raise FileNotFoundError(msg)
+    if replay_data_path is not None and not replay_data_path.is_file():
+        msg = f"`replay_data_path` is not a file: {replay_data_path}"
+        raise FileNotFoundError(msg)
+
+    if output_model_path.is_dir():
+        msg = (
+            "A directory with the same name as `output_model_path` exists:"
+            f" {output_model_path}"
+        )
+        raise FileExistsError(msg)
+
+    model = load_model(args.model_path, report, num_player, game_length)
+    if model.num_player != num_player:
+        msg = (
+            "The `num_player` of the model does not match the provided"
+            f" argument. model: {model.num_player}, argument: {num_player}"
+        )
+        raise ValueError(msg)
+    if model.game_length != game_length:
+        msg = (
+            "The `game_length` of the model does not match the provided"
+            f" argument. model: {model.game_length},"
+            f" argument: {game_length}"
+        )
+        raise ValueError(msg)
+
+    # Fails before the data is read if the classifier cannot be
+    # continued with the arguments.
+    rank_predictor.train.get_update_method(
+        model.classifier,
+        args.extra_iter,
+        replay=replay_data_path is not None,
+    )
+
+    def read_arrays(path: Path) -> tuple["np.ndarray", "np.ndarray"]:
+        return rank_predictor.train.load_training_arrays(
+            num_player,
+            game_length,
+            path,
+            report,
+            model.dtype,
+            args.feature_cache,
+        )
+
+    feature, label = read_arrays(new_data_path)
+    replay_feature, replay_label = (
+        (None, None)
+        if replay_data_path is None
+        else read_arrays(replay_data_path)
     )
-    from rank_predictor.validate import validate_input_scores, validate_round
+
+    updated, summary = rank_predictor.train.update(
+        model,
+        feature,
+        label,
+        report,
+        replay_feature,
+        replay_label,
+        args.num_replay,
+        args.extra_iter,
+        args.seed,
+    )
+
+    with report.time("write"), output_model_path.open("wb") as f:
+        pickle.dump(updated, f)
+
+    logger.info(
+        "Updated with %s new rows and %s replayed rows in %.3f seconds.",
+        summary.num_row,
+        summary.num_replay,
+        summary.update_seconds,
+    )
+    if summary.num_added_iter:
+        logger.info("%s iterations were added.", summary.num_added_iter)
+    logger.info(
+        "The probabilities of the new rows changed by %.3g on average"
+        " (total variation distance).",
+        summary.proba_change,
+    )
+    if summary.proba_change == 0:
+        logger.warning("The update did not change the predictions.")
+    if summary.num_added_iter:
+        # An ensemble adds new arrays instead of changing the old ones.
+        logger.info(
+            "The coefficients of the old iterations are kept unchanged.",
+        )
+    elif math.isnan(summary.coefficient_change):
+        logger.info("The classifier has no coefficients to compare.")
+    else:
+        logger.info(
+            "The coefficients changed by %.3g relative to their norm, and"
+            " by at most %.3g per element.",
+            summary.coefficient_change,
+            summary.max_coefficient_change,
+        )
+    if summary.estimated_refit_seconds is not None:
+        logger.info(
+            "A full refit with %s rows is estimated to take %.3f seconds,"
+            " so the update saved about %.3f seconds.",
+            updated.num_row,
+            summary.estimated_refit_seconds,
+            summary.estimated_refit_seconds - summary.update_seconds,
+        )
+    return 0
+
+
+def distill(args: argparse.Namespace) -> int:
+    import pickle
+    import tomllib
+
+    import polars as pl
+
+    from rank_predictor.backend import DEFAULT_BACKEND, create_classifier
+    from rank_predictor.distill import distill
 
     num_player = NumPlayer(args.num_player)
     game_length = GameLength(args.game_length)
-    model_path: Path = args.model_path
-    round_ = Round(args.round)
-    num_counter_stick: int = args.num_counter_stick
-    num_riichi_deposit: int = args.num_riichi_deposit
-    input_score: list[int] = args.score
+    report: RunReport = args.run_report
+    student_model_path: Path = args.student_model_path
+    config_path: Path | None = args.config
+    test_data_path: Path | None = args.test_data
 
-    validate_round(round_, game_length)
-    if num_counter_stick < 0:
+    if config_path is not None and not config_path.is_file():
+        msg = f"`config_path` is not a file: {config_path}"
+        raise FileNotFoundError(msg)
+    if test_data_path is not None and not test_data_path.is_file():
+        msg = f"`test_data_path` is not a file: {test_data_path}"
+        raise FileNotFoundError(msg)
+
+    if student_model_path.is_dir():
+        msg = (
+            "A directory with the same name as `student_model_path` exists:"
+            f" {student_model_path}"
+        )
+        raise FileExistsError(msg)
+
+    config = {}
+    if config_path is not None:
+        with config_path.open("rb") as fp:
+            config = tomllib.load(fp)
+    student = create_classifier(
+        config.get("backend", DEFAULT_BACKEND),
+        config.get("hyper-parameter"),
+        config.get("partition"),
+    )
+
+    teacher = load_model(
+        args.teacher_model_path,
+        report,
+        num_player,
+        game_length,
+    )
+    if teacher.num_player != num_player:
         msg = (
-            "`num_counter_stick` must be greater than or equal to 0.:"
-            f" {num_counter_stick}"
+            "The `num_player` of the model does not match the provided"
+            f" argument. model: {teacher.num_player}, argument: {num_player}"
         )
         raise ValueError(msg)
-    validate_input_scores(num_riichi_deposit, input_score, num_player)
+    if teacher.game_length != game_length:
+        msg = (
+            "The `game_length` of the model does not match the provided"
+            f" argument. model: {teacher.game_length},"
+            f" argument: {game_length}"
+        )
+        raise ValueError(msg)
+
+    test_data = None
+    if test_data_path is not None:
+        with report.time("read"):
+            test_data = pl.read_csv(test_data_path)
+        report.count("bytes_read", test_data_path.stat().st_size)
+
+    student_model, summary = distill(
+        teacher,
+        student,
+        args.num_state,
+        args.seed,
+        test_data,
+        report,
+        args.batch_size,
+        args.repeat,
+    )
+
+    with report.time("write"), student_model_path.open("wb") as f:
+        pickle.dump(student_model, f)
+
+    logger.info(
+        "The student agrees with the teacher on %.1f%% of the sampled"
+        " states (KL divergence: %.4f, expected rank error: %.4f).",
+        summary.agreement * 100,
+        summary.kl_divergence,
+        summary.expected_rank_error,
+    )
+    if summary.teacher_log_loss is not None:
+        logger.info(
+            "Test log-loss: %.4f -> %.4f, accuracy: %.4f -> %.4f",
+            summary.teacher_log_loss,
+            summary.student_log_loss,
+            summary.teacher_accuracy,
+            summary.student_accuracy,
+        )
+    logger.info(
+        "Latency of one state: %.1f us -> %.1f us (%.1fx faster)",
+        summary.teacher_single_seconds * 1e6,
+        summary.student_single_seconds * 1e6,
+        summary.teacher_single_seconds / summary.student_single_seconds,
+    )
+    logger.info(
+        "Latency of a batch of %s states: %.1f us -> %.1f us (%.1fx faster)",
+        args.batch_size,
+        summary.teacher_batch_seconds * 1e6,
+        summary.student_batch_seconds * 1e6,
+        summary.teacher_batch_seconds / summary.student_batch_seconds,
+    )
+    return 0
+
+
+def load_model(
+    model_path: Path,
+    report: RunReport,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> "Model":
+    import pickle
+
+    from rank_predictor.bundle import ModelBundle, is_model_bundle
+    from rank_predictor.model import Model, is_mapped_model, load_mapped_model
 
     if not model_path.is_file():
         msg = f"`model_path` is not a file: {model_path}"
         raise FileNotFoundError(msg)
 
-    with model_path.open("rb") as file:
-        model = pickle.load(file)  # noqa: S301
+    with report.time("load"):
+        if is_mapped_model(model_path):
+            return load_mapped_model(model_path)
+        if is_model_bundle(model_path):
+            # Only the model for the game is loaded from the bundle.
+            return ModelBundle(model_path).load(num_player, game_length)
+        with model_path.open("rb") as file:
+            model = pickle.load(file)  # noqa: S301
     if not isinstance(model, Model):
         msg = "The loaded object is not an instance of `Model`."
         raise TypeError(msg)
-    if model.num_player != num_player:
-        msg = (
-            "The `num_player` of the model does not match the provided"
-            f" argument. model: {model.num_player}, argument: {num_player}"
-        )
-        raise ValueError(msg)
-    if model.game_length != game_length:
+    return model
+
+
+def predict(args: argparse.Namespace) -> int:
+    from rank_predictor.predict import GameState, Predictor
+    from rank_predictor.validate import (
+        validate_input_scores,
+        validate_num_counter_stick,
+        validate_round,
+    )
+
+    num_player = NumPlayer(args.num_player)
+    game_length = GameLength(args.game_length)
+    report: RunReport = args.run_report
+    model_path: Path = args.model_path
+
+    if args.stream:
+        if args.round is not None or args.score:
+            msg = "The state cannot be specified with `--stream`."
+            raise ValueError(msg)
+        return predict_stream(args, num_player, game_length)
+
+    if (
+        args.round is None
+        or args.num_counter_stick is None
+        or args.num_riichi_deposit is None
+    ):
         msg = (
-            "The `game_length` of the model does not match the provided"
-            f" argument. model: {model.game_length}, argument: {game_length}"
+            "`round`, `num_counter_stick` and `num_riichi_deposit` are"
+            " required without `--stream`."
         )
         raise ValueError(msg)
 
-    score = [s // 100 for s in input_score]
-    feature = create_feature(
+    round_ = Round(args.round)
+    num_counter_stick: int = args.num_counter_stick
+    num_riichi_deposit: int = args.num_riichi_deposit
+    input_score: list[int] = args.score
+
+    validate_round(round_, game_length)
+    validate_num_counter_stick(num_counter_stick)
+    validate_input_scores(num_riichi_deposit, input_score, num_player)
+
+    predictor = Predictor(
+        load_model(model_path, report, num_player, game_length),
+        num_player,
+        game_length,
+    )
+
+    state = GameState(
         round_,
         num_counter_stick,
         num_riichi_deposit,
-        score,
+        [s // 100 for s in input_score],
     )
-    proba = predict_proba(model, feature)
-    player_rank_proba = calculate_player_rank_proba(num_player, proba)
-    expected_ranks = calculate_expected_rank(player_rank_proba)
+    with report.time("predict"):
+        prediction = predictor.predict(state)
+    report.count("predictions")
 
     print("Rank Probability")  # noqa: T201
-    for i, p in enumerate(player_rank_proba):
+    for i, p in enumerate(prediction.player_rank_proba):
         print(f"player_{i}: {p}")  # noqa: T201
     print("\nExpected Rank")  # noqa: T201
-    for i, a in enumerate(expected_ranks):
+    for i, a in enumerate(prediction.expected_rank):
         print(f"player_{i}: {a}")  # noqa: T201
 
     return 0
 
 
+def predict_stream(
+    args: argparse.Namespace,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> int:
+    import sys
+
+    from rank_predictor.bundle import ModelBundle, is_model_bundle
+    from rank_predictor.predict import Predictor, PredictorRouter
+    from rank_predictor.serve import stream
+
+    report: RunReport = args.run_report
+    model_path: Path = args.model_path
+    predictor: Predictor | PredictorRouter
+    bundle = None
+    if model_path.is_file() and is_model_bundle(model_path):
+        # The requests select the model, which is loaded on first use.
+        with report.time("load"):
+            bundle = ModelBundle(model_path)
+        predictor = PredictorRouter(
+            num_player,
+            game_length,
+            bundle,
+            cache_size=args.cache_size,
+        )
+    else:
+        predictor = Predictor(
+            load_model(model_path, report, num_player, game_length),
+            num_player,
+            game_length,
+            args.cache_size,
+        )
+    stream(
+        predictor,
+        sys.stdin.buffer,
+        sys.stdout,
+        args.batch_size,
+        args.batch_delay / 1000,
+        report,
+    )
+    if bundle is not None:
+        report.count("models_loaded", bundle.num_loaded)
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    import os
+    import tempfile
+
+    from rank_predictor.bundle import ModelBundle, is_model_bundle
+    from rank_predictor.model import load_mapped_model, save_mapped_model
+    from rank_predictor.predict import Predictor, PredictorRouter
+    from rank_predictor.serve import serve
+
+    num_player = NumPlayer(args.num_player)
+    game_length = GameLength(args.game_length)
+    report: RunReport = args.run_report
+    model_path: Path = args.model_path
+    num_worker: int = args.num_worker or os.cpu_count() or 1
+
+    if model_path.is_file() and is_model_bundle(model_path):
+        # Each worker loads the models that its requests select.
+        with report.time("load"):
+            bundle = ModelBundle(model_path)
+        serve(
+            PredictorRouter(
+                num_player,
+                game_length,
+                bundle,
+                cache_size=args.cache_size,
+            ),
+            args.host,
+            args.port,
+            num_worker,
+        )
+        return 0
+
+    model = load_model(model_path, report, num_player, game_length)
+
+    # The workers share the arrays of the model through a memory-mapped
+    # file, which is unlinked once it is mapped.
+    with (
+        report.time("map"),
+        tempfile.TemporaryDirectory() as tmp,
+    ):
+        mapped_model_path = Path(tmp) / "model.bin"
+        save_mapped_model(model, mapped_model_path)
+        model = load_mapped_model(mapped_model_path)
+
+    serve(
+        Predictor(model, num_player, game_length, args.cache_size),
+        args.host,
+        args.port,
+        num_worker,
+    )
+    return 0
+
+
+def profile_prefix(args: argparse.Namespace) -> Path:
+    # The profiling outputs are saved next to the output of the
+    # subcommand, for example `annotated-data.csv.convert.pstats`.
+    output: Path = getattr(args, args.profile_output)
+    return output.with_name(f"{output.name}.{args.command}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
-    subparsers = parser.add_subparsers()
+    parser.add_argument("--report", type=Path)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--profile-top", type=int, default=25)
+    subparsers = parser.add_subparsers(dest="command")
 
     parser_convert = subparsers.add_parser("convert")
     parser_convert.add_argument("num_player", type=int, choices=(4, 3))
@@ -195,7 +804,41 @@ def main() -> None:
     parser_convert.add_argument("annotated_data", type=Path)
     parser_convert.add_argument("-f", "--final-score", action="store_true")
     parser_convert.add_argument("-n", "--filename", action="store_true")
-    parser_convert.set_defaults(func=convert)
+    parser_convert.add_argument("-c", "--cache", type=Path)
+    parser_convert.add_argument("--fast", action="store_true")
+    parser_convert.add_argument("--cross-check", type=float, default=0.0)
+    parser_convert.add_argument("--prefetch-bytes", type=int)
+    parser_convert.add_argument("--prefetch-threads", type=int, default=8)
+    parser_convert.add_argument("-d", "--dedup", type=Path)
+    parser_convert.add_argument("--hash-threads", type=int, default=8)
+    parser_convert.set_defaults(func=convert, profile_output="annotated_data")
+
+    parser_relabel = subparsers.add_parser("relabel")
+    parser_relabel.add_argument("num_player", type=int, choices=(4, 3))
+    parser_relabel.add_argument("input_data_path", type=Path)
+    parser_relabel.add_argument("output_data_path", type=Path)
+    parser_relabel.add_argument("-k", "--final-rank", action="store_true")
+    parser_relabel.set_defaults(
+        func=relabel,
+        profile_output="output_data_path",
+    )
+
+    parser_generate = subparsers.add_parser("generate")
+    parser_generate.add_argument("num_player", type=int, choices=(4, 3))
+    parser_generate.add_argument("game_length", choices=tuple(GameLength))
+    parser_generate.add_argument("num_game", type=int)
+    parser_generate.add_argument("output_path", type=Path)
+    parser_generate.add_argument(
+        "-x",
+        "--game-record-extension",
+        default="xml",
+    )
+    parser_generate.add_argument("-a", "--annotated-data", action="store_true")
+    parser_generate.add_argument("-f", "--final-score", action="store_true")
+    parser_generate.add_argument("-n", "--filename", action="store_true")
+    parser_generate.add_argument("-s", "--seed", type=int, default=0)
+    parser_generate.add_argument("-j", "--num-worker", type=int)
+    parser_generate.set_defaults(func=generate, profile_output="output_path")
 
     parser_split = subparsers.add_parser("split")
     parser_split.add_argument("input_data_path", type=Path)
@@ -206,7 +849,7 @@ def main() -> None:
     parser_split.add_argument("-r", "--random_state", type=int)
     parser_split.add_argument("-f", "--shuffle-false", action="store_true")
     parser_split.add_argument("-y", "--stratify-y", action="store_true")
-    parser_split.set_defaults(func=split)
+    parser_split.set_defaults(func=split, profile_output="train_data_path")
 
     parser_train = subparsers.add_parser("train")
     parser_train.add_argument("num_player", type=int, choices=(4, 3))
@@ -214,20 +857,124 @@ def main() -> None:
     parser_train.add_argument("training_data_path", type=Path)
     parser_train.add_argument("config_path", type=Path)
     parser_train.add_argument("model_path", type=Path)
-    parser_train.set_defaults(func=train)
+    parser_train.add_argument(
+        "-t",
+        "--dtype",
+        choices=("float64", "float32"),
+        default="float64",
+    )
+    parser_train.add_argument("--feature-cache", type=Path)
+    parser_train.set_defaults(func=train, profile_output="model_path")
+
+    parser_train_all = subparsers.add_parser("train-all")
+    parser_train_all.add_argument("config_path", type=Path)
+    parser_train_all.add_argument("bundle_path", type=Path)
+    parser_train_all.add_argument("-j", "--num-worker", type=int)
+    parser_train_all.add_argument("--num-thread", type=int)
+    parser_train_all.set_defaults(
+        func=train_all,
+        profile_output="bundle_path",
+    )
+
+    parser_compare = subparsers.add_parser("compare")
+    parser_compare.add_argument("num_player", type=int, choices=(4, 3))
+    parser_compare.add_argument("game_length", choices=tuple(GameLength))
+    parser_compare.add_argument("training_data_path", type=Path)
+    parser_compare.add_argument("test_data_path", type=Path)
+    parser_compare.add_argument("config_path", type=Path)
+    parser_compare.add_argument("-o", "--output", type=Path)
+    parser_compare.add_argument(
+        "-t",
+        "--dtype",
+        choices=("float64", "float32"),
+        default="float64",
+    )
+    parser_compare.add_argument("--batch-size", type=int, default=256)
+    parser_compare.add_argument("--repeat", type=int, default=100)
+    parser_compare.set_defaults(func=compare, profile_output="config_path")
+
+    parser_update = subparsers.add_parser("update")
+    parser_update.add_argument("num_player", type=int, choices=(4, 3))
+    parser_update.add_argument("game_length", choices=tuple(GameLength))
+    parser_update.add_argument("model_path", type=Path)
+    parser_update.add_argument("new_data_path", type=Path)
+    parser_update.add_argument("output_model_path", type=Path)
+    parser_update.add_argument("--feature-cache", type=Path)
+    parser_update.add_argument("--replay-data", type=Path)
+    parser_update.add_argument("--num-replay", type=int)
+    parser_update.add_argument("--extra-iter", type=int, default=0)
+    parser_update.add_argument("-s", "--seed", type=int, default=0)
+    parser_update.set_defaults(
+        func=update,
+        profile_output="output_model_path",
+    )
+
+    parser_distill = subparsers.add_parser("distill")
+    parser_distill.add_argument("num_player", type=int, choices=(4, 3))
+    parser_distill.add_argument("game_length", choices=tuple(GameLength))
+    parser_distill.add_argument("teacher_model_path", type=Path)
+    parser_distill.add_argument("student_model_path", type=Path)
+    parser_distill.add_argument("-c", "--config", type=Path)
+    parser_distill.add_argument("-n", "--num-state", type=int, default=20_000)
+    parser_distill.add_argument("-s", "--seed", type=int, default=0)
+    parser_distill.add_argument("--test-data", type=Path)
+    parser_distill.add_argument("--batch-size", type=int, default=256)
+    parser_distill.add_argument("--repeat", type=int, default=100)
+    parser_distill.set_defaults(
+        func=distill,
+        profile_output="student_model_path",
+    )
 
     parser_predict = subparsers.add_parser("predict")
     parser_predict.add_argument("num_player", type=int, choices=(4, 3))
     parser_predict.add_argument("game_length", choices=tuple(GameLength))
     parser_predict.add_argument("model_path", type=Path)
-    parser_predict.add_argument("round", type=int)
-    parser_predict.add_argument("num_counter_stick", type=int)
-    parser_predict.add_argument("num_riichi_deposit", type=int)
+    parser_predict.add_argument("round", type=int, nargs="?")
+    parser_predict.add_argument("num_counter_stick", type=int, nargs="?")
+    parser_predict.add_argument("num_riichi_deposit", type=int, nargs="?")
     parser_predict.add_argument("score", type=int, nargs="*")
-    parser_predict.set_defaults(func=predict)
+    parser_predict.add_argument("--stream", action="store_true")
+    parser_predict.add_argument("--batch-size", type=int, default=256)
+    parser_predict.add_argument("--batch-delay", type=float, default=2.0)
+    parser_predict.add_argument("--cache-size", type=int, default=0)
+    parser_predict.set_defaults(func=predict, profile_output="model_path")
+
+    parser_serve = subparsers.add_parser("serve")
+    parser_serve.add_argument("num_player", type=int, choices=(4, 3))
+    parser_serve.add_argument("game_length", choices=tuple(GameLength))
+    parser_serve.add_argument("model_path", type=Path)
+    parser_serve.add_argument("-H", "--host", default="127.0.0.1")
+    parser_serve.add_argument("-p", "--port", type=int, default=8000)
+    parser_serve.add_argument("-j", "--num-worker", type=int)
+    parser_serve.add_argument("--cache-size", type=int, default=0)
+    parser_serve.set_defaults(func=serve, profile_output="model_path")
 
     args = parser.parse_args()
-    args.func(args)
+    args.run_report = RunReport(args.command)
+
+    profile_path = None
+    memory_report_path = None
+    if args.profile or args.trace_memory:
+        prefix = profile_prefix(args)
+        if args.profile:
+            profile_path = prefix.with_name(f"{prefix.name}.pstats")
+        if args.trace_memory:
+            memory_report_path = prefix.with_name(f"{prefix.name}.memory.txt")
+
+    try:
+        run_with_profiling(
+            lambda: args.func(args),
+            profile_path,
+            memory_report_path,
+            args.profile_top,
+        )
+    finally:
+        if args.report is not None:
+            args.run_report.write(args.report)
+        if profile_path is not None:
+            logger.info("Profile is saved.: %s", profile_path)
+        if memory_report_path is not None:
+            logger.info("Memory report is saved.: %s", memory_report_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""Provides the classifier backends that models can be trained with.
+
+A backend is a named factory that creates an unfitted classifier from
+the hyper-parameters of a configuration. The configuration names it
+with the `backend` key, and the factory receives the
+`[hyper-parameter]` table as keyword arguments. Other backends can be
+added with `register_backend`. With the `[partition]` table, the
+classifier is wrapped in a
+`rank_predictor.partition.RoundPartitionedClassifier`.
+"""
+
+from collections.abc import Callable, Mapping
+from typing import Any, Final
+
+from rank_predictor.model import Classifier
+
+DEFAULT_BACKEND: Final[str] = "logistic-regression"
+"""The backend used if a configuration does not name one."""
+
+BackendFactory = Callable[..., Classifier]
+
+
+def _create_logistic_regression(**hyper_parameter: Any) -> Classifier:  # noqa: ANN401
+    from sklearn.linear_model import LogisticRegression
+
+    return LogisticRegression(**hyper_parameter)
+
+
+def _create_hist_gradient_boosting(**hyper_parameter: Any) -> Classifier:  # noqa: ANN401
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    return HistGradientBoostingClassifier(**hyper_parameter)
+
+
+def _create_mlp(**hyper_parameter: Any) -> Classifier:  # noqa: ANN401
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # The scores are two orders of magnitude larger than the other
+    # features, which the gradient descent of MLP does not cope with.
+    return make_pipeline(StandardScaler(), MLPClassifier(**hyper_parameter))
+
+
+_BACKENDS: dict[str, BackendFactory] = {
+    "logistic-regression": _create_logistic_regression,
+    "hist-gradient-boosting": _create_hist_gradient_boosting,
+    "mlp": _create_mlp,
+}
+
+
+def get_backend_names() -> list[str]:
+    """Gets the names of the registered backends.
+
+    Returns:
+        The names in the order of registration.
+    """
+    return list(_BACKENDS)
+
+
+def register_backend(name: str, factory: BackendFactory) -> None:
+    """Registers a backend.
+
+    Args:
+        name: The name of the backend in configurations.
+        factory: The function that creates an unfitted classifier from
+            the hyper-parameters as keyword arguments.
+
+    Raises:
+        ValueError: If a backend with the same name is registered.
+    """
+    if name in _BACKENDS:
+        msg = f"A backend with the same name is registered: {name}"
+        raise ValueError(msg)
+    _BACKENDS[name] = factory
+
+
+def create_classifier(
+    backend: str = DEFAULT_BACKEND,
+    hyper_parameter: Mapping[str, Any] | None = None,
+    partition: Mapping[str, Any] | None = None,
+) -> Classifier:
+    """Creates an unfitted classifier of a backend.
+
+    The backends registered by default are as follows:
+
+    - `logistic-regression`: `sklearn.linear_model.LogisticRegression`,
+      which is multinomial with the default solver.
+    - `hist-gradient-boosting`:
+      `sklearn.ensemble.HistGradientBoostingClassifier`.
+    - `mlp`: `sklearn.neural_network.MLPClassifier` after
+      `sklearn.preprocessing.StandardScaler` in a pipeline.
+
+    Args:
+        backend: The name of the backend. Defaults to
+            `DEFAULT_BACKEND`.
+        hyper_parameter: The hyper-parameters of the classifier.
+            Defaults to None.
+        partition: The `rounds` (the groups of rounds), `num-worker`
+            (the number of processes that fit the classifiers) and
+            `min-num-row` (the number of training rows that a group
+            needs) of
+            `rank_predictor.partition.RoundPartitionedClassifier`, all
+            optional. If given, a classifier of the backend is fitted
+            for each group of rounds. Defaults to None.
+
+    Returns:
+        The classifier.
+
+    Raises:
+        ValueError: If the backend is not registered, or if `partition`
+            is invalid.
+    """
+    factory = _BACKENDS.get(backend)
+    if factory is None:
+        msg = (
+            f"Unknown backend: {backend}"
+            f" (available: {', '.join(get_backend_names())})"
+        )
+        raise ValueError(msg)
+    classifier = factory(**(hyper_parameter or {}))
+    if partition is None:
+        return classifier
+
+    from rank_predictor.partition import RoundPartitionedClassifier
+
+    names = {
+        "rounds": "partitions",
+        "num-worker": "num_worker",
+        "min-num-row": "min_num_row",
+    }
+    unknown = set(partition) - set(names)
+    if unknown:
+        msg = f"Unknown keys of `partition`: {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+    return RoundPartitionedClassifier(
+        classifier,
+        **{names[key]: value for key, value in partition.items()},
+    )
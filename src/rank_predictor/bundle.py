@@ -0,0 +1,235 @@
+"""Provides a single-file bundle of models.
+
+A bundle is a zip archive that holds a pickled model per combination of
+the number of players and the length of the game, and an index that
+describes them. It lets the models trained together be deployed and
+versioned as one file. `ModelBundle` reads only the index when it is
+opened and loads each model when it is first used.
+"""
+
+import json
+import os
+import pickle
+import tempfile
+import threading
+import zipfile
+from collections.abc import Iterable
+from logging import getLogger
+from pathlib import Path
+from typing import Final
+
+from rank_predictor.model import Model
+from rank_predictor.types import GameLength, NumPlayer, get_game_length_name
+
+logger = getLogger(__name__)
+
+BUNDLE_FORMAT: Final[int] = 1
+"""The version of the layout of a bundle."""
+
+_INDEX_NAME: Final[str] = "index.json"
+
+
+def get_entry_name(num_player: NumPlayer, game_length: GameLength) -> str:
+    """Gets the name of the entry of a model in a bundle.
+
+    Args:
+        num_player: The number of players that the model supports.
+        game_length: The length of the game that the model supports.
+
+    Returns:
+        The name of the entry, such as `4h.pickle`.
+    """
+    return f"{int(num_player)}{game_length}.pickle"
+
+
+def _get_default_file_mode() -> int:
+    # The umask can only be read by setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def save_model_bundle(models: Iterable[Model], path: Path) -> None:
+    """Saves models as a bundle.
+
+    The bundle is written to a temporary file and renamed, so an
+    interrupted run does not leave a broken bundle. The bundle gets the
+    permissions of a file created with `open`, not the private ones of
+    the temporary file.
+
+    Args:
+        models: The models to save. Each combination of the number of
+            players and the length of the game may appear only once.
+        path: The destination path for the bundle.
+
+    Raises:
+        ValueError: If two models support the same combination of the
+            number of players and the length of the game.
+    """
+    entries: dict[str, Model] = {}
+    for model in models:
+        name = get_entry_name(model.num_player, model.game_length)
+        if name in entries:
+            msg = (
+                "The bundle contains more than one model for the same"
+                f" game.: {model.num_player}-Player, {model.game_length}"
+            )
+            raise ValueError(msg)
+        entries[name] = model
+
+    index = {
+        "format": BUNDLE_FORMAT,
+        "models": [
+            {
+                "entry": name,
+                "num_player": int(model.num_player),
+                "game_length": str(model.game_length),
+                "dtype": model.dtype.name,
+                "num_row": model.num_row,
+            }
+            for name, model in entries.items()
+        ],
+    }
+
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        delete=False,
+    ) as tmp:
+        tmp_path = Path(tmp.name)
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as archive:
+            archive.writestr(_INDEX_NAME, json.dumps(index, indent=2))
+            for name, model in entries.items():
+                archive.writestr(name, pickle.dumps(model, protocol=5))
+        tmp_path.chmod(_get_default_file_mode())
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def is_model_bundle(path: Path) -> bool:
+    """Checks if a file is saved by `save_model_bundle`.
+
+    Args:
+        path: The path to the file.
+
+    Returns:
+        True if the file is a zip file with the index of a bundle,
+            otherwise False.
+    """
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as archive:
+        return _INDEX_NAME in archive.namelist()
+
+
+class ModelBundle:
+    """A bundle of models that are loaded when they are first used.
+
+    Only the index is read when the bundle is opened. The instance can
+    be shared by threads, and by processes forked before the models are
+    loaded, because each model is read with its own handle of the file.
+    As with `pickle`, only open bundles that you trust.
+
+    Attributes:
+        path: The path to the bundle.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Opens a bundle and reads its index.
+
+        Args:
+            path: The path to the bundle.
+
+        Raises:
+            ValueError: If the file is not a bundle or its format is not
+                supported.
+        """
+        if not is_model_bundle(path):
+            msg = f"The file is not a bundle of models: {path}"
+            raise ValueError(msg)
+        with zipfile.ZipFile(path) as archive:
+            index = json.loads(archive.read(_INDEX_NAME))
+        if index.get("format") != BUNDLE_FORMAT:
+            msg = (
+                "The format of the bundle is not supported."
+                f": {index.get('format')}"
+            )
+            raise ValueError(msg)
+
+        self.path = path
+        self._entries = {
+            (
+                NumPlayer(entry["num_player"]),
+                GameLength(entry["game_length"]),
+            ): entry["entry"]
+            for entry in index["models"]
+        }
+        self._models: dict[tuple[NumPlayer, GameLength], Model] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def games(self) -> list[tuple[NumPlayer, GameLength]]:
+        """The games that the bundle has a model for.
+
+        Each game is a tuple of the number of players and the length of
+        the game.
+        """
+        return list(self._entries)
+
+    @property
+    def num_loaded(self) -> int:
+        """The number of models that have been loaded."""
+        return len(self._models)
+
+    def __contains__(self, game: object) -> bool:
+        """Checks if the bundle has a model for a game.
+
+        Args:
+            game: The number of players and the length of the game as a
+                tuple.
+
+        Returns:
+            True if the bundle has a model for the game.
+        """
+        return game in self._entries
+
+    def load(self, num_player: NumPlayer, game_length: GameLength) -> Model:
+        """Gets the model for a game, loading it on first use.
+
+        Args:
+            num_player: The number of players.
+            game_length: The length of the game.
+
+        Returns:
+            The model.
+
+        Raises:
+            ValueError: If the bundle has no model for the game.
+            TypeError: If the loaded object is not an instance of
+                `Model` for the game.
+        """
+        game = (num_player, game_length)
+        name = f"{num_player}-Player, {get_game_length_name(game_length)}"
+        with self._lock:
+            model = self._models.get(game)
+            if model is not None:
+                return model
+
+            if game not in self._entries:
+                msg = f"The bundle has no model for the game.: {name}"
+                raise ValueError(msg)
+            with zipfile.ZipFile(self.path) as archive:
+                model = pickle.loads(archive.read(self._entries[game]))  # noqa: S301
+            if (
+                not isinstance(model, Model)
+                or model.num_player != num_player
+                or model.game_length != game_length
+            ):
+                msg = f"The entry of the bundle is not a model for: {name}"
+                raise TypeError(msg)
+
+            logger.info("The model is loaded from the bundle.: %s", name)
+            self._models[game] = model
+            return model
@@ -0,0 +1,242 @@
+"""Provides comparison of classifier backends.
+
+Each candidate is trained on the same data and measured on what matters
+for serving: the time to fit, the size of the pickled model, the
+latency of a prediction for one state and for a batch of states, and
+the log-loss on test data.
+"""
+
+import pickle
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from logging import getLogger
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+from sklearn.metrics import log_loss
+
+from rank_predictor.model import Classifier, Model
+from rank_predictor.predict import GameState, Predictor
+from rank_predictor.report import RunReport
+from rank_predictor.train import extract, fit
+from rank_predictor.types import GameLength, NumPlayer, Round
+
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """A classifier to compare.
+
+    Attributes:
+        name: The name of the candidate in the results.
+        backend: The name of the backend of the classifier.
+        classifier: The unfitted classifier.
+    """
+
+    name: str
+    backend: str
+    classifier: Classifier
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """The measurements of a candidate.
+
+    Attributes:
+        name: The name of the candidate.
+        backend: The name of the backend of the classifier.
+        fit_seconds: The number of seconds that fitting took.
+        model_bytes: The size of the pickled model in bytes.
+        single_seconds: The median number of seconds of a prediction
+            for one state with `rank_predictor.predict.Predictor`.
+        batch_seconds: The median number of seconds of a prediction
+            for a batch of states.
+        batch_size: The number of states in a batch.
+        log_loss: The log-loss of the rank classes of the test data.
+    """
+
+    name: str
+    backend: str
+    fit_seconds: float
+    model_bytes: int
+    single_seconds: float
+    batch_seconds: float
+    batch_size: int
+    log_loss: float
+
+
+def _median_seconds(
+    predict: Callable[[int], object],
+    repeat: int,
+) -> float:
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        predict(i)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def measure_latency(
+    model: Model,
+    feature: np.ndarray,
+    batch_size: int = 256,
+    repeat: int = 100,
+) -> tuple[float, float]:
+    """Measures the latency of predictions with a model.
+
+    Args:
+        model: The model to measure.
+        feature: The features of the states to predict, in the order of
+            `rank_predictor.train.get_feature_columns`.
+        batch_size: The number of states in a batch. Defaults to 256.
+        repeat: The number of times each latency is measured. Defaults
+            to 100.
+
+    Returns:
+        The median number of seconds of a prediction for one state with
+            `rank_predictor.predict.Predictor`, and that for a batch of
+            the first `batch_size` states.
+    """
+    predictor = Predictor(model, model.num_player, model.game_length)
+    states = [
+        GameState(Round(int(row[0])), int(row[1]), int(row[2]), row[3:])
+        for row in feature[:repeat].astype(np.int64)
+    ]
+    single_seconds = _median_seconds(
+        lambda i: predictor.predict(states[i % len(states)]),
+        repeat,
+    )
+    batch = feature[:batch_size]
+    batch_seconds = _median_seconds(
+        lambda _: predictor.predict_feature(batch),
+        repeat,
+    )
+    return single_seconds, batch_seconds
+
+
+def _measure(
+    candidate: Candidate,
+    model: Model,
+    test_feature: np.ndarray,
+    test_label: np.ndarray,
+    batch_size: int,
+    repeat: int,
+) -> Comparison:
+    single_seconds, batch_seconds = measure_latency(
+        model,
+        test_feature,
+        batch_size,
+        repeat,
+    )
+    classifier = model.classifier
+    proba = classifier.predict_proba(test_feature)
+    return Comparison(
+        name=candidate.name,
+        backend=candidate.backend,
+        fit_seconds=model.fit_seconds,
+        model_bytes=len(pickle.dumps(model, protocol=5)),
+        single_seconds=single_seconds,
+        batch_seconds=batch_seconds,
+        batch_size=min(batch_size, len(test_feature)),
+        log_loss=float(
+            log_loss(
+                test_label,
+                proba,
+                labels=getattr(classifier, "classes_", None),
+            ),
+        ),
+    )
+
+
+def compare(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    training_data: pl.DataFrame,
+    test_data: pl.DataFrame,
+    candidates: Sequence[Candidate],
+    report: RunReport | None = None,
+    dtype: npt.DTypeLike = np.float64,
+    batch_size: int = 256,
+    repeat: int = 100,
+) -> list[Comparison]:
+    """Trains each candidate and measures it.
+
+    The candidates are trained one after another on the same features,
+    so their fit times are comparable.
+
+    Args:
+        num_player: The number of players.
+        game_length: The length of the game.
+        training_data: The annotated data to train the candidates with.
+        test_data: The annotated data to measure the candidates with.
+        candidates: The classifiers to compare.
+        report: The report to record the timings of the stages and the
+            number of rows in. Defaults to None.
+        dtype: The floating-point type of the features. Defaults to
+            float64.
+        batch_size: The number of states in a batch. Defaults to 256,
+            the default of `predict --stream`.
+        repeat: The number of times each latency is measured. Defaults
+            to 100.
+
+    Returns:
+        The measurements in the order of `candidates`.
+
+    Raises:
+        ValueError: If the data is invalid, if `dtype` is not supported,
+            or if `batch_size` or `repeat` is not positive.
+    """
+    if batch_size <= 0:
+        msg = f"`batch_size` must be positive: {batch_size}"
+        raise ValueError(msg)
+    if repeat <= 0:
+        msg = f"`repeat` must be positive: {repeat}"
+        raise ValueError(msg)
+    if report is None:
+        report = RunReport()
+
+    feature, label = extract(
+        num_player,
+        game_length,
+        training_data,
+        report,
+        dtype,
+    )
+    test_feature, test_label = extract(
+        num_player,
+        game_length,
+        test_data,
+        report,
+        dtype,
+    )
+    if len(test_label) == 0:
+        msg = "The test data has no rows."
+        raise ValueError(msg)
+
+    comparisons = []
+    for candidate in candidates:
+        logger.info("Training candidate: %s", candidate.name)
+        model = fit(
+            num_player,
+            game_length,
+            feature,
+            label,
+            candidate.classifier,
+            report,
+        )
+        with report.time("measure"):
+            comparisons.append(
+                _measure(
+                    candidate,
+                    model,
+                    test_feature,
+                    test_label,
+                    batch_size,
+                    repeat,
+                ),
+            )
+    return comparisons
@@ -1,13 +1,29 @@
 """Provides a tool for converting game records into annotated data."""
 
+import mmap
+import os
+import re
+import zlib
+from collections.abc import Iterator, Sequence
+from contextlib import ExitStack
 from dataclasses import dataclass
 from enum import IntFlag
 from logging import getLogger
 from pathlib import Path
+from xml.etree.ElementTree import Element
 
+import numpy as np
 from defusedxml import ElementTree
 
+from rank_predictor.dedup import SeenSet, hash_files
+from rank_predictor.prefetch import Prefetcher
 from rank_predictor.rank import classify
+from rank_predictor.record_cache import (
+    ParsedRecord,
+    ParsedRecordCache,
+    SkippedRecord,
+)
+from rank_predictor.report import ProgressLogger, RunReport
 from rank_predictor.types import (
     DataName,
     GameLength,
@@ -45,7 +61,9 @@ def _create_header(
     )
 
     if output_final_score:
-        header += "," + ",".join(f"final_score_{i}" for i in range(num_player))
+        header += "," + ",".join(
+            f"{DataName.FINAL_SCORE}_{i}" for i in range(num_player)
+        )
 
     if output_filename:
         header += ",filename"
@@ -168,19 +186,229 @@ def _parse_result(result: str, num_player: NumPlayer) -> list[int] | None:
     return score_numbers
 
 
+@dataclass
+class _GameAttributes:
+    # The attributes that are read from a game record. An attribute is
+    # None if it is missing, and each element of `inits` is the pair of
+    # `seed` and `ten` of an `INIT` tag.
+    has_go: bool
+    game_type: str | None
+    inits: list[tuple[str | None, str | None]]
+    owari: str | None
+
+
+class _ScanError(Exception):
+    pass
+
+
+_ROOT_START = re.compile(rb"\A\s*(?:<\?xml[^<>]*\?>\s*)?<mjloggm[\s/>]")
+_ROOT_END = re.compile(rb"</mjloggm>\s*\Z")
+_TAG = re.compile(rb"<(GO|INIT|AGARI|RYUUKYOKU)((?:\s[^<>]*)?)/?>")
+_ATTRIBUTES = {
+    name: re.compile(rb"\s" + name + rb'="([^"]*)"')
+    for name in (b"type", b"seed", b"ten", b"owari")
+}
+# Characters that `ElementTree` replaces in attribute values.
+_UNNORMALIZED = re.compile(rb"[&<\t\n\r]")
+
+
+def _find_attributes(root: Element) -> _GameAttributes:
+    go = root.find("GO")
+
+    owari = None
+    agaris = root.findall("AGARI")
+    if agaris:
+        owari = agaris[-1].get("owari")
+    if owari is None:
+        ryuukyokus = root.findall("RYUUKYOKU")
+        if ryuukyokus:
+            owari = ryuukyokus[-1].get("owari")
+
+    return _GameAttributes(
+        has_go=go is not None,
+        game_type=None if go is None else go.get("type"),
+        inits=[
+            (init.get("seed"), init.get("ten"))
+            for init in root.findall("INIT")
+        ],
+        owari=owari,
+    )
+
+
+def _scan_attribute(attributes: bytes, name: bytes) -> str | None:
+    match = _ATTRIBUTES[name].search(attributes)
+    if match is None:
+        # The attribute may be written in a way that is not supported,
+        # such as with single quotes.
+        if name + b"=" in attributes:
+            raise _ScanError
+        return None
+
+    value = match.group(1)
+    if _UNNORMALIZED.search(value) is not None or not value.isascii():
+        raise _ScanError
+    return value.decode("ascii")
+
+
+def _scan_attributes(data: bytes | mmap.mmap) -> _GameAttributes | None:
+    # Scans the tags of an mjlog as bytes without building the tree.
+    # Returns None if the data is not as regular as the mjlogs written
+    # by Tenhou, in which case it has to be parsed by `ElementTree`.
+    if (
+        _ROOT_START.match(data) is None
+        or _ROOT_END.search(data) is None
+        or data.find(b"<!") != -1
+    ):
+        return None
+
+    has_go = False
+    game_type = None
+    inits: list[tuple[str | None, str | None]] = []
+    last_agari = None
+    last_ryuukyoku = None
+    try:
+        for match in _TAG.finditer(data):
+            tag, attributes = match.groups()
+            if tag == b"INIT":
+                inits.append(
+                    (
+                        _scan_attribute(attributes, b"seed"),
+                        _scan_attribute(attributes, b"ten"),
+                    ),
+                )
+            elif tag == b"AGARI":
+                last_agari = attributes
+            elif tag == b"RYUUKYOKU":
+                last_ryuukyoku = attributes
+            elif not has_go:
+                has_go = True
+                game_type = _scan_attribute(attributes, b"type")
+
+        owari = None
+        if last_agari is not None:
+            owari = _scan_attribute(last_agari, b"owari")
+        if owari is None and last_ryuukyoku is not None:
+            owari = _scan_attribute(last_ryuukyoku, b"owari")
+    except _ScanError:
+        return None
+
+    return _GameAttributes(
+        has_go=has_go,
+        game_type=game_type,
+        inits=inits,
+        owari=owari,
+    )
+
+
+def _scan_file(file: Path) -> tuple[_GameAttributes | None, int]:
+    with file.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # An empty file cannot be memory-mapped.
+        if size == 0:
+            return (None, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return (_scan_attributes(data), size)
+
+
+def _create_record(
+    attributes: _GameAttributes,
+    file_name: str,
+) -> ParsedRecord | SkippedRecord:
+    if not attributes.has_go:
+        logger.warning("`GO` tag is not included.: %s", file_name)
+        return SkippedRecord("games_skipped", "missing_go")
+
+    game_type = attributes.game_type
+    if game_type is None:
+        logger.warning(
+            "`GO` tag is missing a `type` attribute.: %s",
+            file_name,
+        )
+        return SkippedRecord("games_skipped", "missing_type")
+
+    try:
+        game_type_number = int(game_type)
+    except ValueError:
+        logger.warning(
+            "`type` is not a number.: %s, %s",
+            game_type,
+            file_name,
+        )
+        return SkippedRecord("games_skipped", "invalid_type")
+
+    log_num_player, log_game_length = _parse_game_type(
+        game_type_number,
+    )
+
+    if not attributes.inits:
+        logger.warning("`INIT` tag is not included.: %s", file_name)
+        return SkippedRecord("games_skipped", "missing_init")
+
+    states: list[_RoundState] = []
+    scores: list[list[int]] = []
+    for seed, ten in attributes.inits:
+        if seed is None:
+            logger.warning(
+                "`INIT` tag is missing a `seed` attribute.: %s",
+                file_name,
+            )
+            return SkippedRecord("games_skipped", "missing_seed")
+
+        state = _parse_seed(seed)
+        if state is None:
+            return SkippedRecord("games_skipped", "invalid_seed")
+
+        if ten is None:
+            logger.warning(
+                "`INIT` tag is missing a `ten` attribute.: %s",
+                file_name,
+            )
+            return SkippedRecord("games_skipped", "missing_ten")
+
+        score = _parse_score(ten, log_num_player)
+        if score is None:
+            return SkippedRecord("games_skipped", "invalid_ten")
+
+        states.append(state)
+        scores.append(score)
+
+    owari = attributes.owari
+    if owari is None:
+        logger.warning(
+            "There is no score at the end of the game.: %s",
+            file_name,
+        )
+        return SkippedRecord("games_skipped", "missing_owari")
+
+    result = _parse_result(owari, log_num_player)
+    if result is None:
+        return SkippedRecord("games_skipped", "invalid_owari")
+
+    return ParsedRecord(
+        num_player=log_num_player,
+        game_length=log_game_length,
+        states=np.array(
+            [
+                (st.round_, st.num_counter_stick, st.num_riichi_deposit)
+                for st in states
+            ],
+        ),
+        scores=np.array(scores),
+        result=np.array(result),
+    )
+
+
 def _create_line(
-    state: _RoundState,
-    score: list[int],
-    result: list[int],
+    state: Sequence[int],
+    score: Sequence[int],
+    result: Sequence[int],
+    rank_class: int,
     game_record_file: Path | None,
     *,
     output_final_score: bool,
 ) -> str:
-    rank_class = classify(result)
     line = (
-        f"{state.round_},{state.num_counter_stick},{state.num_riichi_deposit},"
-        f"{','.join(map(str, score))},"
-        f"{rank_class}"
+        f"{','.join(map(str, state))},{','.join(map(str, score))},{rank_class}"
     )
 
     if output_final_score:
@@ -193,6 +421,83 @@ def _create_line(
     return line
 
 
+def _read_attributes(
+    data: bytes,
+    file_name: str,
+    report: RunReport,
+) -> _GameAttributes | SkippedRecord:
+    with report.time("parse"):
+        root = ElementTree.fromstring(data)
+
+    if root is None:
+        logger.warning("This file is empty or not well-formed.: %s", file_name)
+        return SkippedRecord("files_skipped", "not_well_formed")
+
+    if root.tag != "mjloggm":
+        logger.warning("This file is not in mjlog format.: %s", file_name)
+        return SkippedRecord("files_skipped", "not_mjlog")
+
+    with report.time("extract"):
+        return _find_attributes(root)
+
+
+def _is_cross_checked(file: Path, cross_check: float) -> bool:
+    # Samples the files by the hash of the name, so that the same files
+    # are checked on every run.
+    return zlib.crc32(file.name.encode()) < cross_check * 2**32
+
+
+def _parse_game_record(
+    file: Path,
+    data: bytes | None,
+    report: RunReport,
+    *,
+    fast: bool,
+    cross_check: float,
+) -> ParsedRecord | SkippedRecord:
+    attributes: _GameAttributes | SkippedRecord | None = None
+    if fast:
+        with report.time("scan"):
+            if data is None:
+                attributes, size = _scan_file(file)
+            else:
+                attributes, size = _scan_attributes(data), len(data)
+        report.count(
+            "fast_path",
+            reason="hit" if attributes is not None else "fallback",
+        )
+
+    if attributes is None:
+        if data is None:
+            with report.time("read"):
+                data = file.read_bytes()
+        size = len(data)
+        attributes = _read_attributes(data, file.name, report)
+    elif _is_cross_checked(file, cross_check):
+        with report.time("cross_check"):
+            if data is None:
+                data = file.read_bytes()
+            expected = _read_attributes(data, file.name, report)
+        if expected == attributes:
+            report.count("cross_checks", reason="match")
+        else:
+            logger.error(
+                "The fast path disagrees with `ElementTree`.: %s",
+                file.name,
+            )
+            report.count("cross_checks", reason="mismatch")
+            attributes = expected
+
+    report.count("files")
+    report.count("bytes_read", size)
+
+    if isinstance(attributes, SkippedRecord):
+        return attributes
+
+    with report.time("extract"):
+        return _create_record(attributes, file.name)
+
+
 def convert(
     num_player: NumPlayer,
     game_length: GameLength,
@@ -202,6 +507,14 @@ def convert(
     *,
     output_final_score: bool,
     output_filename: bool,
+    report: RunReport | None = None,
+    cache_path: Path | None = None,
+    fast: bool = False,
+    cross_check: float = 0.0,
+    prefetch_bytes: int | None = None,
+    num_prefetch_thread: int = 8,
+    seen_path: Path | None = None,
+    num_hash_thread: int = 8,
 ) -> None:
     """Converts game records into annotated data format.
 
@@ -222,12 +535,45 @@ def convert(
             annotated data.
         output_filename: If True, includes the filenames in the
             annotated data.
+        report: The report to record the timings of the stages (`hash`,
+            `wait`, `read`, `scan`, `parse`, `extract`, `cross_check`,
+            `classify` and `write`) and the counters of files, games and
+            bytes in. Defaults to None.
+        cache_path: The path to the cache of the parsed records. If
+            given, game records that have not changed since they were
+            cached are not parsed again, and the cache is updated with
+            the newly parsed ones. Defaults to None.
+        fast: If True, the attributes are scanned from the memory-mapped
+            game records as bytes instead of being parsed as XML. Game
+            records that are not as regular as those written by Tenhou
+            are still parsed as XML. Note that the fast path does not
+            check that the whole game record is well-formed. Defaults
+            to False.
+        cross_check: The fraction of the game records read by the fast
+            path that are also parsed as XML to check that both agree.
+            If they disagree, an error is logged and the result of the
+            XML parser is used. Defaults to 0.0.
+        prefetch_bytes: The maximum number of bytes of the game records
+            read ahead by background threads while the current one is
+            parsed. If None, each game record is read right before it
+            is parsed. Defaults to None.
+        num_prefetch_thread: The number of threads to read ahead the
+            game records with. Defaults to 8.
+        seen_path: The path to the file of the digests of the converted
+            game records. If given, the game records are hashed before
+            the conversion, and those whose digests are in the file or
+            which are copies of an earlier game record are skipped. The
+            digests of the game records that are converted into rows
+            are added to the file. Defaults to None.
+        num_hash_thread: The number of threads to hash the game records
+            with. Defaults to 8.
 
     Raises:
         FileNotFoundError: If the game record directory is not found
             or cannot be accessed.
         FileExistsError: If a directory with the same name as the output
             file already exists.
+        ValueError: If `cross_check` is not between 0 and 1.
     """
     if not game_record_dir.is_dir():
         msg = f"`game_record_dir` is not directory: {game_record_dir}"
@@ -240,6 +586,16 @@ def convert(
         )
         raise FileExistsError(msg)
 
+    if not 0.0 <= cross_check <= 1.0:
+        msg = f"`cross_check` must be between 0 and 1: {cross_check}"
+        raise ValueError(msg)
+
+    if report is None:
+        report = RunReport()
+
+    cache = None if cache_path is None else ParsedRecordCache(cache_path)
+    seen = None if seen_path is None else SeenSet(seen_path)
+
     logger.info(
         "Conversion target: %s-Player, %s",
         num_player,
@@ -251,111 +607,156 @@ def convert(
         output_final_score=output_final_score,
         output_filename=output_filename,
     )
-    with annotated_data.open("w") as f:
-        f.write(header)
+    progress = ProgressLogger(logger, "Parsing...")
 
-    for file in game_record_dir.glob(
-        f"*.{game_record_extension}",
-        case_sensitive=True,
-    ):
-        logger.info("Parsing... : %s", file.name)
-        tree = ElementTree.parse(file)
-        root = tree.getroot()
-
-        if root is None:
-            logger.warning("This file is empty or not well-formed.")
-            continue
-
-        if root.tag != "mjloggm":
-            logger.warning("This file is not in mjlog format.")
-            continue
-
-        go = root.find("GO")
-        if go is None:
-            logger.warning("`GO` tag is not included.")
-            continue
-
-        game_type = go.get("type")
-        if not isinstance(game_type, str):
-            logger.warning("`GO` tag is missing a `type` attribute.")
-            continue
-
-        try:
-            game_type = int(game_type)
-        except ValueError:
-            logger.warning("`type` is not a number.: %s", game_type)
-            continue
-
-        log_num_player, log_game_length = _parse_game_type(game_type)
-        if (log_num_player != num_player) or (log_game_length != game_length):
-            logger.info(
-                "This mjlog is not a target.: %s-Player, %s",
-                log_num_player,
-                get_game_length_name(log_game_length),
+    files = list(
+        game_record_dir.glob(
+            f"*.{game_record_extension}",
+            case_sensitive=True,
+        ),
+    )
+    digests: list[str | None] = [None] * len(files)
+    duplicates = [False] * len(files)
+    # The game records converted by earlier runs with the same file of
+    # digests, as opposed to copies of another game record in this run.
+    converted_before = [False] * len(files)
+    if seen is not None:
+        with report.time("hash"):
+            hashed = hash_files(files, num_hash_thread)
+        duplicates = seen.find_duplicates(hashed)
+        converted_before = [digest in seen for digest in hashed]
+        digests[:] = hashed
+
+    # The duplicates and the cached game records are not read at all.
+    records = [
+        None if duplicate or cache is None else cache.get(file)
+        for file, duplicate in zip(files, duplicates, strict=True)
+    ]
+
+    with ExitStack() as stack:
+        contents: Iterator[tuple[Path, bytes | None]] = (
+            (file, None)
+            for file, record, duplicate in zip(
+                files,
+                records,
+                duplicates,
+                strict=True,
             )
-            continue
-
-        inits = root.findall("INIT")
-        if not inits:
-            logger.warning("`INIT` tag is not included.")
-            continue
-
-        states: list[_RoundState] = []
-        scores: list[list[int]] = []
-        continue_ = False
-        for init in inits:
-            seed = init.get("seed")
-            if not isinstance(seed, str):
-                logger.warning("`INIT` tag is missing a `seed` attribute.")
-                continue_ = True
-                break
-
-            state = _parse_seed(seed)
-            if state is None:
-                continue_ = True
-                break
-
-            ten = init.get("ten")
-            if not isinstance(ten, str):
-                logger.warning("`INIT` tag is missing a `ten` attribute.")
-                continue_ = True
-                break
-
-            score = _parse_score(ten, log_num_player)
-            if score is None:
-                continue_ = True
-                break
-
-            states.append(state)
-            scores.append(score)
-
-        if continue_:
-            continue
-
-        owari = None
-        agaris = root.findall("AGARI")
-        owari = agaris[-1].get("owari")
-        if owari is None:
-            ryuukyokus = root.findall("RYUUKYOKU")
-            owari = ryuukyokus[-1].get("owari")
+            if record is None and not duplicate
+        )
+        if prefetch_bytes is not None:
+            contents = iter(
+                stack.enter_context(
+                    Prefetcher(
+                        (file for file, _ in contents),
+                        prefetch_bytes,
+                        num_prefetch_thread,
+                    ),
+                ),
+            )
+        f = stack.enter_context(annotated_data.open("w"))
+        f.write(header)
 
-        if owari is None:
-            logger.warning("There is no score at the end of the game.")
-            continue
-
-        result = _parse_result(owari, log_num_player)
-        if result is None:
-            continue
-
-        with annotated_data.open("a") as f:
-            for st, sc in zip(states, scores, strict=True):
-                line = _create_line(
-                    st,
-                    sc,
-                    result,
-                    file if output_filename else None,
-                    output_final_score=output_final_score,
+        num_row = 0
+        for file, digest, duplicate, before, cached_record in zip(
+            files,
+            digests,
+            duplicates,
+            converted_before,
+            records,
+            strict=True,
+        ):
+            logger.debug("Parsing... : %s", file.name)
+            progress.update()
+
+            if before:
+                logger.debug("This file is converted before.: %s", file.name)
+                report.count("files_skipped", reason="converted_before")
+                continue
+            if duplicate:
+                logger.debug("This file is a duplicate.: %s", file.name)
+                report.count("files_skipped", reason="duplicate")
+                continue
+
+            record = cached_record
+            if record is None:
+                with report.time("wait"):
+                    _, data = next(contents)
+                record = _parse_game_record(
+                    file,
+                    data,
+                    report,
+                    fast=fast,
+                    cross_check=cross_check,
                 )
-                f.write(line)
-
+                if cache is not None:
+                    cache.put(file, record)
+            else:
+                report.count("files_cached")
+
+            if isinstance(record, SkippedRecord):
+                report.count(record.counter, reason=record.reason)
+                continue
+
+            if (record.num_player != num_player) or (
+                record.game_length != game_length
+            ):
+                logger.debug(
+                    "This mjlog is not a target.: %s-Player, %s",
+                    record.num_player,
+                    get_game_length_name(record.game_length),
+                )
+                report.count("games_skipped", reason="not_target")
+                continue
+
+            result = record.result.tolist()
+            with report.time("classify"):
+                rank_class = classify(result)
+
+            with report.time("write"):
+                for st, sc in zip(
+                    record.states.tolist(),
+                    record.scores.tolist(),
+                    strict=True,
+                ):
+                    line = _create_line(
+                        st,
+                        sc,
+                        result,
+                        rank_class,
+                        file if output_filename else None,
+                        output_final_score=output_final_score,
+                    )
+                    f.write(line)
+            report.count("games")
+            report.count("rows", len(record.states))
+            num_row += len(record.states)
+            if seen is not None and digest is not None:
+                seen.add(digest)
+
+    progress.close()
+    if seen is not None:
+        # The digests are saved only after the output is written.
+        seen.save()
+        logger.info("Digests are saved.: %s games", len(seen))
+        num_before = sum(converted_before)
+        num_copy = sum(duplicates) - num_before
+        if num_before or num_copy:
+            logger.info(
+                "Skipped %s game records converted by earlier runs and %s"
+                " copies of other game records.",
+                num_before,
+                num_copy,
+            )
+        if num_row == 0 and num_before:
+            logger.warning(
+                "No rows are written because the game records were"
+                " converted by earlier runs with the same file of"
+                " digests: %s. Use another file or none to convert them"
+                " again.",
+                seen.path,
+            )
+    if cache is not None:
+        cache.save()
+        logger.info("Cache is saved.: %s games", len(cache))
     logger.info("Conversion is complete.")
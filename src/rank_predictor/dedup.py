@@ -0,0 +1,123 @@
+"""Provides deduplication of game records by the hash of the content.
+
+The same game is often stored more than once, for example when it is
+downloaded again or a directory is mirrored. The files are identified by
+the BLAKE2b digest of their content, and the digests of the games that
+have been converted are kept in a text file, one per line, so that they
+are also skipped by later conversions.
+"""
+
+import hashlib
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final
+
+DIGEST_SIZE: Final[int] = 16
+"""The size of the digests in bytes."""
+
+
+def _new_hash() -> hashlib.blake2b:
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def hash_file(file: Path) -> str:
+    """Calculates the digest of the content of a file.
+
+    Args:
+        file: The path to the file.
+
+    Returns:
+        The digest as a hexadecimal string.
+    """
+    with file.open("rb") as f:
+        return hashlib.file_digest(f, _new_hash).hexdigest()
+
+
+def hash_files(files: Sequence[Path], num_thread: int = 8) -> list[str]:
+    """Calculates the digests of the contents of files in parallel.
+
+    Args:
+        files: The paths to the files.
+        num_thread: The number of threads to read and hash the files
+            with. Defaults to 8.
+
+    Returns:
+        The digests as hexadecimal strings in the order of `files`.
+    """
+    with ThreadPoolExecutor(num_thread, thread_name_prefix="hash") as pool:
+        return list(pool.map(hash_file, files))
+
+
+class SeenSet:
+    """The digests of the game records that have been converted.
+
+    Attributes:
+        path: The path to the file of the digests.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initializes the instance and loads the digests if they exist.
+
+        Args:
+            path: The path to the file of the digests.
+
+        Raises:
+            FileExistsError: If a directory with the same name as the
+                file exists.
+        """
+        if path.is_dir():
+            msg = f"A directory with the same name as the file exists: {path}"
+            raise FileExistsError(msg)
+
+        self.path = path
+        self._digests: set[str] = set()
+        if path.is_file():
+            with path.open() as f:
+                self._digests.update(line.strip() for line in f)
+            self._digests.discard("")
+        self._new: list[str] = []
+
+    def __len__(self) -> int:
+        """Returns the number of digests."""
+        return len(self._digests)
+
+    def __contains__(self, digest: object) -> bool:
+        """Returns whether the digest has been seen."""
+        return digest in self._digests
+
+    def add(self, digest: str) -> None:
+        """Adds a digest, which is written to the file by `save`.
+
+        Args:
+            digest: The digest to add.
+        """
+        if digest not in self._digests:
+            self._digests.add(digest)
+            self._new.append(digest)
+
+    def find_duplicates(self, digests: Sequence[str]) -> list[bool]:
+        """Finds the digests that have been seen or appear earlier.
+
+        Args:
+            digests: The digests of the game records in order.
+
+        Returns:
+            Whether each game record is a duplicate. The first of the
+                game records with the same digest is not a duplicate
+                unless the digest has been seen.
+        """
+        found = set(self._digests)
+        duplicates = []
+        for digest in digests:
+            duplicates.append(digest in found)
+            found.add(digest)
+        return duplicates
+
+    def save(self) -> None:
+        """Appends the digests added since the last save to the file."""
+        if not self._new:
+            return
+        with self.path.open("a") as f:
+            f.writelines(f"{digest}\n" for digest in self._new)
+        self._new.clear()
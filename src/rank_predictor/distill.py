@@ -0,0 +1,300 @@
+"""Provides distillation of a model into a faster one.
+
+A teacher model that is accurate but slow to predict is imitated by a
+student model that is fast enough to serve. The student is trained on
+states sampled from the valid state space, with the probabilities that
+the teacher predicts as soft labels: each state is repeated once per
+rank class and weighted by the probability of the class, so a
+classifier that minimizes the weighted log-loss, such as logistic
+regression, minimizes the cross-entropy from the teacher.
+"""
+
+from dataclasses import dataclass
+from typing import Final
+
+import numpy as np
+import polars as pl
+from sklearn.metrics import log_loss
+
+from rank_predictor.compare import measure_latency
+from rank_predictor.model import Classifier, Model
+from rank_predictor.payment import RIICHI_COST
+from rank_predictor.predict import Predictor
+from rank_predictor.report import RunReport
+from rank_predictor.train import extract, fit
+from rank_predictor.types import GameLength, NumPlayer, Round
+from rank_predictor.validate import TOTAL_SCORE_3, TOTAL_SCORE_4, check_states
+
+# The concentration of the shares of the scores. The larger it is, the
+# closer the sampled scores are to each other.
+_SCORE_CONCENTRATION: Final[float] = 4.0
+_COUNTER_STICK_PROBABILITY: Final[float] = 0.6
+_MEAN_RIICHI_DEPOSIT: Final[float] = 0.4
+
+
+def sample_states(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    num_state: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Samples valid states.
+
+    The rounds are uniform over the rounds of the game, the numbers of
+    counter sticks and riichi deposits are mostly small, and the scores
+    are spread around an equal split of the total score. Every state
+    passes `rank_predictor.validate.check_states`.
+
+    Args:
+        num_player: The number of players.
+        game_length: The length of the game.
+        num_state: The number of states to sample.
+        rng: The random number generator.
+
+    Returns:
+        The states as an array of integers of shape (`num_state`,
+            number of features), in the order of
+            `rank_predictor.train.get_feature_columns`, with the scores
+            in hundreds of points.
+    """
+    total_score = (
+        TOTAL_SCORE_4 if num_player == NumPlayer.FOUR else TOTAL_SCORE_3
+    )
+    num_round = (
+        Round.WEST_1 if game_length == GameLength.TONPU else (Round.WEST_4 + 1)
+    )
+    num_riichi_deposit = np.minimum(
+        rng.poisson(_MEAN_RIICHI_DEPOSIT, num_state),
+        total_score // RIICHI_COST,
+    )
+    share = rng.dirichlet(
+        np.full(num_player, _SCORE_CONCENTRATION),
+        num_state,
+    )
+
+    feature = np.empty((num_state, 3 + num_player), dtype=np.int64)
+    feature[:, 0] = rng.integers(Round.EAST_1, num_round, num_state)
+    feature[:, 1] = rng.geometric(_COUNTER_STICK_PROBABILITY, num_state) - 1
+    feature[:, 2] = num_riichi_deposit
+    feature[:, 3:] = rng.multinomial(
+        total_score - num_riichi_deposit * RIICHI_COST,
+        share,
+    )
+
+    valid, _ = check_states(
+        feature[:, 0],
+        feature[:, 1],
+        feature[:, 2],
+        feature[:, 3:],
+        num_player,
+        game_length,
+    )
+    return feature[valid]
+
+
+@dataclass(frozen=True)
+class DistillSummary:
+    """The summary of a distillation.
+
+    The agreement, divergence and error are measured on held-out
+    sampled states, and the log-losses and accuracies on the test data.
+
+    Attributes:
+        num_state: The number of sampled states the student is trained
+            on.
+        agreement: The fraction of the states for which the student and
+            the teacher predict the same most likely rank class.
+        kl_divergence: The mean Kullback-Leibler divergence of the
+            probabilities of the student from those of the teacher.
+        expected_rank_error: The mean absolute difference between the
+            expected ranks of the student and the teacher.
+        teacher_single_seconds: The median number of seconds of a
+            prediction for one state with the teacher.
+        student_single_seconds: The same for the student.
+        teacher_batch_seconds: The median number of seconds of a
+            prediction for a batch of states with the teacher.
+        student_batch_seconds: The same for the student.
+        teacher_log_loss: The log-loss of the teacher on the test data,
+            or None without test data.
+        student_log_loss: The same for the student.
+        teacher_accuracy: The accuracy of the rank classes of the
+            teacher on the test data, or None without test data.
+        student_accuracy: The same for the student.
+    """
+
+    num_state: int
+    agreement: float
+    kl_divergence: float
+    expected_rank_error: float
+    teacher_single_seconds: float
+    student_single_seconds: float
+    teacher_batch_seconds: float
+    student_batch_seconds: float
+    teacher_log_loss: float | None = None
+    student_log_loss: float | None = None
+    teacher_accuracy: float | None = None
+    student_accuracy: float | None = None
+
+
+def _get_classes(model: Model, num_class: int) -> np.ndarray:
+    return np.asarray(
+        getattr(model.classifier, "classes_", np.arange(num_class)),
+    )
+
+
+def _score_test_data(
+    model: Model,
+    feature: np.ndarray,
+    label: np.ndarray,
+) -> tuple[float, float]:
+    proba = model.classifier.predict_proba(feature)
+    classes = _get_classes(model, proba.shape[1])
+    return (
+        float(log_loss(label, proba, labels=classes)),
+        float(np.mean(classes[proba.argmax(axis=1)] == label)),
+    )
+
+
+def distill(
+    teacher: Model,
+    student: Classifier,
+    num_state: int,
+    seed: int = 0,
+    test_data: pl.DataFrame | None = None,
+    report: RunReport | None = None,
+    batch_size: int = 256,
+    repeat: int = 100,
+) -> tuple[Model, DistillSummary]:
+    """Trains a student model to imitate a teacher model.
+
+    Args:
+        teacher: The model to imitate.
+        student: The unfitted classifier of the student. It must accept
+            `sample_weight` in `fit`.
+        num_state: The number of sampled states to train the student on.
+            A fifth as many states, up to 10,000, are sampled to measure
+            the student.
+        seed: The seed of the random number generator. Defaults to 0.
+        test_data: The annotated data to measure the log-losses and the
+            accuracies on. If None, they are not measured. Defaults to
+            None.
+        report: The report to record the timings of the stages (`label`,
+            `fit` and `measure`) in. Defaults to None.
+        batch_size: The number of states in a batch to measure the
+            latency with. Defaults to 256.
+        repeat: The number of times each latency is measured. Defaults
+            to 100.
+
+    Returns:
+        The student model, which has the floating-point type of the
+            teacher, and the summary of the distillation.
+
+    Raises:
+        ValueError: If `num_state` is not positive or `test_data` is
+            invalid.
+    """
+    if num_state <= 0:
+        msg = f"`num_state` must be positive: {num_state}"
+        raise ValueError(msg)
+    if report is None:
+        report = RunReport()
+
+    num_player = teacher.num_player
+    game_length = teacher.game_length
+    dtype = teacher.dtype
+    rng = np.random.default_rng(seed)
+    num_held_out = min(max(num_state // 5, 1), 10_000)
+    states = sample_states(
+        num_player,
+        game_length,
+        num_state + num_held_out,
+        rng,
+    ).astype(dtype)
+    state, held_out = states[:num_state], states[num_state:]
+
+    with report.time("label"):
+        proba = teacher.classifier.predict_proba(state)
+    classes = _get_classes(teacher, proba.shape[1])
+    num_class = len(classes)
+
+    # Each state is repeated for each rank class and weighted by the
+    # probability of the class.
+    model = fit(
+        num_player,
+        game_length,
+        np.repeat(state, num_class, axis=0),
+        np.tile(classes, len(state)),
+        student,
+        report,
+        sample_weight=proba.ravel(),
+    )
+    report.count("rows", len(state) * num_class)
+
+    with report.time("measure"):
+        teacher_proba = teacher.classifier.predict_proba(held_out)
+        student_proba = model.classifier.predict_proba(held_out)
+        eps = np.finfo(teacher_proba.dtype).eps
+        kl_divergence = np.sum(
+            teacher_proba
+            * (
+                np.log(np.clip(teacher_proba, eps, 1.0))
+                - np.log(np.clip(student_proba, eps, 1.0))
+            ),
+            axis=1,
+        )
+        teacher_rank = Predictor(
+            teacher,
+            num_player,
+            game_length,
+        ).predict_feature(held_out)
+        student_rank = Predictor(
+            model,
+            num_player,
+            game_length,
+        ).predict_feature(held_out)
+        teacher_single, teacher_batch = measure_latency(
+            teacher,
+            held_out,
+            batch_size,
+            repeat,
+        )
+        student_single, student_batch = measure_latency(
+            model,
+            held_out,
+            batch_size,
+            repeat,
+        )
+
+    teacher_score: tuple[float | None, float | None] = (None, None)
+    student_score: tuple[float | None, float | None] = (None, None)
+    if test_data is not None:
+        test_feature, test_label = extract(
+            num_player,
+            game_length,
+            test_data,
+            report,
+            dtype,
+        )
+        with report.time("measure"):
+            teacher_score = _score_test_data(teacher, test_feature, test_label)
+            student_score = _score_test_data(model, test_feature, test_label)
+
+    agreement = teacher_proba.argmax(axis=1) == student_proba.argmax(axis=1)
+    expected_rank_error = np.abs(
+        student_rank.expected_rank - teacher_rank.expected_rank,
+    )
+    summary = DistillSummary(
+        num_state=len(state),
+        agreement=float(np.mean(agreement)),
+        kl_divergence=float(np.mean(kl_divergence)),
+        expected_rank_error=float(np.mean(expected_rank_error)),
+        teacher_single_seconds=teacher_single,
+        student_single_seconds=student_single,
+        teacher_batch_seconds=teacher_batch,
+        student_batch_seconds=student_batch,
+        teacher_log_loss=teacher_score[0],
+        student_log_loss=student_score[0],
+        teacher_accuracy=teacher_score[1],
+        student_accuracy=student_score[1],
+    )
+    return model, summary
@@ -0,0 +1,139 @@
+"""Provides a cache of the features extracted from annotated data.
+
+Reading, validating and extracting the annotated data takes longer than
+training a small model on it, and it is repeated by each run on the
+same data. The cache stores the validated features and labels as `.npy`
+files that are memory-mapped by later runs. An entry is identified by
+the digest of the content of the data file, the number of players, the
+length of the game, the feature columns and the floating-point type, so
+an entry is never reused for data that has changed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Final
+
+import numpy as np
+
+from rank_predictor.types import GameLength, NumPlayer
+
+_FEATURE_FILE: Final[str] = "feature.npy"
+_LABEL_FILE: Final[str] = "label.npy"
+
+
+def _get_default_directory_mode() -> int:
+    # The umask can only be read by setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o777 & ~umask
+
+
+class FeatureCache:
+    """A cache of the features extracted from annotated data.
+
+    Attributes:
+        directory: The directory of the cache. Each entry is a
+            subdirectory named after its key.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Initializes the instance and creates the directory.
+
+        Args:
+            directory: The directory of the cache.
+
+        Raises:
+            FileExistsError: If a file with the same name as the
+                directory exists.
+        """
+        if directory.exists() and not directory.is_dir():
+            msg = f"A file with the same name as the cache exists: {directory}"
+            raise FileExistsError(msg)
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+
+    @staticmethod
+    def key(
+        digest: str,
+        num_player: NumPlayer,
+        game_length: GameLength,
+        columns: Sequence[str],
+        dtype: np.dtype,
+    ) -> str:
+        """Calculates the key of an entry.
+
+        Args:
+            digest: The digest of the content of the data file, such as
+                one calculated by `rank_predictor.dedup.hash_file`.
+            num_player: The number of players.
+            game_length: The length of the game.
+            columns: The names of the feature columns in order.
+            dtype: The floating-point type of the features.
+
+        Returns:
+            The key as a hexadecimal string.
+        """
+        identity = json.dumps(
+            [
+                digest,
+                int(num_player),
+                str(game_length),
+                list(columns),
+                np.dtype(dtype).str,
+            ],
+        )
+        return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+    def load(self, key: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """Maps the features and the labels of an entry into memory.
+
+        Args:
+            key: The key of the entry.
+
+        Returns:
+            The read-only features and labels, or None if the entry does
+                not exist.
+        """
+        entry = self.directory / key
+        if not entry.is_dir():
+            return None
+        try:
+            feature = np.load(entry / _FEATURE_FILE, mmap_mode="r")
+            label = np.load(entry / _LABEL_FILE, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        return feature, label
+
+    def save(self, key: str, feature: np.ndarray, label: np.ndarray) -> None:
+        """Stores the features and the labels as an entry.
+
+        The entry is written to a temporary directory and renamed, so an
+        interrupted run does not leave a broken entry. If another run
+        stores the same entry at the same time, one of them is kept.
+        The entry gets the permissions of a directory created with
+        `mkdir`, so that other users can share the cache.
+
+        Args:
+            key: The key of the entry.
+            feature: The features.
+            label: The labels.
+        """
+        tmp = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        try:
+            np.save(tmp / _FEATURE_FILE, feature, allow_pickle=False)
+            np.save(tmp / _LABEL_FILE, label, allow_pickle=False)
+            tmp.chmod(_get_default_directory_mode())
+            try:
+                tmp.rename(self.directory / key)
+            except OSError:
+                # The entry has been stored by another run.
+                if not (self.directory / key).is_dir():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,629 @@
+"""Provides a tool for generating synthetic game records.
+
+The games are simulated with simplified rules of Tenhou (天鳳), so that
+the scores, the number of rounds and the final ranks follow realistic
+distributions. The generated data can be written as mjlog files that
+`rank_predictor.convert.convert` accepts, or directly as annotated data.
+"""
+
+import math
+import multiprocessing
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from logging import getLogger
+from pathlib import Path
+from typing import Final
+
+import polars as pl
+
+from rank_predictor.payment import (
+    NOTEN_PENALTY_3,
+    NOTEN_PENALTY_4,
+    RETURN_SCORE_3,
+    RETURN_SCORE_4,
+    RIICHI_COST,
+    basic_points,
+    next_round,
+)
+from rank_predictor.rank import classify
+from rank_predictor.types import (
+    DataName,
+    GameLength,
+    NumPlayer,
+    get_game_length_name,
+)
+
+logger = getLogger(__name__)
+
+SEED_BLOCK_SIZE: Final[int] = 1_000
+"""The number of games generated from one seed.
+
+Games are generated in blocks, and each block has its own random number
+generator derived from the seed and the block index. Therefore, the
+output does not depend on the number of workers.
+"""
+
+_BLOCKS_PER_TASK_ANNOTATED_DATA: Final[int] = 100
+
+# Polars is not fork-safe once its thread pool is running.
+_MP_CONTEXT: Final = multiprocessing.get_context("spawn")
+
+_START_SCORE_4: Final[int] = 250
+_START_SCORE_3: Final[int] = 350
+_UMA_4: Final[tuple[int, ...]] = (20, 10, -10, -20)
+_UMA_3: Final[tuple[int, ...]] = (15, 0, -15)
+
+_RIICHI_PROBABILITY: Final[float] = 0.12
+_AGARI_PROBABILITY: Final[float] = 0.85
+_TSUMO_PROBABILITY: Final[float] = 0.35
+_TENPAI_PROBABILITY: Final[float] = 0.45
+
+# (han, fu) of winning hands and their relative frequencies.
+_HAND_VALUES: Final = (
+    (1, 30),
+    (1, 40),
+    (2, 25),
+    (2, 30),
+    (2, 40),
+    (3, 30),
+    (3, 40),
+    (4, 30),
+    (5, 30),
+    (6, 30),
+    (8, 30),
+    (11, 30),
+    (13, 30),
+)
+_HAND_WEIGHTS: Final = (14, 10, 4, 16, 9, 12, 7, 7, 12, 5, 3, 0.5, 0.5)
+
+_NUM_TILE: Final[int] = 136
+_NUM_HAND_TILE: Final[int] = 13
+_DRAW_TAGS: Final = "TUVW"
+_DISCARD_TAGS: Final = "DEFG"
+_GO_TYPE_BASE: Final[int] = 0x0A1
+_GO_TYPE_HANCHAN: Final[int] = 0x008
+_GO_TYPE_THREE_PLAYER: Final[int] = 0x010
+
+
+@dataclass
+class _SimulatedRound:
+    round_: int
+    num_counter_stick: int
+    num_riichi_deposit: int
+    score: list[int]
+    riichi: list[int] = field(default_factory=list)
+    who: int | None = None
+    from_who: int | None = None
+    hand: tuple[int, int] | None = None
+    score_before: list[int] = field(default_factory=list)
+    delta: list[int] = field(default_factory=list)
+
+
+@dataclass
+class _SimulatedGame:
+    rounds: list[_SimulatedRound]
+    final_score: list[int]
+
+
+def _top_player(score: list[int]) -> int:
+    # Ties are broken by seat order, same as `classify`.
+    return max(range(len(score)), key=lambda i: (score[i], -i))
+
+
+def _ceil_hundred(points: int) -> int:
+    # Returns points rounded up to 100 in units of 100.
+    return math.ceil(points / 100)
+
+
+def _play_agari(
+    rng: random.Random,
+    num_player: NumPlayer,
+    record: _SimulatedRound,
+    dealer: int,
+    delta: list[int],
+) -> int:
+    winner = rng.randrange(num_player)
+    han, fu = rng.choices(_HAND_VALUES, weights=_HAND_WEIGHTS)[0]
+    points = basic_points(han, fu)
+    honba = record.num_counter_stick
+
+    if rng.random() < _TSUMO_PROBABILITY:
+        loser = winner
+        for p in range(num_player):
+            if p == winner:
+                continue
+            is_dealer_involved = dealer in (winner, p)
+            payment = (
+                _ceil_hundred(points * (2 if is_dealer_involved else 1))
+                + honba
+            )
+            delta[p] -= payment
+            delta[winner] += payment
+    else:
+        loser = rng.choice([p for p in range(num_player) if p != winner])
+        payment = (
+            _ceil_hundred(points * (6 if winner == dealer else 4)) + 3 * honba
+        )
+        delta[loser] -= payment
+        delta[winner] += payment
+
+    record.who = winner
+    record.from_who = loser
+    record.hand = (han, fu)
+    return winner
+
+
+def _play_ryuukyoku(
+    rng: random.Random,
+    num_player: NumPlayer,
+    dealer: int,
+    delta: list[int],
+) -> bool:
+    tenpai = [rng.random() < _TENPAI_PROBABILITY for _ in range(num_player)]
+    num_tenpai = sum(tenpai)
+    if 0 < num_tenpai < num_player:
+        penalty = (
+            NOTEN_PENALTY_4
+            if num_player == NumPlayer.FOUR
+            else NOTEN_PENALTY_3
+        )
+        for p in range(num_player):
+            if tenpai[p]:
+                delta[p] += penalty // num_tenpai
+            else:
+                delta[p] -= penalty // (num_player - num_tenpai)
+    return tenpai[dealer]
+
+
+def _simulate_game(
+    rng: random.Random,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> _SimulatedGame:
+    if num_player == NumPlayer.FOUR:
+        start_score, return_score = _START_SCORE_4, RETURN_SCORE_4
+    else:
+        start_score, return_score = _START_SCORE_3, RETURN_SCORE_3
+    # The game goes into the extra wind if nobody reaches the return
+    # score at the end of the regular rounds.
+    regular_end = 4 if game_length == GameLength.TONPU else 8
+    extra_end = regular_end + 4
+
+    score = [start_score] * num_player
+    round_ = 0
+    num_counter_stick = 0
+    num_riichi_deposit = 0
+    rounds: list[_SimulatedRound] = []
+
+    while True:
+        dealer = round_ % NumPlayer.FOUR
+        record = _SimulatedRound(
+            round_=round_,
+            num_counter_stick=num_counter_stick,
+            num_riichi_deposit=num_riichi_deposit,
+            score=score.copy(),
+        )
+        rounds.append(record)
+
+        for p in range(num_player):
+            if score[p] < RIICHI_COST:
+                continue
+            if rng.random() < _RIICHI_PROBABILITY:
+                score[p] -= RIICHI_COST
+                num_riichi_deposit += 1
+                record.riichi.append(p)
+        record.score_before = score.copy()
+
+        delta = [0] * num_player
+        if rng.random() < _AGARI_PROBABILITY:
+            winner = _play_agari(rng, num_player, record, dealer, delta)
+            delta[winner] += num_riichi_deposit * RIICHI_COST
+            renchan = winner == dealer
+            num_riichi_deposit = 0
+            num_counter_stick = num_counter_stick + 1 if renchan else 0
+        else:
+            renchan = _play_ryuukyoku(rng, num_player, dealer, delta)
+            num_counter_stick += 1
+        record.delta = delta
+        score = [s + d for s, d in zip(score, delta, strict=True)]
+
+        following_round = next_round(round_, num_player)
+        new_round = round_ if renchan else following_round
+        is_all_last = following_round >= regular_end
+        if any(s < 0 for s in score) or new_round >= extra_end:
+            break
+        if renchan:
+            # Agari-yame: the dealer may end the game as the top player.
+            if (
+                is_all_last
+                and _top_player(score) == dealer
+                and score[dealer] >= return_score
+            ):
+                break
+        elif new_round >= regular_end and max(score) >= return_score:
+            break
+        round_ = new_round
+
+    # The remaining riichi deposits go to the top player.
+    score[_top_player(score)] += num_riichi_deposit * RIICHI_COST
+    return _SimulatedGame(rounds=rounds, final_score=score)
+
+
+def _create_owari(game: _SimulatedGame, num_player: NumPlayer) -> str:
+    if num_player == NumPlayer.FOUR:
+        start_score, return_score, uma = (
+            _START_SCORE_4,
+            RETURN_SCORE_4,
+            _UMA_4,
+        )
+    else:
+        start_score, return_score, uma = (
+            _START_SCORE_3,
+            RETURN_SCORE_3,
+            _UMA_3,
+        )
+    oka = (return_score - start_score) * num_player // 10
+
+    final_score = game.final_score
+    order = sorted(
+        range(num_player),
+        key=lambda i: final_score[i],
+        reverse=True,
+    )
+    owari: list[str] = []
+    for player, s in enumerate(final_score):
+        rank = order.index(player)
+        bonus = uma[rank] + (oka if rank == 0 else 0)
+        # `s` is in units of 100, and the points are in units of 1,000.
+        owari.append(f"{s},{(s - return_score + bonus * 10) / 10:.1f}")
+    if num_player == NumPlayer.THREE:
+        owari.append("0,0.0")
+    return ",".join(owari)
+
+
+def _create_sc(record: _SimulatedRound, num_player: NumPlayer) -> str:
+    sc = [
+        f"{b},{d}"
+        for b, d in zip(record.score_before, record.delta, strict=True)
+    ]
+    if num_player == NumPlayer.THREE:
+        sc.append("0,0")
+    return ",".join(sc)
+
+
+def _create_mjlog(
+    rng: random.Random,
+    game: _SimulatedGame,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> str:
+    game_type = _GO_TYPE_BASE
+    if game_length == GameLength.HANCHAN:
+        game_type |= _GO_TYPE_HANCHAN
+    if num_player == NumPlayer.THREE:
+        game_type |= _GO_TYPE_THREE_PLAYER
+
+    names = "".join(
+        f' n{i}="%53%79%6E%74%68%{0x41 + i:X}"' for i in range(num_player)
+    )
+    tags = [
+        '<mjloggm ver="2.3">',
+        f'<GO type="{game_type}" lobby="0"/>',
+        f'<UN{names} dan="" rate="" sx=""/>',
+        '<TAIKYOKU oya="0"/>',
+    ]
+
+    for i, record in enumerate(game.rounds):
+        dealer = record.round_ % NumPlayer.FOUR
+        tiles = rng.sample(range(_NUM_TILE), _NUM_TILE)
+        hands = [
+            ",".join(
+                map(str, tiles[p * _NUM_HAND_TILE : (p + 1) * _NUM_HAND_TILE]),
+            )
+            if p < num_player
+            else ""
+            for p in range(NumPlayer.FOUR)
+        ]
+        ten = [*map(str, record.score), "0"][: NumPlayer.FOUR]
+        seed = (
+            f"{record.round_},{record.num_counter_stick},"
+            f"{record.num_riichi_deposit},{rng.randrange(6)},"
+            f"{rng.randrange(6)},{tiles[-1]}"
+        )
+        tags.append(
+            f'<INIT seed="{seed}" ten="{",".join(ten)}" oya="{dealer}"'
+            + "".join(f' hai{p}="{h}"' for p, h in enumerate(hands))
+            + "/>",
+        )
+
+        num_turn = rng.randrange(20, 70)
+        running_score = record.score.copy()
+        for turn in range(num_turn):
+            p = (dealer + turn) % num_player
+            tile = tiles[num_player * _NUM_HAND_TILE + turn]
+            tags.append(f"<{_DRAW_TAGS[p]}{tile}/><{_DISCARD_TAGS[p]}{tile}/>")
+            if turn == num_turn // 2:
+                for r in record.riichi:
+                    running_score[r] -= 10
+                    tags.append(
+                        f'<REACH who="{r}" step="1"/>'
+                        f'<REACH who="{r}"'
+                        f' ten="{",".join(map(str, running_score))}"'
+                        ' step="2"/>',
+                    )
+
+        ba_deposit = record.num_riichi_deposit + len(record.riichi)
+        ba = f"{record.num_counter_stick},{ba_deposit}"
+        owari = (
+            f' owari="{_create_owari(game, num_player)}"'
+            if i == len(game.rounds) - 1
+            else ""
+        )
+        if record.who is not None and record.hand is not None:
+            han, fu = record.hand
+            points = record.delta[record.who] * 100
+            tags.append(
+                f'<AGARI ba="{ba}" ten="{fu},{points},0" yaku="0,{han}"'
+                f' who="{record.who}" fromWho="{record.from_who}"'
+                f' sc="{_create_sc(record, num_player)}"{owari}/>',
+            )
+        else:
+            tags.append(
+                f'<RYUUKYOKU ba="{ba}"'
+                f' sc="{_create_sc(record, num_player)}"{owari}/>',
+            )
+
+    tags.append("</mjloggm>")
+    return "".join(tags)
+
+
+def _create_block_rngs(
+    seed: int,
+    block: int,
+) -> tuple[random.Random, random.Random]:
+    # The games and the details of the mjlog, such as the tiles, use
+    # separate generators, so that annotated data can be generated
+    # without creating the mjlog.
+    game_rng = random.Random(f"{seed}:{block}")  # noqa: S311
+    mjlog_rng = random.Random(f"{seed}:{block}:mjlog")  # noqa: S311
+    return (game_rng, mjlog_rng)
+
+
+def _create_filename(game_index: int, game_record_extension: str) -> str:
+    return f"{game_index:010d}.{game_record_extension}"
+
+
+def _generate_game_record_block(
+    block: int,
+    *,
+    num_player: NumPlayer,
+    game_length: GameLength,
+    game_record_dir: Path,
+    game_record_extension: str,
+    num_game: int,
+    seed: int,
+) -> int:
+    game_rng, mjlog_rng = _create_block_rngs(seed, block)
+    start = block * SEED_BLOCK_SIZE
+    stop = min(start + SEED_BLOCK_SIZE, num_game)
+    for game_index in range(start, stop):
+        game = _simulate_game(game_rng, num_player, game_length)
+        mjlog = _create_mjlog(mjlog_rng, game, num_player, game_length)
+        path = game_record_dir / _create_filename(
+            game_index,
+            game_record_extension,
+        )
+        path.write_text(mjlog)
+    return stop - start
+
+
+def _generate_annotated_data_part(
+    task: int,
+    *,
+    num_player: NumPlayer,
+    game_length: GameLength,
+    part_dir: Path,
+    game_record_extension: str,
+    num_game: int,
+    seed: int,
+    output_final_score: bool,
+    output_filename: bool,
+) -> Path:
+    schema: dict[str, type[pl.DataType]] = {
+        DataName.ROUND: pl.Int64,
+        DataName.NUM_COUNTER_STICK: pl.Int64,
+        DataName.NUM_RIICHI_DEPOSIT: pl.Int64,
+        **{f"{DataName.SCORE}_{i}": pl.Int64 for i in range(num_player)},
+        DataName.RANK_CLASS: pl.Int64,
+    }
+    if output_final_score:
+        for i in range(num_player):
+            schema[f"{DataName.FINAL_SCORE}_{i}"] = pl.Int64
+    if output_filename:
+        schema["filename"] = pl.String
+    columns: dict[str, list] = {name: [] for name in schema}
+
+    first_block = task * _BLOCKS_PER_TASK_ANNOTATED_DATA
+    for block in range(
+        first_block,
+        first_block + _BLOCKS_PER_TASK_ANNOTATED_DATA,
+    ):
+        game_rng, _ = _create_block_rngs(seed, block)
+        start = block * SEED_BLOCK_SIZE
+        stop = min(start + SEED_BLOCK_SIZE, num_game)
+        for game_index in range(start, stop):
+            game = _simulate_game(game_rng, num_player, game_length)
+            rank_class = classify(game.final_score)
+            filename = _create_filename(game_index, game_record_extension)
+            for record in game.rounds:
+                columns[DataName.ROUND].append(record.round_)
+                columns[DataName.NUM_COUNTER_STICK].append(
+                    record.num_counter_stick,
+                )
+                columns[DataName.NUM_RIICHI_DEPOSIT].append(
+                    record.num_riichi_deposit,
+                )
+                for i, s in enumerate(record.score):
+                    columns[f"{DataName.SCORE}_{i}"].append(s)
+                columns[DataName.RANK_CLASS].append(rank_class)
+                if output_final_score:
+                    for i, s in enumerate(game.final_score):
+                        columns[f"{DataName.FINAL_SCORE}_{i}"].append(s)
+                if output_filename:
+                    columns["filename"].append(filename)
+
+    part = part_dir / f"part-{task:08d}.parquet"
+    pl.DataFrame(columns, schema=schema).write_parquet(part)
+    return part
+
+
+def generate_game_records(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    game_record_dir: Path,
+    game_record_extension: str,
+    num_game: int,
+    seed: int = 0,
+    num_worker: int | None = None,
+) -> None:
+    """Generates synthetic game records in mjlog format.
+
+    One file is created per game. The files are named by the index of
+    the game, for example `0000000000.xml`.
+
+    Args:
+        num_player: The number of players in the games.
+        game_length: The length of the games.
+        game_record_dir: The directory to save the game records in. It
+            is created if it does not exist.
+        game_record_extension: The file extension of the game records.
+        num_game: The number of games to generate.
+        seed: The seed of the random number generator. Defaults to 0.
+        num_worker: The number of worker processes. If None, the number
+            of processors is used. Defaults to None.
+
+    Raises:
+        FileExistsError: If a file with the same name as
+            `game_record_dir` exists.
+        ValueError: If `num_game` is negative.
+    """
+    if game_record_dir.exists() and not game_record_dir.is_dir():
+        msg = (
+            "A file with the same name as `game_record_dir` exists:"
+            f" {game_record_dir}"
+        )
+        raise FileExistsError(msg)
+    if num_game < 0:
+        msg = f"`num_game` must be greater than or equal to 0.: {num_game}"
+        raise ValueError(msg)
+
+    logger.info(
+        "Generation target: %s-Player, %s",
+        num_player,
+        get_game_length_name(game_length),
+    )
+
+    game_record_dir.mkdir(parents=True, exist_ok=True)
+    generate_block = partial(
+        _generate_game_record_block,
+        num_player=num_player,
+        game_length=game_length,
+        game_record_dir=game_record_dir,
+        game_record_extension=game_record_extension,
+        num_game=num_game,
+        seed=seed,
+    )
+    num_block = math.ceil(num_game / SEED_BLOCK_SIZE)
+    with ProcessPoolExecutor(num_worker, _MP_CONTEXT) as executor:
+        num_generated = sum(executor.map(generate_block, range(num_block)))
+
+    logger.info("Generation is complete.: %s games", num_generated)
+
+
+def generate_annotated_data(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    annotated_data: Path,
+    num_game: int,
+    seed: int = 0,
+    num_worker: int | None = None,
+    game_record_extension: str = "xml",
+    *,
+    output_final_score: bool,
+    output_filename: bool,
+) -> None:
+    """Generates synthetic annotated data.
+
+    The output contains the same rows that `rank_predictor.convert`
+    would create from the game records generated by
+    `generate_game_records` with the same arguments. If the extension of
+    `annotated_data` is `.parquet`, the data is saved in Parquet format,
+    otherwise it is saved in CSV format.
+
+    Args:
+        num_player: The number of players in the games.
+        game_length: The length of the games.
+        annotated_data: The destination path for the annotated data.
+        num_game: The number of games to generate.
+        seed: The seed of the random number generator. Defaults to 0.
+        num_worker: The number of worker processes. If None, the number
+            of processors is used. Defaults to None.
+        game_record_extension: The file extension used for the
+            filenames in the annotated data. Defaults to "xml".
+        output_final_score: If True, includes the final scores in the
+            annotated data.
+        output_filename: If True, includes the filenames in the
+            annotated data.
+
+    Raises:
+        FileExistsError: If a directory with the same name as the output
+            file already exists.
+        ValueError: If `num_game` is negative.
+    """
+    if annotated_data.is_dir():
+        msg = (
+            "A directory with the same name as `annotated_data` exists:"
+            f" {annotated_data}"
+        )
+        raise FileExistsError(msg)
+    if num_game < 0:
+        msg = f"`num_game` must be greater than or equal to 0.: {num_game}"
+        raise ValueError(msg)
+
+    logger.info(
+        "Generation target: %s-Player, %s",
+        num_player,
+        get_game_length_name(game_length),
+    )
+
+    with tempfile.TemporaryDirectory(dir=annotated_data.parent) as tmp:
+        generate_part = partial(
+            _generate_annotated_data_part,
+            num_player=num_player,
+            game_length=game_length,
+            part_dir=Path(tmp),
+            game_record_extension=game_record_extension,
+            num_game=num_game,
+            seed=seed,
+            output_final_score=output_final_score,
+            output_filename=output_filename,
+        )
+        num_task = max(
+            math.ceil(
+                num_game / (SEED_BLOCK_SIZE * _BLOCKS_PER_TASK_ANNOTATED_DATA),
+            ),
+            1,
+        )
+        with ProcessPoolExecutor(num_worker, _MP_CONTEXT) as executor:
+            parts = list(executor.map(generate_part, range(num_task)))
+
+        data = pl.scan_parquet(parts)
+        if annotated_data.suffix == ".parquet":
+            data.sink_parquet(annotated_data)
+        else:
+            data.sink_csv(annotated_data)
+
+    logger.info("Generation is complete.: %s games", num_game)
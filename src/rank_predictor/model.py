@@ -2,9 +2,14 @@
 
 # ruff: noqa: N803
 
-from typing import Protocol, Self
+import mmap
+import pickle
+import struct
+from pathlib import Path
+from typing import Final, Protocol, Self
 
 import numpy as np
+import numpy.typing as npt
 
 from rank_predictor.types import GameLength, NumPlayer
 
@@ -43,6 +48,10 @@ class Classifier(Protocol):
         ...
 
 
+SUPPORTED_DTYPES: Final = (np.dtype(np.float64), np.dtype(np.float32))
+"""The floating-point types that a model can use for its features."""
+
+
 class Model:
     """The classifier model used to predict the rank class.
 
@@ -54,13 +63,29 @@ class Model:
         num_player: The number of players that the model supports.
         game_length: The length of the game that the model supports.
         classifier: The classifier to use for prediction.
+        dtype: The floating-point type of the features that the
+            classifier is trained with and predicts from. Models saved
+            before this attribute was added use float64.
+        num_row: The number of rows the classifier has been trained
+            with, or 0 if unknown, as for models saved before this
+            attribute was added.
+        fit_seconds: The number of seconds that fitting the classifier
+            with all of `num_row` rows took or is estimated to take, or
+            0.0 if unknown.
     """
 
+    dtype: np.dtype = np.dtype(np.float64)
+    num_row: int = 0
+    fit_seconds: float = 0.0
+
     def __init__(
         self,
         num_player: NumPlayer,
         game_length: GameLength,
         classifier: Classifier,
+        dtype: npt.DTypeLike = np.float64,
+        num_row: int = 0,
+        fit_seconds: float = 0.0,
     ) -> None:
         """Initializes the instance of `Model`.
 
@@ -68,7 +93,126 @@ class Model:
             num_player: The number of players that the model supports.
             game_length: The length of the game that the model supports.
             classifier: The classifier to use for prediction.
+            dtype: The floating-point type of the features. Defaults to
+                float64.
+            num_row: The number of rows the classifier has been trained
+                with. Defaults to 0.
+            fit_seconds: The number of seconds that fitting the
+                classifier took. Defaults to 0.0.
+
+        Raises:
+            ValueError: If `dtype` is not in `SUPPORTED_DTYPES`.
         """
+        dtype = np.dtype(dtype)
+        if dtype not in SUPPORTED_DTYPES:
+            msg = f"`dtype` must be float64 or float32: {dtype}"
+            raise ValueError(msg)
+
         self.num_player = num_player
         self.game_length = game_length
         self.classifier = classifier
+        self.dtype = dtype
+        self.num_row = num_row
+        self.fit_seconds = fit_seconds
+
+
+_MAPPED_MAGIC: Final[bytes] = b"RPMODEL1"
+_MAPPED_HEADER: Final = struct.Struct("<8sQQ")
+_MAPPED_ENTRY: Final = struct.Struct("<QQ")
+_MAPPED_ALIGNMENT: Final[int] = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _MAPPED_ALIGNMENT) * _MAPPED_ALIGNMENT
+
+
+def save_mapped_model(model: Model, path: Path) -> None:
+    """Saves a model in a format that can be memory-mapped.
+
+    The arrays of the classifier are stored outside of the pickle data,
+    aligned to 64 bytes, so that `load_mapped_model` can use them in
+    place without copying them.
+
+    Args:
+        model: The model to save.
+        path: The destination path for the model.
+    """
+    buffers: list[pickle.PickleBuffer] = []
+    data = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = _align(
+        _MAPPED_HEADER.size + _MAPPED_ENTRY.size * len(raws) + len(data),
+    )
+    entries = []
+    for raw in raws:
+        entries.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    with path.open("wb") as f:
+        f.write(_MAPPED_HEADER.pack(_MAPPED_MAGIC, len(data), len(raws)))
+        for entry in entries:
+            f.write(_MAPPED_ENTRY.pack(*entry))
+        f.write(data)
+        for (start, _), raw in zip(entries, raws, strict=True):
+            f.write(bytes(start - f.tell()))
+            f.write(raw)
+
+
+def load_mapped_model(path: Path) -> Model:
+    """Loads a model saved by `save_mapped_model`.
+
+    The arrays of the classifier are read-only views of the
+    memory-mapped file, so processes that load the same file share one
+    copy of them.
+    As with `pickle`, only load files that you trust.
+
+    Args:
+        path: The path to the model.
+
+    Returns:
+        The loaded model.
+
+    Raises:
+        ValueError: If the file is not saved by `save_mapped_model`.
+        TypeError: If the loaded object is not an instance of `Model`.
+    """
+    with path.open("rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, data_size, num_buffer = _MAPPED_HEADER.unpack_from(view)
+    if magic != _MAPPED_MAGIC:
+        msg = f"The file is not a memory-mappable model: {path}"
+        raise ValueError(msg)
+
+    entries = [
+        _MAPPED_ENTRY.unpack_from(
+            view,
+            _MAPPED_HEADER.size + _MAPPED_ENTRY.size * i,
+        )
+        for i in range(num_buffer)
+    ]
+    start = _MAPPED_HEADER.size + _MAPPED_ENTRY.size * num_buffer
+    model = pickle.loads(  # noqa: S301
+        view[start : start + data_size],
+        buffers=[view[offset : offset + size] for offset, size in entries],
+    )
+    if not isinstance(model, Model):
+        msg = "The loaded object is not an instance of `Model`."
+        raise TypeError(msg)
+    return model
+
+
+def is_mapped_model(path: Path) -> bool:
+    """Checks if a file is saved by `save_mapped_model`.
+
+    Args:
+        path: The path to the file.
+
+    Returns:
+        True if the file starts with the header of a memory-mappable
+            model, otherwise False.
+    """
+    with path.open("rb") as f:
+        return f.read(len(_MAPPED_MAGIC)) == _MAPPED_MAGIC
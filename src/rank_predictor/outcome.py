@@ -0,0 +1,189 @@
+"""Provides evaluation of the candidate results of the current round.
+
+A decision-support tool asks how each possible result of the current
+hand, such as each ron or tsumo payment or a draw with tenpai payments,
+would shift the expected rank of each player. `evaluate_outcomes` builds
+the next states of all the results at once, validates them as arrays
+and predicts them with one call of the classifier.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from rank_predictor.predict import GameState, Prediction, Predictor
+from rank_predictor.validate import InvalidReason, check_states
+
+
+@dataclass(frozen=True)
+class Outcomes:
+    """The candidate results of the current round.
+
+    Each attribute has a row per result.
+
+    Attributes:
+        score_delta: The changes of the players' scores in hundreds of
+            points, including the riichi deposits paid in the round and
+            collected by the winner, as an array of shape (number of
+            results, number of players).
+        round_: The round that follows the result.
+        num_counter_stick: The number of counter sticks in the round
+            that follows the result.
+        num_riichi_deposit: The number of riichi deposits left on the
+            table after the result.
+        game_over: Whether the game ends with the result. The final
+            ranks of such a result are determined by the scores, and
+            `round_` is ignored.
+    """
+
+    score_delta: npt.ArrayLike
+    round_: npt.ArrayLike
+    num_counter_stick: npt.ArrayLike
+    num_riichi_deposit: npt.ArrayLike
+    game_over: npt.ArrayLike = False
+
+
+@dataclass(frozen=True)
+class OutcomeEvaluation:
+    """The predicted final ranks after each candidate result.
+
+    The attributes other than `base` have a row per result. The rows of
+    invalid results are NaN.
+
+    Attributes:
+        base: The prediction for the current state.
+        valid: Whether each result leads to a valid state.
+        reason: The `rank_predictor.validate.InvalidReason` flags of
+            each result.
+        score: The scores after each result in hundreds of points.
+        player_rank_proba: The probabilities of each player's rank.
+        expected_rank: The expected rank of each player.
+        expected_rank_shift: The change of the expected rank of each
+            player from the current state.
+    """
+
+    base: Prediction
+    valid: np.ndarray
+    reason: np.ndarray
+    score: np.ndarray
+    player_rank_proba: np.ndarray
+    expected_rank: np.ndarray
+    expected_rank_shift: np.ndarray
+
+
+def _final_rank_proba(score: np.ndarray) -> np.ndarray:
+    # One-hot ranks by the final scores. Ties are broken by the seat
+    # order, as in `rank_predictor.rank.classify`.
+    num_result, num_player = score.shape
+    order = np.argsort(-score, axis=1, kind="stable")
+    proba = np.zeros((num_result, num_player, num_player))
+    rows = np.arange(num_result)[:, np.newaxis]
+    proba[rows, order, np.arange(num_player)] = 1.0
+    return proba
+
+
+def evaluate_outcomes(
+    predictor: Predictor,
+    state: GameState,
+    outcomes: Outcomes,
+) -> OutcomeEvaluation:
+    """Predicts the final ranks after each candidate result.
+
+    The current state and the states that follow the results are
+    predicted with one call of the classifier. The states are checked
+    with `rank_predictor.validate.check_states`, except that a score
+    may be out of range and the round is not checked if the game ends.
+
+    Args:
+        predictor: The predictor to use.
+        state: The current state, which is assumed to be valid.
+        outcomes: The candidate results of the current round.
+
+    Returns:
+        The predictions for the results.
+
+    Raises:
+        ValueError: If the shapes of the arrays of `outcomes` do not
+            match each other or the number of players.
+    """
+    num_player = predictor.num_player
+    score_delta = np.asarray(outcomes.score_delta, dtype=np.int64)
+    if score_delta.ndim != 2 or score_delta.shape[1] != num_player:  # noqa: PLR2004
+        msg = (
+            "`score_delta` must have a column per player."
+            f": {score_delta.shape}"
+        )
+        raise ValueError(msg)
+
+    num_result = len(score_delta)
+    try:
+        round_, num_counter_stick, num_riichi_deposit, game_over = (
+            np.broadcast_to(np.asarray(a, dtype=dtype), (num_result,))
+            for a, dtype in (
+                (outcomes.round_, np.int64),
+                (outcomes.num_counter_stick, np.int64),
+                (outcomes.num_riichi_deposit, np.int64),
+                (outcomes.game_over, np.bool_),
+            )
+        )
+    except ValueError as e:
+        msg = f"The arrays of `outcomes` must have a row per result.: {e}"
+        raise ValueError(msg) from e
+
+    score = np.asarray(state.score, dtype=np.int64) + score_delta
+    _, reason = check_states(
+        round_,
+        num_counter_stick,
+        num_riichi_deposit,
+        score,
+        num_player,
+        predictor.model.game_length,
+    )
+    reason[game_over] &= np.uint8(
+        ~(InvalidReason.ROUND | InvalidReason.SCORE_RANGE),
+    )
+    valid = reason == 0
+    predicted = valid & np.logical_not(game_over)
+
+    # The current state is predicted in the same call as the results.
+    feature = np.empty((1 + np.count_nonzero(predicted), 3 + num_player))
+    feature[0] = (
+        state.round_,
+        state.num_counter_stick,
+        state.num_riichi_deposit,
+        *state.score,
+    )
+    feature[1:, 0] = round_[predicted]
+    feature[1:, 1] = num_counter_stick[predicted]
+    feature[1:, 2] = num_riichi_deposit[predicted]
+    feature[1:, 3:] = score[predicted]
+    prediction = predictor.predict_feature(feature)
+
+    player_rank_proba = np.full(
+        (num_result, num_player, num_player),
+        np.nan,
+        dtype=prediction.player_rank_proba.dtype,
+    )
+    player_rank_proba[predicted] = prediction.player_rank_proba[1:]
+    ended = valid & game_over
+    player_rank_proba[ended] = _final_rank_proba(score[ended])
+
+    expected_rank = player_rank_proba @ np.arange(
+        1,
+        num_player + 1,
+        dtype=player_rank_proba.dtype,
+    )
+    base = Prediction(
+        player_rank_proba=prediction.player_rank_proba[0],
+        expected_rank=prediction.expected_rank[0],
+    )
+    return OutcomeEvaluation(
+        base=base,
+        valid=valid,
+        reason=reason,
+        score=score,
+        player_rank_proba=player_rank_proba,
+        expected_rank=expected_rank,
+        expected_rank_shift=expected_rank - base.expected_rank,
+    )
@@ -0,0 +1,243 @@
+"""Provides a classifier that is partitioned by round.
+
+The state of a game means very different things in East 1 and in
+South 4, which a single classifier, especially a linear one that sees
+the round as one numeric feature, learns poorly. A round-partitioned
+classifier fits a separate classifier for each group of rounds, in
+parallel, and routes each state to the classifier of its round when it
+predicts. Each classifier is fitted with only the rows of its rounds,
+so it is much cheaper to fit than a global one and as fast to predict.
+"""
+
+# ruff: noqa: N803
+
+from collections.abc import Sequence
+from typing import Self
+
+import numpy as np
+from joblib.parallel import get_active_backend
+from sklearn.base import clone
+from sklearn.utils.parallel import Parallel, delayed
+
+from rank_predictor.model import Classifier
+from rank_predictor.types import Round
+
+_ROUND_COLUMN = 0
+
+
+def _fit_partition(
+    classifier: Classifier,
+    X: np.ndarray,
+    y: np.ndarray,
+    sample_weight: np.ndarray | None,
+) -> Classifier:
+    if sample_weight is None:
+        return classifier.fit(X, y)
+    return classifier.fit(X, y, sample_weight=sample_weight)
+
+
+class RoundPartitionedClassifier:
+    """A classifier that fits a separate classifier per group of rounds.
+
+    The groups with fewer training rows than `min_num_row`, such as
+    those of the rounds of an extension, are merged into one group. A
+    group whose training rows have fewer than two rank classes is
+    predicted with the frequencies of the rank classes in all the
+    training rows instead of a classifier.
+
+    Attributes:
+        estimator: The unfitted classifier that is cloned for each
+            group.
+        partitions: The groups of rounds. The rounds that are in no
+            group form one more group.
+        num_worker: The number of processes that fit the classifiers,
+            which an enclosing `joblib.parallel_config` caps.
+        min_num_row: The number of training rows that a group needs to
+            have a classifier of its own.
+        classes_: The rank classes in the training rows. Available
+            after fitting.
+        partition_index_: The index in `estimators_` of each round.
+            Available after fitting.
+        estimators_: The fitted classifier of each group after merging,
+            or None for a group predicted with `class_frequency_`.
+            Available after fitting.
+        class_frequency_: The frequencies of `classes_` in all the
+            training rows. Available after fitting.
+        columns_: The columns in `classes_` of the rank classes of each
+            classifier. Available after fitting.
+    """
+
+    def __init__(
+        self,
+        estimator: Classifier,
+        partitions: Sequence[Sequence[int]] | None = None,
+        num_worker: int | None = None,
+        min_num_row: int = 1000,
+    ) -> None:
+        """Initializes the instance of `RoundPartitionedClassifier`.
+
+        Args:
+            estimator: The unfitted classifier that is cloned for each
+                group.
+            partitions: The groups of rounds, such as
+                `[[0, 1, 2, 3], [4, 5, 6], [7]]`. If None, each round is
+                a group of its own. Defaults to None.
+            num_worker: The number of processes that fit the
+                classifiers. It is capped by the `n_jobs` of an
+                enclosing `joblib.parallel_config`, such as that of the
+                workers of `train_all`. If None, the `n_jobs` of the
+                enclosing configuration, or else the number of CPUs, is
+                used. Defaults to None.
+            min_num_row: The number of training rows that a group needs
+                to have a classifier of its own. Defaults to 1000.
+
+        Raises:
+            ValueError: If a round is not valid or is in more than one
+                group, or if `num_worker` is not positive.
+        """
+        if partitions is None:
+            partitions = [[r] for r in Round]
+        seen: set[Round] = set()
+        for partition in partitions:
+            for r in map(Round, partition):
+                if r in seen:
+                    msg = f"A round is in more than one group: {r}"
+                    raise ValueError(msg)
+                seen.add(r)
+        if num_worker is not None and num_worker <= 0:
+            msg = f"`num_worker` must be positive: {num_worker}"
+            raise ValueError(msg)
+
+        self.estimator = estimator
+        self.partitions = [[Round(r) for r in p] for p in partitions]
+        self.num_worker = num_worker
+        self.min_num_row = min_num_row
+
+    @staticmethod
+    def _get_rounds(X: np.ndarray) -> np.ndarray:
+        rounds = X[:, _ROUND_COLUMN].astype(np.intp)
+        if len(rounds) and (rounds.min() < 0 or rounds.max() >= len(Round)):
+            msg = "The features contain an invalid round."
+            raise ValueError(msg)
+        return rounds
+
+    def _get_num_job(self) -> int:
+        # A worker that already runs in parallel with others, such as
+        # one of `train_all`, sets a budget for the processes it starts.
+        _, budget = get_active_backend()
+        if self.num_worker is None:
+            return budget or -1
+        if budget is None or budget < 0:
+            return self.num_worker
+        return min(self.num_worker, budget)
+
+    def fit(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        sample_weight: np.ndarray | None = None,
+    ) -> Self:
+        """Fits a classifier for each group of rounds.
+
+        The classifiers are fitted in parallel with `joblib`.
+
+        Args:
+            X: The features of the training data, whose first column is
+                the round.
+            y: The rank classes of the training data.
+            sample_weight: The weights of the rows, which the estimator
+                must accept in `fit`. If None, the rows are weighted
+                equally. Defaults to None.
+
+        Returns:
+            The fitted classifier itself.
+
+        Raises:
+            ValueError: If the features contain an invalid round.
+        """
+        group = np.full(len(Round), len(self.partitions))
+        for i, partition in enumerate(self.partitions):
+            group[partition] = i
+        rounds = self._get_rounds(X)
+        num_group = len(self.partitions) + 1
+        num_row = np.bincount(group[rounds], minlength=num_group)
+        group = np.where(num_row[group] < self.min_num_row, -1, group)
+        _, self.partition_index_ = np.unique(group, return_inverse=True)
+
+        self.classes_, inverse = np.unique(y, return_inverse=True)
+        count = np.bincount(
+            inverse,
+            weights=sample_weight,
+            minlength=len(self.classes_),
+        )
+        self.class_frequency_ = count / count.sum()
+
+        index = self.partition_index_[rounds]
+        masks = [index == i for i in range(self.partition_index_.max() + 1)]
+        fittable = [len(np.unique(y[mask])) >= 2 for mask in masks]  # noqa: PLR2004
+        fitted = iter(
+            Parallel(n_jobs=self._get_num_job())(
+                delayed(_fit_partition)(
+                    clone(self.estimator),
+                    X[mask],
+                    y[mask],
+                    None if sample_weight is None else sample_weight[mask],
+                )
+                for mask, ok in zip(masks, fittable, strict=True)
+                if ok
+            ),
+        )
+        self.estimators_: list[Classifier | None] = [
+            next(fitted) if ok else None for ok in fittable
+        ]
+        # A group may lack some rank classes.
+        self.columns_ = [
+            np.searchsorted(
+                self.classes_,
+                getattr(estimator, "classes_", self.classes_),
+            )
+            for estimator in self.estimators_
+        ]
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predicts the probabilities of each rank class.
+
+        Each row is predicted by the classifier of its round.
+
+        Args:
+            X: The features of the data to predict, whose first column
+                is the round.
+
+        Returns:
+            An array containing the probabilities of each class in the
+                order of `classes_`.
+
+        Raises:
+            ValueError: If the features contain an invalid round.
+        """
+        index = self.partition_index_[self._get_rounds(X)]
+        num_class = len(self.classes_)
+        proba = np.empty(
+            (len(X), num_class),
+            dtype=np.result_type(X, np.float32),
+        )
+        groups = np.unique(index)
+        for i in groups:
+            # A single state, or a batch in one group, is predicted
+            # without copying the features.
+            rows = (
+                slice(None) if len(groups) == 1 else np.flatnonzero(index == i)
+            )
+            estimator = self.estimators_[i]
+            if estimator is None:
+                proba[rows] = self.class_frequency_
+                continue
+            group_proba = estimator.predict_proba(X[rows])
+            columns = self.columns_[i]
+            if len(columns) < num_class:
+                full = np.zeros((len(group_proba), num_class))
+                full[:, columns] = group_proba
+                group_proba = full
+            proba[rows] = group_proba
+        return proba
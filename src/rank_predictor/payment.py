@@ -0,0 +1,405 @@
+"""Provides the point transfers of the results of a round.
+
+The rules are the simplified rules of Tenhou (天鳳) that
+`rank_predictor.generate` simulates. The transfers of every result of a
+round, that is each win by each player with each han and fu and each
+draw with each set of tenpai players, are precomputed as a table for
+each number of players and dealer seat. Expanding a state into all the
+states that can follow it is then a few array operations, and the
+states can be predicted directly with
+`rank_predictor.outcome.evaluate_outcomes`.
+
+Scores are in units of 100 points, as in `rank_predictor.validate`.
+"""
+
+import itertools
+from collections.abc import Collection
+from dataclasses import dataclass
+from functools import cache
+from typing import Final
+
+import numpy as np
+
+from rank_predictor.outcome import Outcomes
+from rank_predictor.predict import GameState
+from rank_predictor.types import GameLength, NumPlayer, Round
+
+RETURN_SCORE_4: Final[int] = 300
+"""The score a player needs to end a 4-player game after the last
+regular round."""
+
+RETURN_SCORE_3: Final[int] = 400
+"""The score a player needs to end a 3-player game after the last
+regular round."""
+
+RIICHI_COST: Final[int] = 10
+"""The score a player pays to declare riichi."""
+
+NOTEN_PENALTY_4: Final[int] = 30
+"""The total score the noten players pay in a 4-player draw."""
+
+NOTEN_PENALTY_3: Final[int] = 20
+"""The total score the noten players pay in a 3-player draw."""
+
+FU_VALUES: Final[tuple[int, ...]] = (
+    20,
+    25,
+    30,
+    40,
+    50,
+    60,
+    70,
+    80,
+    90,
+    100,
+    110,
+)
+"""The fu of the hands below mangan."""
+
+LIMIT_HAN_VALUES: Final[tuple[int, ...]] = (5, 6, 8, 11, 13)
+"""The least han of mangan, haneman, baiman, sanbaiman and yakuman."""
+
+_NO_PLAYER: Final[int] = -1
+
+
+def basic_points(han: int, fu: int) -> int:
+    """Calculates the basic points of a hand.
+
+    Args:
+        han: The han of the hand.
+        fu: The fu of the hand, which is ignored from mangan.
+
+    Returns:
+        The basic points, which are not in units of 100.
+    """
+    if han >= 13:  # noqa: PLR2004
+        return 8000
+    if han >= 11:  # noqa: PLR2004
+        return 6000
+    if han >= 8:  # noqa: PLR2004
+        return 4000
+    if han >= 6:  # noqa: PLR2004
+        return 3000
+    if han >= 5:  # noqa: PLR2004
+        return 2000
+    return min(fu * 2 ** (han + 2), 2000)
+
+
+def next_round(round_: int, num_player: NumPlayer) -> int:
+    """Returns the round that follows a round without a dealer repeat.
+
+    In 3-player, the round number of a wind is skipped after the 3rd
+    dealer, for example South 1 (4) comes after East 3 (2).
+
+    Args:
+        round_: The current round.
+        num_player: The number of players.
+
+    Returns:
+        The next round.
+    """
+    if (round_ % NumPlayer.FOUR) + 1 < num_player:
+        return round_ + 1
+    return (round_ // NumPlayer.FOUR + 1) * NumPlayer.FOUR
+
+
+def _ceil_hundred(points: int) -> int:
+    # Returns points rounded up to 100 in units of 100.
+    return -(-points // 100)
+
+
+def _create_hands(*, tsumo: bool) -> list[tuple[int, int]]:
+    # 1 han needs at least 30 fu. 20 fu is a closed tsumo with pinfu,
+    # and 25 fu is chiitoitsu, which is 3 han or more with tsumo.
+    hands = [
+        (han, fu)
+        for han in range(1, LIMIT_HAN_VALUES[0])
+        for fu in FU_VALUES
+        if not (han == 1 and fu < 30)  # noqa: PLR2004
+        and (fu != 20 or tsumo)  # noqa: PLR2004
+        and not (tsumo and han == 2 and fu == 25)  # noqa: PLR2004
+    ]
+    hands.extend((han, 0) for han in LIMIT_HAN_VALUES)
+    return hands
+
+
+def _transfer(
+    num_player: NumPlayer,
+    winner: int,
+    payments: dict[int, int],
+) -> list[int]:
+    delta = [0] * num_player
+    for p, payment in payments.items():
+        delta[p] -= payment
+        delta[winner] += payment
+    return delta
+
+
+@dataclass(frozen=True)
+class PaymentTable:
+    """The point transfers of the results of a round.
+
+    Each attribute has a row per result.
+
+    Attributes:
+        winner: The winner, or -1 for a draw.
+        loser: The player who dealt in, the winner for a tsumo, or -1
+            for a draw.
+        han: The han of the winning hand, or 0 for a draw.
+        fu: The fu of the winning hand, which is 0 from mangan and for
+            a draw.
+        tenpai: Whether each player is tenpai. Only the winner is for a
+            win.
+        delta: The transfers of the scores without the counter sticks
+            and the riichi deposits.
+        counter_stick_delta: The transfers of the scores per counter
+            stick.
+        renchan: Whether the dealer keeps the seat.
+    """
+
+    winner: np.ndarray
+    loser: np.ndarray
+    han: np.ndarray
+    fu: np.ndarray
+    tenpai: np.ndarray
+    delta: np.ndarray
+    counter_stick_delta: np.ndarray
+    renchan: np.ndarray
+
+    def __len__(self) -> int:
+        """Returns the number of results."""
+        return len(self.winner)
+
+    def take(self, index: np.ndarray) -> "PaymentTable":
+        """Returns the table of some of the results.
+
+        Args:
+            index: The indices or the boolean mask of the results.
+
+        Returns:
+            The table of the results.
+        """
+        return PaymentTable(
+            winner=self.winner[index],
+            loser=self.loser[index],
+            han=self.han[index],
+            fu=self.fu[index],
+            tenpai=self.tenpai[index],
+            delta=self.delta[index],
+            counter_stick_delta=self.counter_stick_delta[index],
+            renchan=self.renchan[index],
+        )
+
+
+@cache
+def get_payment_table(num_player: NumPlayer, dealer: int) -> PaymentTable:
+    """Returns the point transfers of every result of a round.
+
+    In 3-player, the winner of a tsumo is paid by the 2 other players
+    only. The tables are created once for each number of players and
+    dealer, and must not be modified.
+
+    Args:
+        num_player: The number of players.
+        dealer: The seat of the dealer.
+
+    Returns:
+        The transfers of the wins, followed by those of the draws.
+
+    Raises:
+        ValueError: If `dealer` is not a seat of the game.
+    """
+    if not 0 <= dealer < num_player:
+        msg = f"`dealer` must be a seat of the game.: {dealer}"
+        raise ValueError(msg)
+
+    ron_hands = _create_hands(tsumo=False)
+    tsumo_hands = _create_hands(tsumo=True)
+    wins: list[tuple[int, int, int, int]] = []
+    deltas: list[list[int]] = []
+    counter_stick_deltas: list[list[int]] = []
+    for winner in range(num_player):
+        others = [p for p in range(num_player) if p != winner]
+        rate = 6 if winner == dealer else 4
+        for loser in others:
+            for han, fu in ron_hands:
+                payment = _ceil_hundred(basic_points(han, fu) * rate)
+                wins.append((winner, loser, han, fu))
+                deltas.append(_transfer(num_player, winner, {loser: payment}))
+                counter_stick_deltas.append(
+                    _transfer(num_player, winner, {loser: 3}),
+                )
+        for han, fu in tsumo_hands:
+            points = basic_points(han, fu)
+            payments = {
+                p: _ceil_hundred(points * (2 if dealer in (winner, p) else 1))
+                for p in others
+            }
+            wins.append((winner, winner, han, fu))
+            deltas.append(_transfer(num_player, winner, payments))
+            counter_stick_deltas.append(
+                _transfer(num_player, winner, dict.fromkeys(others, 1)),
+            )
+
+    penalty = (
+        NOTEN_PENALTY_4 if num_player == NumPlayer.FOUR else NOTEN_PENALTY_3
+    )
+    draws = list(itertools.product((False, True), repeat=num_player))
+    for tenpai in draws:
+        num_tenpai = sum(tenpai)
+        if 0 < num_tenpai < num_player:
+            deltas.append(
+                [
+                    penalty // num_tenpai
+                    if t
+                    else -(penalty // (num_player - num_tenpai))
+                    for t in tenpai
+                ],
+            )
+        else:
+            deltas.append([0] * num_player)
+        counter_stick_deltas.append([0] * num_player)
+
+    win_columns = np.array(wins, dtype=np.int8).T
+    draw_columns = np.zeros((len(win_columns), len(draws)), dtype=np.int8)
+    draw_columns[:2] = _NO_PLAYER
+    winner_column, loser_column, han_column, fu_column = np.concatenate(
+        [win_columns, draw_columns],
+        axis=1,
+    )
+    tenpai_matrix = np.concatenate(
+        [
+            win_columns[0, :, np.newaxis] == np.arange(num_player),
+            np.array(draws, dtype=np.bool_),
+        ],
+    )
+    table = PaymentTable(
+        winner=winner_column,
+        loser=loser_column,
+        han=han_column,
+        fu=fu_column,
+        tenpai=tenpai_matrix,
+        delta=np.array(deltas, dtype=np.int32),
+        counter_stick_delta=np.array(counter_stick_deltas, dtype=np.int32),
+        renchan=np.where(
+            winner_column == _NO_PLAYER,
+            tenpai_matrix[:, dealer],
+            winner_column == dealer,
+        ),
+    )
+    for array in vars(table).values():
+        array.flags.writeable = False
+    return table
+
+
+@dataclass(frozen=True)
+class Successors:
+    """The states that can follow a state.
+
+    Attributes:
+        results: The results of the round that lead to the states.
+        outcomes: The states, which can be passed to
+            `rank_predictor.outcome.evaluate_outcomes` with the current
+            state.
+    """
+
+    results: PaymentTable
+    outcomes: Outcomes
+
+
+def expand_successors(
+    state: GameState,
+    num_player: NumPlayer,
+    game_length: GameLength,
+    riichi: Collection[int] = (),
+) -> Successors:
+    """Expands a state into the states that follow each result.
+
+    The players who declare riichi in the round pay for it before the
+    result, the winner collects the riichi deposits, and the draws in
+    which a riichi player is noten are left out. Whether the game ends
+    is decided as in `rank_predictor.generate`, and the remaining riichi
+    deposits of a game that ends are left on the table.
+
+    Args:
+        state: The current state, which is assumed to be valid.
+        num_player: The number of players.
+        game_length: The length of the game.
+        riichi: The players who declare riichi in the round. Defaults to
+            none.
+
+    Returns:
+        The states that follow the results of the round.
+
+    Raises:
+        ValueError: If a player in `riichi` is not a seat of the game or
+            does not have enough score to declare riichi.
+    """
+    round_ = int(state.round_)
+    dealer = round_ % NumPlayer.FOUR
+    table = get_payment_table(num_player, dealer)
+
+    riichi_delta = np.zeros(num_player, dtype=np.int64)
+    for p in set(riichi):
+        if not 0 <= p < num_player:
+            msg = f"The riichi player must be a seat of the game.: {p}"
+            raise ValueError(msg)
+        if state.score[p] < RIICHI_COST:
+            msg = f"The riichi player does not have enough score.: {p}"
+            raise ValueError(msg)
+        riichi_delta[p] = -RIICHI_COST
+    num_riichi_deposit = state.num_riichi_deposit + len(set(riichi))
+
+    is_draw = table.winner == _NO_PLAYER
+    riichi_tenpai = table.tenpai[:, riichi_delta < 0].all(axis=1)
+    results = table.take(~is_draw | riichi_tenpai)
+    is_draw = results.winner == _NO_PLAYER
+
+    score_delta = (
+        results.delta
+        + results.counter_stick_delta * state.num_counter_stick
+        + riichi_delta
+    )
+    won = np.flatnonzero(~is_draw)
+    score_delta[won, results.winner[won]] += num_riichi_deposit * RIICHI_COST
+    score = np.asarray(state.score) + score_delta
+
+    if num_player == NumPlayer.FOUR:
+        return_score = RETURN_SCORE_4
+    else:
+        return_score = RETURN_SCORE_3
+    regular_end = (
+        Round.SOUTH_1 if game_length == GameLength.TONPU else Round.WEST_1
+    )
+    following_round = next_round(round_, num_player)
+    renchan = results.renchan
+    round_column = np.where(renchan, round_, following_round)
+
+    # The dealer may end the game as the top player in the last round,
+    # which `np.argmax` finds with the ties broken by the seat order.
+    is_dealer_top = (np.argmax(score, axis=1) == dealer) & (
+        score[:, dealer] >= return_score
+    )
+    game_over = (
+        (score < 0).any(axis=1)
+        | (round_column >= regular_end + NumPlayer.FOUR)
+        | (renchan & (following_round >= regular_end) & is_dealer_top)
+        | (
+            ~renchan
+            & (round_column >= regular_end)
+            & (score.max(axis=1) >= return_score)
+        )
+    )
+
+    outcomes = Outcomes(
+        score_delta=score_delta,
+        round_=round_column,
+        num_counter_stick=np.where(
+            renchan | is_draw,
+            state.num_counter_stick + 1,
+            0,
+        ),
+        num_riichi_deposit=np.where(is_draw, num_riichi_deposit, 0),
+        game_over=game_over,
+    )
+    return Successors(results=results, outcomes=outcomes)
@@ -1,13 +1,66 @@
 """Provides functionality to predict expected final rank."""
 
-from collections.abc import Sequence
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import Final
 
 import numpy as np
 import polars as pl
 
+from rank_predictor.bundle import ModelBundle
 from rank_predictor.model import Model
-from rank_predictor.rank import get_indexes
-from rank_predictor.types import DataName, NumPlayer, Round
+from rank_predictor.rank import PLAYER_RANKS_3, PLAYER_RANKS_4
+from rank_predictor.types import (
+    DataName,
+    GameLength,
+    NumPlayer,
+    Round,
+    get_game_length_name,
+)
+
+
+def _create_rank_matrix(
+    player_ranks: tuple[tuple[int, ...], ...],
+) -> np.ndarray:
+    # One-hot table of shape (rank class, player, rank) that sums up the
+    # probabilities of the rank classes into each player's rank.
+    num_player = len(player_ranks[0])
+    matrix = np.zeros((len(player_ranks), num_player, num_player))
+    for rank_class, ranks in enumerate(player_ranks):
+        matrix[rank_class, range(num_player), ranks] = 1.0
+    matrix.flags.writeable = False
+    return matrix
+
+
+RANK_MATRIX_4: Final = _create_rank_matrix(PLAYER_RANKS_4)
+"""A one-hot array that maps the rank classes to each player's rank for
+4 players.
+
+`RANK_MATRIX_4[rank_class, player, rank]` is 1 if the player's rank is
+equal to the rank in the rank class, otherwise 0. The shape is
+(24, 4, 4).
+"""
+
+RANK_MATRIX_3: Final = _create_rank_matrix(PLAYER_RANKS_3)
+"""A one-hot array that maps the rank classes to each player's rank for
+3 players.
+
+`RANK_MATRIX_3[rank_class, player, rank]` is 1 if the player's rank is
+equal to the rank in the rank class, otherwise 0. The shape is
+(6, 3, 3).
+"""
+
+
+@cache
+def _get_rank_matrix(num_player: NumPlayer, dtype: np.dtype) -> np.ndarray:
+    rank_matrix = (
+        RANK_MATRIX_4 if num_player == NumPlayer.FOUR else RANK_MATRIX_3
+    ).astype(dtype)
+    rank_matrix.flags.writeable = False
+    return rank_matrix
 
 
 def create_feature(
@@ -51,7 +104,8 @@ def predict_proba(model: Model, feature: pl.DataFrame) -> np.ndarray:
     Returns:
         An array of the probabilities of each rank class.
     """
-    return model.classifier.predict_proba(feature.to_numpy())[0]
+    matrix = np.asarray(feature.to_numpy(), dtype=model.dtype)
+    return model.classifier.predict_proba(matrix)[0]
 
 
 def calculate_player_rank_proba(
@@ -60,6 +114,10 @@ def calculate_player_rank_proba(
 ) -> np.ndarray:
     """Calculates the probabilities of each player's rank.
 
+    `proba` may also be a 2-D array with a row per state, in which case
+    the result has a leading axis of the same length. The result has
+    the same floating-point type as `proba`.
+
     Args:
         num_player: The number of players.
         proba: The probabilities of each rank class.
@@ -83,16 +141,12 @@ def calculate_player_rank_proba(
         ...     proba,
         ... )
         >>> print(player_rank_proba)
-        [[0.2541311  0.36746423 0.37840467]
+        [[0.25413109 0.36746424 0.37840467]
          [0.35813974 0.36612636 0.2757339 ]
-         [0.38772917 0.26640941 0.34586143]]
+         [0.38772917 0.2664094  0.34586143]]
     """
-    player_rank_proba = np.zeros((num_player, num_player))
-    for player in range(num_player):
-        for rank in range(num_player):
-            indexes = get_indexes(num_player, player, rank)
-            player_rank_proba[player, rank] += sum(proba[i] for i in indexes)
-    return player_rank_proba
+    rank_matrix = _get_rank_matrix(num_player, proba.dtype)
+    return np.tensordot(proba, rank_matrix, axes=1)
 
 
 def calculate_expected_rank(player_rank_proba: np.ndarray) -> np.ndarray:
@@ -118,3 +172,533 @@ def calculate_expected_rank(player_rank_proba: np.ndarray) -> np.ndarray:
     """
     ranks = np.arange(1, player_rank_proba.shape[1] + 1)
     return np.sum(player_rank_proba * ranks, axis=1)
+
+
+@dataclass(frozen=True)
+class GameState:
+    """The state of a round to predict the final ranks from.
+
+    Attributes:
+        round_: The current round.
+        num_counter_stick: The number of counter sticks.
+        num_riichi_deposit: The number of riichi deposits.
+        score: The current scores of the players in hundreds of points,
+            as in the annotated data.
+    """
+
+    round_: Round
+    num_counter_stick: int
+    num_riichi_deposit: int
+    score: Sequence[int]
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """The predicted final ranks.
+
+    If the prediction is made for several states, each attribute has a
+    leading axis with a row per state.
+
+    Attributes:
+        player_rank_proba: The probabilities of each player's rank.
+        expected_rank: The expected rank of each player.
+    """
+
+    player_rank_proba: np.ndarray
+    expected_rank: np.ndarray
+
+
+class PredictionCache:
+    """A bounded cache of predictions with least-recently-used eviction.
+
+    The predictions are keyed on the state as a tuple of integers in
+    the order of the features: the round, the number of counter sticks,
+    the number of riichi deposits and the scores. The instance can be
+    shared by threads.
+
+    Attributes:
+        capacity: The maximum number of predictions to keep.
+        hits: The number of lookups that found a prediction.
+        misses: The number of lookups that found none.
+        evictions: The number of predictions evicted for new ones.
+        invalidations: The number of times the cache was cleared
+            because the model changed.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initializes the instance of `PredictionCache`.
+
+        Args:
+            capacity: The maximum number of predictions to keep.
+
+        Raises:
+            ValueError: If `capacity` is not positive.
+        """
+        if capacity <= 0:
+            msg = f"`capacity` must be positive: {capacity}"
+            raise ValueError(msg)
+
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[tuple[int, ...], Prediction] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Returns the number of predictions in the cache."""
+        return len(self._entries)
+
+    def get(self, key: tuple[int, ...]) -> Prediction | None:
+        """Looks up the prediction for a state.
+
+        Args:
+            key: The state as a tuple of integers.
+
+        Returns:
+            The prediction, or None if it is not in the cache.
+        """
+        with self._lock:
+            prediction = self._entries.get(key)
+            if prediction is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return prediction
+
+    def put(self, key: tuple[int, ...], prediction: Prediction) -> None:
+        """Adds the prediction for a state.
+
+        Args:
+            key: The state as a tuple of integers.
+            prediction: The prediction for the state, which must not be
+                modified afterwards.
+        """
+        with self._lock:
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Removes all the predictions because the model changed."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+
+class Predictor:
+    """Predicts the final ranks with a model.
+
+    The model is checked once when it is set. The feature buffers are
+    allocated once per thread and reused by later calls, so the
+    instance can be shared by threads and no DataFrame is created for a
+    prediction. The features and the results use the floating-point
+    type of the model.
+
+    The results are new arrays unless output arrays are passed as
+    `out`, for example those of `output_buffer`, which are also
+    allocated once per thread and reused. The probabilities of the rank
+    classes are still allocated by the classifier.
+
+    With a cache, the states that were predicted recently are not
+    predicted again. Setting another model clears the cache.
+
+    Attributes:
+        num_player: The number of players.
+        game_length: The length of the game.
+        cache: The cache of the predictions, or None if disabled.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        num_player: NumPlayer,
+        game_length: GameLength,
+        cache_size: int = 0,
+    ) -> None:
+        """Initializes the instance of `Predictor`.
+
+        Args:
+            model: The model to use for prediction.
+            num_player: The number of players to predict for.
+            game_length: The length of the game to predict for.
+            cache_size: The maximum number of predictions to cache. If
+                0, predictions are not cached. Defaults to 0.
+
+        Raises:
+            ValueError: If the number of players or the length of the
+                game does not match the model, or if `cache_size` is
+                negative.
+        """
+        if cache_size < 0:
+            msg = f"`cache_size` must not be negative: {cache_size}"
+            raise ValueError(msg)
+
+        self.num_player = num_player
+        self.game_length = game_length
+        self.cache: PredictionCache | None = None
+        self.model = model
+        if cache_size:
+            self.cache = PredictionCache(cache_size)
+
+    @property
+    def model(self) -> Model:
+        """The model to use for prediction."""
+        return self._model
+
+    @model.setter
+    def model(self, model: Model) -> None:
+        if model.num_player != self.num_player:
+            msg = (
+                "The `num_player` of the model does not match the provided"
+                f" argument. model: {model.num_player},"
+                f" argument: {self.num_player}"
+            )
+            raise ValueError(msg)
+        if model.game_length != self.game_length:
+            msg = (
+                "The `game_length` of the model does not match the provided"
+                f" argument. model: {model.game_length},"
+                f" argument: {self.game_length}"
+            )
+            raise ValueError(msg)
+
+        self._model = model
+        self._dtype = model.dtype
+        rank_matrix = _get_rank_matrix(self.num_player, self._dtype)
+        # Flattened to (rank class, player * rank) for a single matmul.
+        self._rank_matrix = rank_matrix.reshape(len(rank_matrix), -1)
+        self._ranks = np.arange(1, self.num_player + 1, dtype=self._dtype)
+        self._local = threading.local()
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def _feature_buffer(self, num_state: int) -> np.ndarray:
+        buffer: np.ndarray | None = getattr(self._local, "feature", None)
+        if buffer is None or len(buffer) < num_state:
+            size = max(num_state, 0 if buffer is None else 2 * len(buffer))
+            buffer = np.empty((size, 3 + self.num_player), self._dtype)
+            self._local.feature = buffer
+        return buffer[:num_state]
+
+    def output_buffer(self, num_state: int) -> Prediction:
+        """Gets the output arrays of the calling thread.
+
+        The arrays are reused by later calls in the same thread, so the
+        results written to them must be used before the next call.
+
+        Args:
+            num_state: The number of states to predict.
+
+        Returns:
+            The arrays to pass as `out`, with a row per state.
+        """
+        buffer: Prediction | None = getattr(self._local, "output", None)
+        if buffer is None or len(buffer.expected_rank) < num_state:
+            buffer = self._allocate(
+                max(
+                    num_state,
+                    0 if buffer is None else 2 * len(buffer.expected_rank),
+                ),
+            )
+            self._local.output = buffer
+        return Prediction(
+            player_rank_proba=buffer.player_rank_proba[:num_state],
+            expected_rank=buffer.expected_rank[:num_state],
+        )
+
+    def _check_output(self, out: Prediction, num_state: int) -> None:
+        num_player = int(self.num_player)
+        for name, array, shape in (
+            (
+                "player_rank_proba",
+                out.player_rank_proba,
+                (num_state, num_player, num_player),
+            ),
+            ("expected_rank", out.expected_rank, (num_state, num_player)),
+        ):
+            if (
+                array.shape != shape
+                or array.dtype != self._dtype
+                or not array.flags.c_contiguous
+            ):
+                msg = (
+                    f"`out.{name}` must be a C-contiguous array of"
+                    f" {self._dtype} with the shape {shape}."
+                )
+                raise ValueError(msg)
+
+    def predict(self, state: GameState) -> Prediction:
+        """Predicts the final ranks from a state.
+
+        Args:
+            state: The state of the round.
+
+        Returns:
+            The prediction, whose attributes have no leading axis.
+        """
+        prediction = self.predict_many((state,))
+        return Prediction(
+            player_rank_proba=prediction.player_rank_proba[0],
+            expected_rank=prediction.expected_rank[0],
+        )
+
+    def predict_many(
+        self,
+        states: Sequence[GameState],
+        out: Prediction | None = None,
+    ) -> Prediction:
+        """Predicts the final ranks from several states at once.
+
+        Args:
+            states: The states of the rounds.
+            out: The arrays to write the prediction to. If None, new
+                arrays are allocated. Defaults to None.
+
+        Returns:
+            The prediction with a row per state, which is `out` if it
+                is given.
+
+        Raises:
+            ValueError: If `out` does not match the states and the
+                model.
+        """
+        feature = self._feature_buffer(len(states))
+        for row, state in zip(feature, states, strict=True):
+            row[0] = state.round_
+            row[1] = state.num_counter_stick
+            row[2] = state.num_riichi_deposit
+            row[3:] = state.score
+        return self.predict_feature(feature, out)
+
+    def predict_feature(
+        self,
+        feature: np.ndarray,
+        out: Prediction | None = None,
+    ) -> Prediction:
+        """Predicts the final ranks from a matrix of features.
+
+        Args:
+            feature: The features with a row per state. The columns are
+                `round`, `num_counter_stick`, `num_riichi_deposit` and
+                `score_*`, as in the annotated data.
+            out: The arrays to write the prediction to, such as those of
+                `output_buffer`. They must be C-contiguous, have a row
+                per state and the floating-point type of the model. If
+                None, new arrays are allocated. Defaults to None.
+
+        Returns:
+            The prediction with a row per state, which is `out` if it
+                is given.
+
+        Raises:
+            ValueError: If `out` does not match the features and the
+                model.
+        """
+        if out is not None:
+            self._check_output(out, len(feature))
+        if self.cache is None:
+            return self._predict_feature(feature, out)
+        return self._predict_feature_cached(feature, self.cache, out)
+
+    def _predict_feature_cached(
+        self,
+        feature: np.ndarray,
+        cache: PredictionCache,
+        out: Prediction | None,
+    ) -> Prediction:
+        model = self._model
+        keys = [tuple(row) for row in np.asarray(feature, np.int64).tolist()]
+        found: dict[tuple[int, ...], Prediction] = {}
+        # The states missing from the cache are predicted once each.
+        missing: list[tuple[int, ...]] = []
+        for key in dict.fromkeys(keys):
+            row = cache.get(key)
+            if row is None:
+                missing.append(key)
+            else:
+                found[key] = row
+
+        if missing:
+            prediction = self._predict_feature(np.array(missing))
+            for key, row in zip(missing, _split(prediction), strict=True):
+                found[key] = row
+                # Predictions of a replaced model are not cached.
+                if self._model is model:
+                    cache.put(key, row)
+
+        cached = [found[key] for key in keys]
+        if out is None:
+            out = self._allocate(len(cached))
+        if cached:
+            np.stack(
+                [c.player_rank_proba for c in cached],
+                out=out.player_rank_proba,
+            )
+            np.stack([c.expected_rank for c in cached], out=out.expected_rank)
+        return out
+
+    def _allocate(self, num_state: int) -> Prediction:
+        num_player = self.num_player
+        return Prediction(
+            player_rank_proba=np.empty(
+                (num_state, num_player, num_player),
+                self._dtype,
+            ),
+            expected_rank=np.empty((num_state, num_player), self._dtype),
+        )
+
+    def _predict_feature(
+        self,
+        feature: np.ndarray,
+        out: Prediction | None = None,
+    ) -> Prediction:
+        if out is None:
+            out = self._allocate(len(feature))
+        if len(feature) == 0:
+            return out
+
+        proba = self._model.classifier.predict_proba(
+            np.asarray(feature, dtype=self._dtype),
+        )
+        np.matmul(
+            proba,
+            self._rank_matrix,
+            out=out.player_rank_proba.reshape(len(feature), -1),
+        )
+        np.matmul(out.player_rank_proba, self._ranks, out=out.expected_rank)
+        return out
+
+
+def _split(prediction: Prediction) -> list[Prediction]:
+    # Splits a prediction with a row per state into read-only rows.
+    prediction.player_rank_proba.flags.writeable = False
+    prediction.expected_rank.flags.writeable = False
+    return [
+        Prediction(player_rank_proba=p, expected_rank=e)
+        for p, e in zip(
+            prediction.player_rank_proba,
+            prediction.expected_rank,
+            strict=True,
+        )
+    ]
+
+
+class PredictorRouter:
+    """Selects the predictor for the game of each request.
+
+    The predictor of a game in the bundle is created, and its model is
+    loaded, when the game is first requested, so only the models that
+    are used are loaded. The instance can be shared by threads.
+
+    Attributes:
+        num_player: The number of players of the default game.
+        game_length: The length of the default game.
+    """
+
+    def __init__(
+        self,
+        num_player: NumPlayer,
+        game_length: GameLength,
+        bundle: ModelBundle | None = None,
+        predictors: Iterable[Predictor] = (),
+        cache_size: int = 0,
+    ) -> None:
+        """Initializes the instance of `PredictorRouter`.
+
+        Args:
+            num_player: The number of players of the default game, which
+                is used for requests that do not specify it.
+            game_length: The length of the default game, which is used
+                for requests that do not specify it.
+            bundle: The bundle to load the models from. Defaults to
+                None.
+            predictors: The predictors created in advance, which take
+                precedence over the models of the bundle. Defaults to
+                none.
+            cache_size: The maximum number of predictions to cache for
+                each game whose predictor is created from the bundle. If
+                0, predictions are not cached. Defaults to 0.
+
+        Raises:
+            ValueError: If there is no model for the default game, or if
+                `cache_size` is negative.
+        """
+        if cache_size < 0:
+            msg = f"`cache_size` must not be negative: {cache_size}"
+            raise ValueError(msg)
+
+        self.num_player = num_player
+        self.game_length = game_length
+        self._bundle = bundle
+        self._cache_size = cache_size
+        self._predictors = {
+            (predictor.num_player, predictor.game_length): predictor
+            for predictor in predictors
+        }
+        self._lock = threading.Lock()
+        if not self._has_model((num_player, game_length)):
+            msg = (
+                "There is no model for the default game."
+                f": {num_player}-Player, {get_game_length_name(game_length)}"
+            )
+            raise ValueError(msg)
+
+    def _has_model(self, game: tuple[NumPlayer, GameLength]) -> bool:
+        return game in self._predictors or (
+            self._bundle is not None and game in self._bundle
+        )
+
+    @property
+    def predictors(self) -> list[Predictor]:
+        """The predictors that have been created."""
+        with self._lock:
+            return list(self._predictors.values())
+
+    def get(
+        self,
+        num_player: NumPlayer | None = None,
+        game_length: GameLength | None = None,
+    ) -> Predictor:
+        """Gets the predictor for a game.
+
+        Args:
+            num_player: The number of players. If None, the one of the
+                default game is used. Defaults to None.
+            game_length: The length of the game. If None, the one of the
+                default game is used. Defaults to None.
+
+        Returns:
+            The predictor for the game.
+
+        Raises:
+            ValueError: If there is no model for the game.
+        """
+        game = (
+            self.num_player if num_player is None else num_player,
+            self.game_length if game_length is None else game_length,
+        )
+        predictor = self._predictors.get(game)
+        if predictor is not None:
+            return predictor
+
+        if self._bundle is None or not self._has_model(game):
+            msg = (
+                "There is no model for the game."
+                f": {game[0]}-Player, {get_game_length_name(game[1])}"
+            )
+            raise ValueError(msg)
+        with self._lock:
+            predictor = self._predictors.get(game)
+            if predictor is None:
+                predictor = Predictor(
+                    self._bundle.load(*game),
+                    *game,
+                    self._cache_size,
+                )
+                self._predictors[game] = predictor
+            return predictor
@@ -0,0 +1,174 @@
+"""Provides a reader that prefetches files with a pool of threads.
+
+Reading a file from a network file system takes a round trip for each
+request, and the CPU is idle while it waits if the files are read one by
+one. `Prefetcher` reads the upcoming files in background threads while
+the current one is being processed, and bounds the number of bytes that
+have been read but not yet consumed.
+"""
+
+import os
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+
+class _ByteBudget:
+    # Admits the reads in the order of their tickets as long as the
+    # number of bytes in flight stays within the limit. A read larger
+    # than the limit is admitted when nothing else is in flight, so the
+    # reads never wait for each other forever.
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._used = 0
+        self._next_ticket = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self, ticket: int, size: int) -> bool:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._closed
+                or (
+                    ticket == self._next_ticket
+                    and (self._used == 0 or self._used + size <= self._limit)
+                ),
+            )
+            if self._closed:
+                return False
+            self._used += size
+            self._next_ticket += 1
+            self._condition.notify_all()
+            return True
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self._used -= size
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class Prefetcher:
+    """Reads files in background threads in the order they are given.
+
+    Iterating over the instance yields each file with its content. An
+    `OSError` raised while reading a file is raised when the file is
+    reached. The bytes of a file are counted as in flight from when the
+    file is read until the next file is requested.
+    """
+
+    def __init__(
+        self,
+        files: Iterable[Path],
+        max_bytes: int,
+        num_thread: int = 8,
+    ) -> None:
+        """Initializes the instance and starts no reads yet.
+
+        Args:
+            files: The files to read.
+            max_bytes: The maximum number of bytes in flight.
+            num_thread: The number of threads to read the files with.
+                Defaults to 8.
+
+        Raises:
+            ValueError: If `max_bytes` or `num_thread` is not positive.
+        """
+        if max_bytes <= 0:
+            msg = f"`max_bytes` must be positive: {max_bytes}"
+            raise ValueError(msg)
+
+        if num_thread <= 0:
+            msg = f"`num_thread` must be positive: {num_thread}"
+            raise ValueError(msg)
+
+        self._files = iter(files)
+        self._num_thread = num_thread
+        self._budget = _ByteBudget(max_bytes)
+        self._executor = ThreadPoolExecutor(
+            num_thread,
+            thread_name_prefix="prefetch",
+        )
+        self._pending: deque[tuple[Path, Future[bytes | None]]] = deque()
+        self._num_ticket = 0
+
+    def __enter__(self) -> Self:
+        """Returns the instance itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the reads in progress."""
+        self.close()
+
+    def __iter__(self) -> Iterator[tuple[Path, bytes]]:
+        """Yields each file with its content in the given order.
+
+        Yields:
+            The path and the content of the file.
+
+        Raises:
+            OSError: If a file cannot be read.
+        """
+        self._fill()
+        while self._pending:
+            file, future = self._pending.popleft()
+            data = future.result()
+            if data is None:
+                return
+            try:
+                yield (file, data)
+            finally:
+                self._budget.release(len(data))
+            self._fill()
+
+    def close(self) -> None:
+        """Stops the reads in progress and the threads."""
+        self._budget.close()
+        self._executor.shutdown(cancel_futures=True)
+
+    def _fill(self) -> None:
+        # Keeps twice as many reads as threads queued, so that a thread
+        # can start the next read as soon as it finishes one.
+        while len(self._pending) < self._num_thread * 2:
+            file = next(self._files, None)
+            if file is None:
+                return
+            future = self._executor.submit(self._read, self._num_ticket, file)
+            self._pending.append((file, future))
+            self._num_ticket += 1
+
+    def _read(self, ticket: int, file: Path) -> bytes | None:
+        size = 0
+        acquired = False
+        try:
+            with file.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                acquired = self._budget.acquire(ticket, size)
+                if not acquired:
+                    return None
+                data = f.read()
+        except BaseException:
+            if acquired:
+                self._budget.release(size)
+            else:
+                # Passes the turn on to the next file.
+                self._budget.acquire(ticket, 0)
+            raise
+
+        # The file may have changed since `fstat`.
+        self._budget.release(size - len(data))
+        return data
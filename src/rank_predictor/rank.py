@@ -33,6 +33,93 @@ Examples:
 """
 
 
+def _create_rank_indexes(
+    rank_permutation: tuple[tuple[int, ...], ...],
+    num_player: NumPlayer,
+) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    return tuple(
+        tuple(
+            tuple(
+                i for i, t in enumerate(rank_permutation) if t[rank] == player
+            )
+            for rank in range(num_player)
+        )
+        for player in range(num_player)
+    )
+
+
+RANK_INDEXES_4: Final = _create_rank_indexes(
+    RANK_PERMUTATION_4,
+    NumPlayer.FOUR,
+)
+"""A table of the indexes of the rank permutations for 4 players.
+
+`RANK_INDEXES_4[player][rank]` holds the indexes of permutations where
+the player's rank is equal to the rank. Both are 0-based.
+
+Examples:
+    >>> RANK_INDEXES_4[0][0]
+    (0, 1, 2, 3, 4, 5)
+    >>> RANK_INDEXES_4[3][0]
+    (18, 19, 20, 21, 22, 23)
+"""
+
+RANK_INDEXES_3: Final = _create_rank_indexes(
+    RANK_PERMUTATION_3,
+    NumPlayer.THREE,
+)
+"""A table of the indexes of the rank permutations for 3 players.
+
+`RANK_INDEXES_3[player][rank]` holds the indexes of permutations where
+the player's rank is equal to the rank. Both are 0-based.
+
+Examples:
+    >>> RANK_INDEXES_3[0][0]
+    (0, 1)
+    >>> RANK_INDEXES_3[2][1]
+    (1, 3)
+"""
+
+
+def _create_player_ranks(
+    rank_permutation: tuple[tuple[int, ...], ...],
+) -> tuple[tuple[int, ...], ...]:
+    # Inverts each permutation from "rank->player" to "player->rank".
+    return tuple(
+        tuple(t.index(player) for player in range(len(t)))
+        for t in rank_permutation
+    )
+
+
+PLAYER_RANKS_4: Final = _create_player_ranks(RANK_PERMUTATION_4)
+"""A tuple of the ranks of each player for each rank class for 4
+players.
+
+`PLAYER_RANKS_4[rank_class][player]` is the rank of the player in the
+rank class. Ranks are 0-based.
+
+Examples:
+    >>> len(PLAYER_RANKS_4)
+    24
+    >>> PLAYER_RANKS_4[13]
+    (1, 3, 0, 2)
+"""
+
+PLAYER_RANKS_3: Final = _create_player_ranks(RANK_PERMUTATION_3)
+"""A tuple of the ranks of each player for each rank class for 3
+players.
+
+`PLAYER_RANKS_3[rank_class][player]` is the rank of the player in the
+rank class. Ranks are 0-based.
+
+Examples:
+    >>> len(PLAYER_RANKS_3)
+    6
+    >>> PLAYER_RANKS_3[3]
+    (2, 0, 1)
+"""
+
+
 def get_indexes(
     num_player: NumPlayer,
     player: int,
@@ -61,14 +148,41 @@ def get_indexes(
         msg = f"Rank {rank} is out of range for {num_player}-player."
         raise IndexError(msg)
 
-    rank_permutation = (
-        RANK_PERMUTATION_4
-        if num_player == NumPlayer.FOUR
-        else RANK_PERMUTATION_3
+    rank_indexes = (
+        RANK_INDEXES_4 if num_player == NumPlayer.FOUR else RANK_INDEXES_3
     )
-    return tuple(
-        i for i, t in enumerate(rank_permutation) if t[rank] == player
+    return rank_indexes[player][rank]
+
+
+def rank_of(num_player: NumPlayer, rank_class: int) -> tuple[int, ...]:
+    """Retrieves the ranks of the players in the rank class.
+
+    This is the inverse of `classify`.
+
+    Args:
+        num_player: The number of players.
+        rank_class: The index of rank permutation.
+
+    Returns:
+        The ranks of the players. Ranks are 0-based.
+
+    Raises:
+        IndexError: If `rank_class` is out of the valid range based on
+            `num_player`.
+
+    Examples:
+        >>> rank_of(NumPlayer.FOUR, 13)
+        (1, 3, 0, 2)
+    """
+    player_ranks = (
+        PLAYER_RANKS_4 if num_player == NumPlayer.FOUR else PLAYER_RANKS_3
     )
+    if not (0 <= rank_class < len(player_ranks)):
+        msg = (
+            f"Rank class {rank_class} is out of range for {num_player}-player."
+        )
+        raise IndexError(msg)
+    return player_ranks[rank_class]
 
 
 RANK_CLASS_4: Final = {
@@ -0,0 +1,265 @@
+"""Provides a cache of the records parsed from game records.
+
+The cache allows `rank_predictor.convert.convert` to regenerate the
+annotated data, for example with different output options, without
+parsing the game records again. The records are stored as arrays in a
+single `.npz` file, and each game record is identified by its resolved
+path, size and modification time.
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+import numpy as np
+
+from rank_predictor.types import GameLength, NumPlayer
+
+NUM_STATE_COLUMN: Final[int] = 3
+"""The number of columns of the round state: `round`,
+`num_counter_stick` and `num_riichi_deposit`."""
+
+_NUM_SCORE_COLUMN: Final[int] = NumPlayer.FOUR
+_NUM_ROW_COLUMN: Final[int] = NUM_STATE_COLUMN + _NUM_SCORE_COLUMN
+_OK: Final[str] = ""
+
+
+@dataclass
+class ParsedRecord:
+    """The records parsed from a game record.
+
+    Attributes:
+        num_player: The number of players in the game.
+        game_length: The length of the game.
+        states: The state of each round as an array of shape
+            (number of rounds, 3). See `NUM_STATE_COLUMN`.
+        scores: The scores at the start of each round as an array of
+            shape (number of rounds, `num_player`).
+        result: The final scores as an array of shape (`num_player`,).
+    """
+
+    num_player: NumPlayer
+    game_length: GameLength
+    states: np.ndarray
+    scores: np.ndarray
+    result: np.ndarray
+
+
+@dataclass
+class SkippedRecord:
+    """The reason why a game record was skipped.
+
+    Attributes:
+        counter: The name of the counter, such as `files_skipped`.
+        reason: The reason, such as `not_mjlog`.
+    """
+
+    counter: str
+    reason: str
+
+
+def _get_default_file_mode() -> int:
+    # The umask can only be read by setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# The size, modification time and records of a game record.
+_Entry = tuple[int, int, ParsedRecord | SkippedRecord]
+
+
+class ParsedRecordCache:
+    """A cache of the records parsed from game records.
+
+    Attributes:
+        path: The path to the cache file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initializes the instance and loads the cache if it exists.
+
+        Args:
+            path: The path to the cache file.
+
+        Raises:
+            FileExistsError: If a directory with the same name as the
+                cache file exists.
+        """
+        if path.is_dir():
+            msg = f"A directory with the same name as the cache exists: {path}"
+            raise FileExistsError(msg)
+
+        self.path = path
+        self._keys: np.ndarray = np.empty(0, dtype=np.str_)
+        self._sizes = np.empty(0, dtype=np.int64)
+        self._mtimes = np.empty(0, dtype=np.int64)
+        self._statuses: np.ndarray = np.empty(0, dtype=np.str_)
+        self._num_players = np.empty(0, dtype=np.int8)
+        self._is_hanchan = np.empty(0, dtype=np.bool_)
+        self._offsets = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._rows = np.empty((0, _NUM_ROW_COLUMN), np.int32)
+        self._results = np.empty((0, _NUM_SCORE_COLUMN), np.int32)
+        if path.is_file():
+            self._load()
+
+        self._index = {str(k): i for i, k in enumerate(self._keys)}
+        self._new: dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        """Returns the number of game records in the cache."""
+        return len(self._index.keys() | self._new.keys())
+
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            self._keys = data["keys"]
+            self._sizes = data["sizes"]
+            self._mtimes = data["mtimes"]
+            self._statuses = data["statuses"]
+            self._num_players = data["num_players"]
+            self._is_hanchan = data["is_hanchan"]
+            self._offsets = data["offsets"]
+            self._counts = data["counts"]
+            self._rows = data["rows"]
+            self._results = data["results"]
+
+    @staticmethod
+    def _identify(file: Path) -> tuple[str, int, int]:
+        stat = file.stat()
+        return (str(file.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, file: Path) -> ParsedRecord | SkippedRecord | None:
+        """Gets the cached records of a game record.
+
+        Args:
+            file: The path to the game record.
+
+        Returns:
+            The cached records, or None if the game record is not cached
+                or has changed since it was cached.
+        """
+        key, size, mtime = self._identify(file)
+
+        if key in self._new:
+            new_size, new_mtime, record = self._new[key]
+            if (new_size, new_mtime) == (size, mtime):
+                return record
+            return None
+
+        i = self._index.get(key)
+        if i is None or (self._sizes[i], self._mtimes[i]) != (size, mtime):
+            return None
+
+        status = str(self._statuses[i])
+        if status != _OK:
+            counter, reason = status.split(":", 1)
+            return SkippedRecord(counter=counter, reason=reason)
+
+        num_player = NumPlayer(int(self._num_players[i]))
+        rows = self._rows[
+            self._offsets[i] : self._offsets[i] + self._counts[i]
+        ]
+        return ParsedRecord(
+            num_player=num_player,
+            game_length=(
+                GameLength.HANCHAN if self._is_hanchan[i] else GameLength.TONPU
+            ),
+            states=rows[:, :NUM_STATE_COLUMN],
+            scores=rows[:, NUM_STATE_COLUMN : NUM_STATE_COLUMN + num_player],
+            result=self._results[i, :num_player],
+        )
+
+    def put(self, file: Path, record: ParsedRecord | SkippedRecord) -> None:
+        """Adds the records of a game record to the cache.
+
+        The records replace any cached records of the same game record.
+        They are written to the file by `save`.
+
+        Args:
+            file: The path to the game record.
+            record: The records parsed from the game record.
+        """
+        key, size, mtime = self._identify(file)
+        self._new[key] = (size, mtime, record)
+
+    def save(self) -> None:
+        """Writes the cache to the file.
+
+        The file is replaced atomically, so an interrupted run does not
+        leave a broken cache. It gets the permissions of a file created
+        with `open`, so that other users can share the cache.
+        """
+        keep = [i for k, i in self._index.items() if k not in self._new]
+        num_new = len(self._new)
+
+        keys = [*self._keys[keep], *self._new]
+        sizes = [*self._sizes[keep], *(v[0] for v in self._new.values())]
+        mtimes = [*self._mtimes[keep], *(v[1] for v in self._new.values())]
+        statuses = list(self._statuses[keep])
+        num_players = list(self._num_players[keep])
+        is_hanchan = list(self._is_hanchan[keep])
+        counts = list(self._counts[keep])
+        rows = [
+            self._rows[self._offsets[i] : self._offsets[i] + self._counts[i]]
+            for i in keep
+        ]
+        results = np.zeros((len(keep) + num_new, _NUM_SCORE_COLUMN), np.int32)
+        results[: len(keep)] = self._results[keep]
+
+        for j, (_, _, record) in enumerate(self._new.values(), len(keep)):
+            if isinstance(record, SkippedRecord):
+                statuses.append(f"{record.counter}:{record.reason}")
+                num_players.append(0)
+                is_hanchan.append(False)
+                counts.append(0)
+                continue
+            statuses.append(_OK)
+            num_players.append(record.num_player)
+            is_hanchan.append(record.game_length == GameLength.HANCHAN)
+            counts.append(len(record.states))
+            row = np.zeros(
+                (len(record.states), _NUM_ROW_COLUMN),
+                np.int32,
+            )
+            row[:, :NUM_STATE_COLUMN] = record.states
+            row[:, NUM_STATE_COLUMN : NUM_STATE_COLUMN + record.num_player] = (
+                record.scores
+            )
+            rows.append(row)
+            results[j, : record.num_player] = record.result
+
+        counts_array = np.asarray(counts, dtype=np.int64)
+        offsets = np.zeros_like(counts_array)
+        np.cumsum(counts_array[:-1], out=offsets[1:])
+
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    keys=np.asarray(keys, dtype=np.str_),
+                    sizes=np.asarray(sizes, dtype=np.int64),
+                    mtimes=np.asarray(mtimes, dtype=np.int64),
+                    statuses=np.asarray(statuses, dtype=np.str_),
+                    num_players=np.asarray(num_players, dtype=np.int8),
+                    is_hanchan=np.asarray(is_hanchan, dtype=np.bool_),
+                    offsets=offsets,
+                    counts=counts_array,
+                    rows=np.concatenate(
+                        [
+                            np.empty((0, _NUM_ROW_COLUMN), np.int32),
+                            *rows,
+                        ],
+                    ),
+                    results=results,
+                )
+            # The cache may be shared, so it gets the permissions of a
+            # file created with `open`, not those of a temporary file.
+            Path(tmp).chmod(_get_default_file_mode())
+            Path(tmp).replace(self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
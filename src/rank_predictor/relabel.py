@@ -0,0 +1,122 @@
+"""Provides functionality to relabel annotated data."""
+
+from logging import getLogger
+from pathlib import Path
+
+import polars as pl
+
+from rank_predictor.rank import PLAYER_RANKS_3, PLAYER_RANKS_4
+from rank_predictor.types import DataName, NumPlayer
+
+logger = getLogger(__name__)
+
+
+def _create_rank_code_table(num_player: NumPlayer) -> dict[int, int]:
+    # Maps the ranks of all players, encoded as a base-`num_player`
+    # number (`rank_0 + rank_1 * n + ...`), to the rank class.
+    player_ranks = (
+        PLAYER_RANKS_4 if num_player == NumPlayer.FOUR else PLAYER_RANKS_3
+    )
+    return {
+        sum(rank * num_player**player for player, rank in enumerate(ranks)): i
+        for i, ranks in enumerate(player_ranks)
+    }
+
+
+def _final_rank_expr(num_player: NumPlayer, player: int) -> pl.Expr:
+    # The rank is the number of players with a higher final score.
+    # Ties are broken by seat order, so a player ranks below any
+    # player with the same score who sits closer to the qijia.
+    score = pl.col(f"{DataName.FINAL_SCORE}_{player}")
+    beaten_by = [
+        (pl.col(f"{DataName.FINAL_SCORE}_{other}") > score)
+        | (
+            (pl.col(f"{DataName.FINAL_SCORE}_{other}") == score)
+            & pl.lit(other < player)
+        )
+        for other in range(num_player)
+        if other != player
+    ]
+    return pl.sum_horizontal(beaten_by).cast(pl.Int64)
+
+
+def relabel(
+    num_player: NumPlayer,
+    input_data_path: Path,
+    output_data_path: Path,
+    *,
+    output_final_rank: bool,
+) -> None:
+    """Recomputes the labels of annotated data from the final scores.
+
+    The annotated data must have been created with the final scores
+    (`final_score_*` columns). `rank_class` is recomputed from them
+    with the same rule as `rank_predictor.rank.classify`, and all
+    other columns are copied as they are. The data is processed as a
+    stream, so the whole file is never loaded into memory.
+
+    Args:
+        num_player: The number of players in the annotated data.
+        input_data_path: The path to the annotated data to relabel.
+        output_data_path: The destination path for the relabeled data.
+        output_final_rank: If True, appends the final rank (0-based) of
+            each player as `final_rank_*` columns.
+
+    Raises:
+        FileNotFoundError: If the input data is not found.
+        FileExistsError: If a directory with the same name as the output
+            file already exists.
+        ValueError: If the input and output paths are the same, or if
+            the input data is missing the final score columns.
+    """
+    if not input_data_path.is_file():
+        msg = f"`input_data_path` is not a file: {input_data_path}"
+        raise FileNotFoundError(msg)
+
+    if output_data_path.is_dir():
+        msg = (
+            "A directory with the same name as `output_data_path` exists:"
+            f" {output_data_path}"
+        )
+        raise FileExistsError(msg)
+
+    if input_data_path.resolve() == output_data_path.resolve():
+        msg = "`input_data_path` and `output_data_path` must be different."
+        raise ValueError(msg)
+
+    input_data = pl.scan_csv(input_data_path)
+
+    columns = input_data.collect_schema().names()
+    required_columns = [
+        *[f"{DataName.FINAL_SCORE}_{i}" for i in range(num_player)],
+        DataName.RANK_CLASS,
+    ]
+    missing_columns = [r for r in required_columns if r not in columns]
+    if missing_columns:
+        msg = f"The data is missing columns: {missing_columns}"
+        raise ValueError(msg)
+
+    logger.info("Relabeling target: %s-Player", num_player)
+
+    final_ranks = [
+        _final_rank_expr(num_player, i).alias(f"{DataName.FINAL_RANK}_{i}")
+        for i in range(num_player)
+    ]
+    rank_code = pl.sum_horizontal(
+        pl.col(f"{DataName.FINAL_RANK}_{i}") * num_player**i
+        for i in range(num_player)
+    )
+    rank_code_table = _create_rank_code_table(num_player)
+
+    output_data = input_data.with_columns(final_ranks).with_columns(
+        rank_code.replace_strict(
+            rank_code_table,
+            return_dtype=pl.Int64,
+        ).alias(DataName.RANK_CLASS),
+    )
+    if not output_final_rank:
+        output_data = output_data.select(columns)
+
+    output_data.sink_csv(output_data_path)
+
+    logger.info("Relabeling is complete.")
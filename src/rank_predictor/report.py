@@ -0,0 +1,313 @@
+"""Provides instrumentation for runs of the tools."""
+
+import cProfile
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from logging import Logger
+from pathlib import Path
+from typing import Any
+
+METRIC_PREFIX = "rank_predictor"
+
+
+class RunReport:
+    """Collects per-stage timings and counters of a run.
+
+    Stage timings are accumulated over every entry of the stage, so a
+    stage such as `parse` reports the total time spent on all files.
+    Counters may be broken down by a reason, such as the reason a file
+    was skipped.
+
+    Attributes:
+        command: The name of the command being run.
+    """
+
+    def __init__(self, command: str = "") -> None:
+        """Initializes the instance of `RunReport`.
+
+        Args:
+            command: The name of the command being run. Defaults to "".
+        """
+        self.command = command
+        self._started_at = datetime.now(UTC)
+        self._start = time.perf_counter()
+        self._stage_seconds: defaultdict[str, float] = defaultdict(float)
+        self._stage_calls: defaultdict[str, int] = defaultdict(int)
+        self._counters: defaultdict[str, int] = defaultdict(int)
+        self._reason_counters: defaultdict[str, defaultdict[str, int]] = (
+            defaultdict(lambda: defaultdict(int))
+        )
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Measures the time spent in the `with` block as a stage.
+
+        Args:
+            stage: The name of the stage.
+
+        Yields:
+            None.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stage_seconds[stage] += time.perf_counter() - start
+            self._stage_calls[stage] += 1
+
+    def count(
+        self,
+        name: str,
+        value: int = 1,
+        reason: str | None = None,
+    ) -> None:
+        """Increments a counter.
+
+        Args:
+            name: The name of the counter.
+            value: The amount to increment. Defaults to 1.
+            reason: The reason to break down the counter by. Defaults to
+                None.
+        """
+        if reason is None:
+            self._counters[name] += value
+        else:
+            self._reason_counters[name][reason] += value
+
+    def merge(self, other: dict[str, Any]) -> None:
+        """Adds the stage timings and the counters of another report.
+
+        Args:
+            other: The report returned by `to_dict`, such as the report
+                of a worker process.
+        """
+        for stage, entry in other["stages"].items():
+            self._stage_seconds[stage] += entry["seconds"]
+            self._stage_calls[stage] += entry["count"]
+        for name, value in other["counters"].items():
+            if isinstance(value, dict):
+                for reason, count in value.items():
+                    self._reason_counters[name][reason] += count
+            else:
+                self._counters[name] += value
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the report as a dict that can be serialized as JSON.
+
+        Returns:
+            The report.
+        """
+        counters: dict[str, Any] = dict(self._counters)
+        for name, reasons in self._reason_counters.items():
+            counters[name] = dict(reasons)
+        return {
+            "command": self.command,
+            "started_at": self._started_at.isoformat(),
+            "elapsed_seconds": time.perf_counter() - self._start,
+            "stages": {
+                stage: {
+                    "seconds": seconds,
+                    "count": self._stage_calls[stage],
+                }
+                for stage, seconds in self._stage_seconds.items()
+            },
+            "counters": counters,
+        }
+
+    def to_prometheus(self) -> str:
+        """Returns the report in the Prometheus text exposition format.
+
+        The output is intended for the textfile collector of the node
+        exporter.
+
+        Returns:
+            The report.
+        """
+        command = f'command="{self.command}"'
+        lines = [
+            f"# TYPE {METRIC_PREFIX}_run_seconds gauge",
+            f"{METRIC_PREFIX}_run_seconds{{{command}}}"
+            f" {time.perf_counter() - self._start}",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds_total counter",
+        ]
+        lines.extend(
+            f'{METRIC_PREFIX}_stage_seconds_total{{{command},stage="{stage}"}}'
+            f" {seconds}"
+            for stage, seconds in self._stage_seconds.items()
+        )
+        for name in sorted({*self._counters, *self._reason_counters}):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            if name in self._counters:
+                lines.append(f"{metric}{{{command}}} {self._counters[name]}")
+            lines.extend(
+                f'{metric}{{{command},reason="{reason}"}} {value}'
+                for reason, value in self._reason_counters[name].items()
+            )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Writes the report to a file.
+
+        If the extension of `path` is `.prom`, the report is written in
+        the Prometheus text exposition format, otherwise it is written
+        in JSON format.
+
+        Args:
+            path: The destination path for the report.
+        """
+        if path.suffix == ".prom":
+            path.write_text(self.to_prometheus())
+        else:
+            with path.open("w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+class ProgressLogger:
+    """Logs the progress of a loop at most once per interval.
+
+    Attributes:
+        logger: The logger to log the progress with.
+        message: The message of the progress line.
+        interval: The minimum number of seconds between log lines.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        message: str,
+        interval: float = 5.0,
+    ) -> None:
+        """Initializes the instance of `ProgressLogger`.
+
+        Args:
+            logger: The logger to log the progress with.
+            message: The message of the progress line.
+            interval: The minimum number of seconds between log lines.
+                Defaults to 5.0.
+        """
+        self.logger = logger
+        self.message = message
+        self.interval = interval
+        self._count = 0
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def update(self, value: int = 1) -> None:
+        """Advances the progress and logs it if the interval has passed.
+
+        Args:
+            value: The amount of progress. Defaults to 1.
+        """
+        self._count += value
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._log(now)
+
+    def close(self) -> None:
+        """Logs the final progress."""
+        self._log(time.perf_counter())
+
+    def _log(self, now: float) -> None:
+        elapsed = now - self._start
+        rate = self._count / elapsed if elapsed > 0 else 0.0
+        self.logger.info(
+            "%s : %s (%.1f/s)",
+            self.message,
+            self._count,
+            rate,
+        )
+
+
+def _write_memory_report(
+    path: Path,
+    snapshot: tracemalloc.Snapshot,
+    peak: int,
+    top: int,
+) -> None:
+    # Leave out the allocations of the profilers and of imports.
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(
+                inclusive=False,
+                filename_pattern=cProfile.__file__,
+            ),
+            tracemalloc.Filter(
+                inclusive=False,
+                filename_pattern=tracemalloc.__file__,
+            ),
+            tracemalloc.Filter(
+                inclusive=False,
+                filename_pattern="<frozen importlib.*>",
+            ),
+        ),
+    )
+    statistics = snapshot.statistics("lineno")
+    live = sum(stat.size for stat in statistics)
+    # tracemalloc records only the size of the peak, so the sites are
+    # those of the memory still allocated when the function returns,
+    # not of the memory allocated at the peak.
+    lines = [
+        f"Peak traced memory: {peak / 1024**2:.1f} MiB",
+        f"Live allocations at exit: {live / 1024**2:.1f} MiB",
+        f"Top {top} sites of the live allocations at exit (not at the peak):",
+    ]
+    lines.extend(
+        f"#{i}: {stat.size / 1024:.1f} KiB in {stat.count} blocks"
+        f" at {stat.traceback}"
+        for i, stat in enumerate(statistics[:top], start=1)
+    )
+    other = sum(stat.size for stat in statistics[top:])
+    lines.append(f"Other: {other / 1024:.1f} KiB")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def run_with_profiling(
+    func: Callable[[], object],
+    profile_path: Path | None = None,
+    memory_report_path: Path | None = None,
+    top: int = 25,
+) -> None:
+    """Runs a function under cProfile and tracemalloc.
+
+    The outputs are written even if the function raises an exception.
+    Only the current process is profiled. The allocation report gives
+    the peak traced memory, but its allocation sites are those of the
+    memory that is still allocated when the function returns, because
+    tracemalloc does not keep the allocations at the peak.
+
+    Args:
+        func: The function to run.
+        profile_path: The destination path for the pstats file of
+            cProfile. If None, cProfile is not used. Defaults to None.
+        memory_report_path: The destination path for the report of
+            the peak memory and the live allocations at exit. If None,
+            tracemalloc is not used. Defaults to None.
+        top: The number of allocation sites in the allocation report.
+            Defaults to 25.
+    """
+    profiler = cProfile.Profile() if profile_path is not None else None
+    if memory_report_path is not None:
+        tracemalloc.start()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            func()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        if profiler is not None and profile_path is not None:
+            profiler.dump_stats(profile_path)
+        if memory_report_path is not None:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            _write_memory_report(memory_report_path, snapshot, peak, top)
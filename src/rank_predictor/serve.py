@@ -0,0 +1,505 @@
+"""Provides servers that predict the expected final ranks.
+
+`serve` listens on a TCP socket, and `stream` reads the requests from a
+stream such as the standard input of a long-lived process.
+
+`serve` forks worker processes that accept connections on one listening
+socket, so the kernel balances the connections across them. The workers
+are forked after the model is loaded, so they share the memory-mapped
+arrays of the model and the rank tables of `rank_predictor.predict`
+instead of holding a copy each. Polars is not fork-safe once its thread
+pool is running, so neither the server before the fork nor the workers
+use Polars: requests are parsed with `json` and predicted with NumPy.
+
+For both, each request and response is a line of JSON. A request has
+the keys `round`, `num_counter_stick`, `num_riichi_deposit` and `score`,
+with the same meaning as the arguments of the `predict` command, and a
+response has the keys `rank_proba` and `expected_rank`, or `error` if
+the request is invalid. With a `rank_predictor.predict.PredictorRouter`,
+a request may also have the keys `num_player` and `game_length` to
+select the model, which otherwise default to the game of the router.
+"""
+
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from logging import getLogger
+from typing import IO, Any, Final
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from rank_predictor.predict import Prediction, Predictor, PredictorRouter
+from rank_predictor.report import RunReport
+from rank_predictor.types import GameLength, NumPlayer
+from rank_predictor.validate import check_input_states, describe_invalid_reason
+
+logger = getLogger(__name__)
+
+# A worker that exits sooner than this after it starts is counted as a
+# failure, and the server stops after too many failures in a row.
+_MIN_WORKER_SECONDS: Final[float] = 10.0
+_MAX_WORKER_FAILURE: Final[int] = 5
+_RESTART_DELAY: Final[float] = 0.5
+_MAX_RESTART_DELAY: Final[float] = 30.0
+
+
+class _PredictionServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        router: PredictorRouter,
+    ) -> None:
+        super().__init__(address, _PredictionHandler)
+        self.router = router
+
+
+class _PredictionHandler(socketserver.StreamRequestHandler):
+    server: _PredictionServer
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = _respond(self.server.router, line)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+_INT64_MIN: Final[int] = -(2**63)
+_INT64_MAX: Final[int] = 2**63 - 1
+
+
+@dataclass(frozen=True)
+class _Request:
+    predictor: Predictor
+    round_: int
+    num_counter_stick: int
+    num_riichi_deposit: int
+    input_score: list[int]
+
+
+def _as_int(name: str, value: object) -> int:
+    if not isinstance(value, int) or isinstance(value, bool):
+        msg = f"`{name}` must be an integer.: {value!r}"
+        raise TypeError(msg)
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        msg = f"`{name}` is out of range.: {value!r}"
+        raise ValueError(msg)
+    return value
+
+
+def _as_router(predictor: Predictor | PredictorRouter) -> PredictorRouter:
+    if isinstance(predictor, PredictorRouter):
+        return predictor
+    return PredictorRouter(
+        predictor.num_player,
+        predictor.game_length,
+        predictors=(predictor,),
+    )
+
+
+def _parse_request(router: PredictorRouter, line: bytes) -> _Request:
+    # Checks only the types here. The values of all the requests in a
+    # batch are checked at once by `_respond_many`.
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        msg = "The request must be a JSON object."
+        raise TypeError(msg)
+
+    num_player = request.get("num_player")
+    if num_player is not None:
+        num_player = NumPlayer(_as_int("num_player", num_player))
+    game_length = request.get("game_length")
+    if game_length is not None:
+        if not isinstance(game_length, str):
+            msg = f"`game_length` must be a string.: {game_length!r}"
+            raise TypeError(msg)
+        game_length = GameLength(game_length)
+    predictor = router.get(num_player, game_length)
+
+    scores = request["score"]
+    if not isinstance(scores, list):
+        msg = f"`score` must be an array.: {scores!r}"
+        raise TypeError(msg)
+    if len(scores) != predictor.num_player:
+        msg = "The number of the scores does not match the `num_player`"
+        raise ValueError(msg)
+
+    return _Request(
+        predictor=predictor,
+        round_=_as_int("round", request["round"]),
+        num_counter_stick=_as_int(
+            "num_counter_stick",
+            request["num_counter_stick"],
+        ),
+        num_riichi_deposit=_as_int(
+            "num_riichi_deposit",
+            request["num_riichi_deposit"],
+        ),
+        input_score=[_as_int("score", s) for s in scores],
+    )
+
+
+def _format(prediction: Prediction) -> dict[str, Any]:
+    return {
+        "rank_proba": prediction.player_rank_proba.tolist(),
+        "expected_rank": prediction.expected_rank.tolist(),
+    }
+
+
+def _try_parse_request(
+    router: PredictorRouter,
+    line: bytes,
+) -> _Request | dict[str, Any]:
+    # Returns the response for an invalid request instead of raising.
+    try:
+        return _parse_request(router, line)
+    except KeyError as e:
+        return {"error": f"{e} is missing."}
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def _respond(router: PredictorRouter, line: bytes) -> dict[str, Any]:
+    return _respond_many(router, [line])[0]
+
+
+def _respond_many(
+    router: PredictorRouter,
+    lines: Iterable[bytes],
+) -> list[dict[str, Any]]:
+    parsed = [_try_parse_request(router, line) for line in lines]
+
+    # The requests for each model are predicted with one call.
+    groups: dict[Predictor, dict[int, _Request]] = {}
+    for i, request in enumerate(parsed):
+        if isinstance(request, _Request):
+            groups.setdefault(request.predictor, {})[i] = request
+
+    responses = [
+        {} if isinstance(response, _Request) else response
+        for response in parsed
+    ]
+    for predictor, requests in groups.items():
+        for i, response in zip(
+            requests,
+            _predict_requests(predictor, list(requests.values())),
+            strict=True,
+        ):
+            responses[i] = response
+    return responses
+
+
+def _predict_requests(
+    predictor: Predictor,
+    requests: list[_Request],
+) -> list[dict[str, Any]]:
+    feature = np.array(
+        [
+            (
+                r.round_,
+                r.num_counter_stick,
+                r.num_riichi_deposit,
+                *r.input_score,
+            )
+            for r in requests
+        ],
+        dtype=np.int64,
+    ).reshape(len(requests), 3 + predictor.num_player)
+    valid, reasons = check_input_states(
+        feature[:, 0],
+        feature[:, 1],
+        feature[:, 2],
+        feature[:, 3:],
+        predictor.num_player,
+        predictor.model.game_length,
+    )
+    feature[:, 3:] //= 100
+    # The predictions are formatted before the next call in the thread,
+    # so the output arrays of the thread are reused.
+    prediction = predictor.predict_feature(
+        feature[valid],
+        predictor.output_buffer(int(np.count_nonzero(valid))),
+    )
+
+    responses = []
+    prediction_index = 0
+    for is_valid, reason in zip(valid, reasons, strict=True):
+        if is_valid:
+            responses.append(
+                _format(
+                    Prediction(
+                        player_rank_proba=prediction.player_rank_proba[
+                            prediction_index
+                        ],
+                        expected_rank=prediction.expected_rank[
+                            prediction_index
+                        ],
+                    ),
+                ),
+            )
+            prediction_index += 1
+        else:
+            responses.append({"error": describe_invalid_reason(reason)})
+    return responses
+
+
+def _count_cache(router: PredictorRouter) -> tuple[int, int, int] | None:
+    # Sums up the hits, misses and evictions of the predictors.
+    caches = [p.cache for p in router.predictors if p.cache is not None]
+    if not caches:
+        return None
+    return (
+        sum(cache.hits for cache in caches),
+        sum(cache.misses for cache in caches),
+        sum(cache.evictions for cache in caches),
+    )
+
+
+def _read_lines(stream: IO[bytes], lines: queue.Queue[bytes | None]) -> None:
+    try:
+        for line in stream:
+            if line.strip():
+                lines.put(line)
+    finally:
+        lines.put(None)
+
+
+def stream(
+    predictor: Predictor | PredictorRouter,
+    input_stream: IO[bytes],
+    output_stream: IO[str],
+    max_batch_size: int = 256,
+    max_delay: float = 0.002,
+    report: RunReport | None = None,
+) -> None:
+    """Predicts for each line of a stream until the end of the stream.
+
+    A background thread reads the lines. The lines that arrive within
+    `max_delay` seconds of the first line of a batch are predicted with
+    one call of the classifier, and the responses are written in the
+    order of the requests, flushing after each batch.
+
+    Args:
+        predictor: The predictor to use, or the router to select it for
+            each request.
+        input_stream: The binary stream to read the requests from.
+        output_stream: The text stream to write the responses to.
+        max_batch_size: The maximum number of requests in a batch.
+            Defaults to 256.
+        max_delay: The maximum number of seconds to wait for more
+            requests after the first request of a batch. Defaults to
+            0.002.
+        report: The report to record the timing of the `predict` stage
+            and the counters of predictions and batches in, as well as
+            the counters of the caches of `predictor` if it has any.
+            Defaults to None.
+
+    Raises:
+        ValueError: If `max_batch_size` is not positive or `max_delay`
+            is negative.
+    """
+    if max_batch_size <= 0:
+        msg = f"`max_batch_size` must be positive: {max_batch_size}"
+        raise ValueError(msg)
+
+    if max_delay < 0:
+        msg = f"`max_delay` must not be negative: {max_delay}"
+        raise ValueError(msg)
+
+    if report is None:
+        report = RunReport()
+
+    router = _as_router(predictor)
+    lines: queue.Queue[bytes | None] = queue.Queue()
+    threading.Thread(
+        target=_read_lines,
+        args=(input_stream, lines),
+        daemon=True,
+    ).start()
+
+    end = False
+    while not end:
+        line = lines.get()
+        if line is None:
+            break
+
+        batch = [line]
+        deadline = time.monotonic() + max_delay
+        while len(batch) < max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                line = lines.get(timeout=max(timeout, 0.0))
+            except queue.Empty:
+                break
+            if line is None:
+                end = True
+                break
+            batch.append(line)
+
+        with report.time("predict"):
+            responses = _respond_many(router, batch)
+        report.count("predictions", len(batch))
+        report.count("batches")
+
+        output_stream.writelines(
+            json.dumps(response) + "\n" for response in responses
+        )
+        output_stream.flush()
+
+    counts = _count_cache(router)
+    if counts is not None:
+        hits, misses, evictions = counts
+        report.count("cache", hits, reason="hit")
+        report.count("cache", misses, reason="miss")
+        report.count("cache", evictions, reason="eviction")
+
+
+def _fork_worker(server: _PredictionServer) -> int:
+    # SIGTERM is blocked until the worker has its own handler, so that
+    # the handler of the server never runs in the worker.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+    try:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    if pid != 0:
+        return pid
+
+    # The worker exits without returning to the caller of `serve`.
+    status = 0
+    try:
+        # The request path uses only NumPy and the classifier, never
+        # Polars, whose thread pool does not survive a fork. The thread
+        # pools of BLAS and OpenMP are limited to the calling thread,
+        # because the workers already use every CPU.
+        with threadpool_limits(limits=1):
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        logger.exception("The worker %s failed.", os.getpid())
+        status = 1
+    finally:
+        counts = _count_cache(server.router)
+        if counts is not None:
+            logger.info(
+                "The worker %s had %s cache hits, %s misses and %s evictions.",
+                os.getpid(),
+                *counts,
+            )
+        os._exit(status)
+
+
+def _terminate(_signum: int, _frame: object) -> None:
+    sys.exit(0)
+
+
+def _get_restart_delay(num_failure: int) -> float:
+    # Exponential backoff after consecutive failures.
+    if num_failure == 0:
+        return 0.0
+    return min(
+        _RESTART_DELAY * 2 ** (num_failure - 1),
+        _MAX_RESTART_DELAY,
+    )
+
+
+def serve(
+    predictor: Predictor | PredictorRouter,
+    host: str,
+    port: int,
+    num_worker: int,
+) -> None:
+    """Serves predictions with worker processes until interrupted.
+
+    A worker that exits is replaced by a new one. A worker that exits
+    soon after it starts is replaced after a delay that doubles with
+    each such failure in a row, and the server stops with an error
+    after 5 of them. The server stops on SIGINT or SIGTERM and
+    terminates the workers. This function is available only on
+    platforms that support `os.fork`.
+
+    Args:
+        predictor: The predictor to use, or the router to select it for
+            each request. Load the model of a predictor with
+            `rank_predictor.model.load_mapped_model` so that the workers
+            share the arrays of the model. The models of a router are
+            loaded by each worker when they are first requested.
+        host: The host name or address to listen on.
+        port: The port to listen on. If 0, a free port is chosen.
+        num_worker: The number of worker processes.
+
+    Raises:
+        ValueError: If `num_worker` is not positive.
+        RuntimeError: If the workers keep exiting soon after they start.
+    """
+    if num_worker <= 0:
+        msg = f"`num_worker` must be positive: {num_worker}"
+        raise ValueError(msg)
+
+    with _PredictionServer((host, port), _as_router(predictor)) as server:
+        address, bound_port = server.server_address[:2]
+        logger.info(
+            "Listening on %s:%s with %s workers.",
+            address,
+            bound_port,
+            num_worker,
+        )
+
+        previous_handler = signal.signal(signal.SIGTERM, _terminate)
+        # The start time of each worker.
+        workers: dict[int, float] = {}
+        num_failure = 0
+        try:
+            for _ in range(num_worker):
+                workers[_fork_worker(server)] = time.monotonic()
+            while True:
+                pid, status = os.wait()
+                start = workers.pop(pid, None)
+                if start is None:
+                    continue
+                if time.monotonic() - start < _MIN_WORKER_SECONDS:
+                    num_failure += 1
+                else:
+                    num_failure = 0
+                exit_code = os.waitstatus_to_exitcode(status)
+                if num_failure >= _MAX_WORKER_FAILURE:
+                    msg = (
+                        f"The workers exited {num_failure} times in a row"
+                        " soon after they started. The last exit status"
+                        f" is {exit_code}."
+                    )
+                    raise RuntimeError(msg)
+
+                delay = _get_restart_delay(num_failure)
+                logger.warning(
+                    "The worker %s exited with status %s."
+                    " Restarting in %.1f seconds...",
+                    pid,
+                    exit_code,
+                    delay,
+                )
+                time.sleep(delay)
+                workers[_fork_worker(server)] = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            for pid in workers:
+                os.kill(pid, signal.SIGTERM)
+            for pid in workers:
+                os.waitpid(pid, 0)
+            logger.info("The server is stopped.")
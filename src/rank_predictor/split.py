@@ -5,6 +5,7 @@ from pathlib import Path
 import polars as pl
 from sklearn.model_selection import train_test_split
 
+from rank_predictor.report import RunReport
 from rank_predictor.types import DataName
 
 
@@ -18,6 +19,7 @@ def split(
     *,
     shuffle: bool = True,
     stratify: bool = False,
+    report: RunReport | None = None,
 ) -> None:
     """Splits the input data into training and test datasets.
 
@@ -43,24 +45,35 @@ def split(
             shuffle=False then stratify must be False. Defaults to True.
         stratify: If True, data is split in a stratified fashion, using
             `rank_class` as the class labels. Defaults to False.
+        report: The report to record the timings of the stages (`read`,
+            `split` and `write`) and the number of rows in. Defaults to
+            None.
     """
-    input_data = pl.read_csv(input_data_path)
+    if report is None:
+        report = RunReport()
+
+    with report.time("read"):
+        input_data = pl.read_csv(input_data_path)
+    report.count("rows", len(input_data))
+    report.count("bytes_read", input_data_path.stat().st_size)
 
     label = None
     if stratify:
         label = input_data.get_column(DataName.RANK_CLASS)
 
-    train_data, test_data = train_test_split(
-        input_data,
-        test_size=test_size,
-        train_size=train_size,
-        random_state=random_state,
-        shuffle=shuffle,
-        stratify=label,
-    )
+    with report.time("split"):
+        train_data, test_data = train_test_split(
+            input_data,
+            test_size=test_size,
+            train_size=train_size,
+            random_state=random_state,
+            shuffle=shuffle,
+            stratify=label,
+        )
 
     assert isinstance(train_data, pl.DataFrame)  # noqa: S101
     assert isinstance(test_data, pl.DataFrame)  # noqa: S101
 
-    train_data.write_csv(train_data_path)
-    test_data.write_csv(test_data_path)
+    with report.time("write"):
+        train_data.write_csv(train_data_path)
+        test_data.write_csv(test_data_path)
@@ -1,10 +1,28 @@
 """Provides functionality to train model."""
 
+import copy
+import multiprocessing
+import os
+import time
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from inspect import signature
 from logging import getLogger
+from pathlib import Path
+from typing import Any, Final, Literal
 
+import numpy as np
+import numpy.typing as npt
 import polars as pl
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
 
-from rank_predictor.model import Classifier, Model
+from rank_predictor.dedup import hash_file
+from rank_predictor.feature_cache import FeatureCache
+from rank_predictor.model import SUPPORTED_DTYPES, Classifier, Model
+from rank_predictor.report import RunReport
 from rank_predictor.types import (
     DataName,
     GameLength,
@@ -15,12 +33,236 @@ from rank_predictor.validate import validate_annotated_data
 
 logger = getLogger(__name__)
 
+# Polars is not fork-safe once its thread pool is running.
+_MP_CONTEXT: Final = multiprocessing.get_context("spawn")
+
+
+def _cast_fitted_arrays(classifier: Classifier, dtype: np.dtype) -> None:
+    # Some classifiers keep their fitted parameters in float64 even if
+    # they are fitted with float32 features.
+    for name, value in vars(classifier).items():
+        if (
+            name.endswith("_")
+            and isinstance(value, np.ndarray)
+            and value.dtype.kind == "f"
+        ):
+            setattr(classifier, name, value.astype(dtype, copy=False))
+        elif name == "estimators_" and isinstance(value, list):
+            # Such as those of `RoundPartitionedClassifier`.
+            for estimator in value:
+                if estimator is not None:
+                    _cast_fitted_arrays(estimator, dtype)
+
+
+def get_feature_columns(num_player: NumPlayer) -> list[str]:
+    """Gets the names of the feature columns.
+
+    Args:
+        num_player: The number of players.
+
+    Returns:
+        `round`, `num_counter_stick`, `num_riichi_deposit` and `score_*`
+            for each player.
+    """
+    return [
+        DataName.ROUND,
+        DataName.NUM_COUNTER_STICK,
+        DataName.NUM_RIICHI_DEPOSIT,
+        *[f"{DataName.SCORE}_{i}" for i in range(num_player)],
+    ]
+
+
+def _check_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    dtype = np.dtype(dtype)
+    if dtype not in SUPPORTED_DTYPES:
+        msg = f"`dtype` must be float64 or float32: {dtype}"
+        raise ValueError(msg)
+    return dtype
+
+
+def extract(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    training_data: pl.DataFrame,
+    report: RunReport | None = None,
+    dtype: npt.DTypeLike = np.float64,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Validates training data and extracts the features and the labels.
+
+    Args:
+        num_player: The number of players.
+        game_length: The length of the game.
+        training_data: The data used for training the model
+            which includes features and labels.
+        report: The report to record the timings of the stages
+            (`validate` and `extract`) and the number of rows in.
+            Defaults to None.
+        dtype: The floating-point type of the features. Defaults to
+            float64.
+
+    Returns:
+        The features as an array of shape (number of rows, number of
+            features) in the order of `get_feature_columns`, and the
+            labels (`rank_class`).
+
+    Raises:
+        ValueError: If the `training_data` is invalid or `dtype` is not
+            supported.
+    """
+    dtype = _check_dtype(dtype)
+    if report is None:
+        report = RunReport()
+
+    with report.time("validate"):
+        validate_annotated_data(num_player, game_length, training_data)
+    report.count("rows", len(training_data))
+
+    with report.time("extract"):
+        columns = pl.col(get_feature_columns(num_player)).cast(
+            pl.Float32 if dtype == np.float32 else pl.Float64,
+        )
+        feature = training_data.select(columns).to_numpy()
+        label = training_data.get_column(DataName.RANK_CLASS).to_numpy()
+    return feature, label
+
+
+def load_training_arrays(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    training_data_path: Path,
+    report: RunReport | None = None,
+    dtype: npt.DTypeLike = np.float64,
+    cache_directory: Path | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reads training data and extracts the features and the labels.
+
+    With `cache_directory`, the features and the labels are mapped
+    from the entry of a `FeatureCache` for the content of the file, or
+    are extracted and stored as the entry if there is none.
+
+    Args:
+        num_player: The number of players.
+        game_length: The length of the game.
+        training_data_path: The path to the CSV file containing the
+            annotated data.
+        report: The report to record the timings of the stages and the
+            number of rows in, and whether the cache had the entry.
+            Defaults to None.
+        dtype: The floating-point type of the features. Defaults to
+            float64.
+        cache_directory: The directory of the cache. If None, no cache
+            is used. Defaults to None.
+
+    Returns:
+        The features and the labels, as returned by `extract`. Those
+            mapped from the cache are read-only.
+
+    Raises:
+        ValueError: If the training data is invalid or `dtype` is not
+            supported.
+    """
+    dtype = _check_dtype(dtype)
+    if report is None:
+        report = RunReport()
+
+    cache = key = None
+    if cache_directory is not None:
+        cache = FeatureCache(cache_directory)
+        with report.time("hash"):
+            key = cache.key(
+                hash_file(training_data_path),
+                num_player,
+                game_length,
+                get_feature_columns(num_player),
+                dtype,
+            )
+        with report.time("load"):
+            arrays = cache.load(key)
+        if arrays is not None:
+            report.count("feature_cache", reason="hit")
+            report.count("rows", len(arrays[1]))
+            return arrays
+        report.count("feature_cache", reason="miss")
+
+    with report.time("read"):
+        training_data = pl.read_csv(training_data_path)
+    report.count("bytes_read", training_data_path.stat().st_size)
+    feature, label = extract(
+        num_player,
+        game_length,
+        training_data,
+        report,
+        dtype,
+    )
+    if cache is not None and key is not None:
+        with report.time("store"):
+            cache.save(key, feature, label)
+    return feature, label
+
+
+def fit(
+    num_player: NumPlayer,
+    game_length: GameLength,
+    feature: np.ndarray,
+    label: np.ndarray,
+    classifier: Classifier,
+    report: RunReport | None = None,
+    sample_weight: np.ndarray | None = None,
+) -> Model:
+    """Trains a model with the features and the labels.
+
+    Args:
+        num_player: The number of players.
+        game_length: The length of the game.
+        feature: The features extracted by `extract`. Their
+            floating-point type becomes the type of the model.
+        label: The labels extracted by `extract`.
+        classifier: The machine learning classifier used to train.
+        report: The report to record the timing of the `fit` stage in.
+            Defaults to None.
+        sample_weight: The weights of the rows, which the classifier
+            must accept in `fit`. If None, the rows are weighted
+            equally. Defaults to None.
+
+    Returns:
+        An instance of a trained model that is ready to make
+            predictions.
+
+    Raises:
+        ValueError: If the floating-point type of `feature` is not
+            supported.
+    """
+    dtype = _check_dtype(feature.dtype)
+    if report is None:
+        report = RunReport()
+
+    start = time.perf_counter()
+    with report.time("fit"):
+        if sample_weight is None:
+            classifier.fit(feature, label)
+        else:
+            classifier.fit(feature, label, sample_weight=sample_weight)
+    fit_seconds = time.perf_counter() - start
+    if dtype == np.float32:
+        _cast_fitted_arrays(classifier, dtype)
+
+    return Model(
+        num_player,
+        game_length,
+        classifier,
+        dtype,
+        num_row=len(label),
+        fit_seconds=fit_seconds,
+    )
+
 
 def train(
     num_player: NumPlayer,
     game_length: GameLength,
     training_data: pl.DataFrame,
     classifier: Classifier,
+    report: RunReport | None = None,
+    dtype: npt.DTypeLike = np.float64,
 ) -> Model:
     """Trains a model using the provided classifier and training data.
 
@@ -37,13 +279,22 @@ def train(
         training_data: The data used for training the model
             which includes features and labels.
         classifier: The machine learning classifier used to train.
+        report: The report to record the timings of the stages
+            (`validate`, `extract` and `fit`) and the number of rows in.
+            Defaults to None.
+        dtype: The floating-point type of the features. With float32,
+            the fitted floating-point arrays of the classifier are also
+            cast to float32, which halves the size of the model and the
+            memory traffic of predictions at the cost of precision.
+            Defaults to float64.
 
     Returns:
         An instance of a trained model that is ready to make
             predictions.
 
     Raises:
-        ValueError: If the `training_data` is invalid.
+        ValueError: If the `training_data` is invalid or `dtype` is not
+            supported.
     """
     logger.info(
         "Training target: %s-Player, %s",
@@ -51,19 +302,495 @@ def train(
         get_game_length_name(game_length),
     )
 
-    validate_annotated_data(num_player, game_length, training_data)
-
-    feature_columns = [
-        DataName.ROUND,
-        DataName.NUM_COUNTER_STICK,
-        DataName.NUM_RIICHI_DEPOSIT,
-        *[f"{DataName.SCORE}_{i}" for i in range(num_player)],
-    ]
-    label_column = DataName.RANK_CLASS
-    feature = training_data.select(feature_columns).to_numpy()
-    label = training_data.get_column(label_column).to_numpy()
-    classifier.fit(feature, label)
+    feature, label = extract(
+        num_player,
+        game_length,
+        training_data,
+        report,
+        dtype,
+    )
+    model = fit(num_player, game_length, feature, label, classifier, report)
 
     logger.info("Training is complete.")
 
-    return Model(num_player, game_length, classifier)
+    return model
+
+
+@dataclass(frozen=True)
+class TrainingJob:
+    """A model to train with `train_all`.
+
+    Attributes:
+        num_player: The number of players.
+        game_length: The length of the game.
+        training_data_path: The path to the CSV file containing the
+            annotated data to train the model with.
+        classifier: The machine learning classifier used to train.
+        dtype: The floating-point type of the features. Defaults to
+            float64.
+    """
+
+    num_player: NumPlayer
+    game_length: GameLength
+    training_data_path: Path
+    classifier: Classifier
+    dtype: npt.DTypeLike = np.float64
+
+
+def _run_training_job(
+    job: TrainingJob,
+    num_thread: int,
+) -> tuple[Model, dict[str, Any]]:
+    report = RunReport()
+    # The workers already use all the processors between them, so a
+    # classifier that fits in parallel with `joblib`, such as a
+    # round-partitioned one, fits in this process with the threads of
+    # the job instead of starting `num_thread` more processes.
+    with threadpool_limits(limits=num_thread), parallel_config(n_jobs=1):
+        with report.time("read"):
+            training_data = pl.read_csv(job.training_data_path)
+        report.count("bytes_read", job.training_data_path.stat().st_size)
+        model = train(
+            job.num_player,
+            job.game_length,
+            training_data,
+            job.classifier,
+            report,
+            job.dtype,
+        )
+    return model, report.to_dict()
+
+
+@contextmanager
+def _worker_environment(num_thread: int) -> Iterator[None]:
+    # The size of the thread pool of Polars is fixed when it is
+    # imported, so it is passed to the spawned workers through the
+    # environment. The pools of BLAS and OpenMP are limited by
+    # `threadpool_limits` in each job.
+    previous = os.environ.get("POLARS_MAX_THREADS")
+    os.environ["POLARS_MAX_THREADS"] = str(num_thread)
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["POLARS_MAX_THREADS"]
+        else:
+            os.environ["POLARS_MAX_THREADS"] = previous
+
+
+def train_all(
+    jobs: Sequence[TrainingJob],
+    num_worker: int | None = None,
+    num_thread: int | None = None,
+    report: RunReport | None = None,
+) -> list[Model]:
+    """Trains several models concurrently in worker processes.
+
+    Each job reads its own training data in a worker, so the data of
+    different models is never held by one process. The jobs with the
+    largest training data are started first. The threads of each job
+    are limited to `num_thread`, and the classifiers that fit in
+    parallel with `joblib` fit in the worker itself, so that the
+    workers together do not use more threads than there are
+    processors.
+
+    Args:
+        jobs: The models to train. Each combination of the number of
+            players and the length of the game may appear only once.
+        num_worker: The number of worker processes. If None, the
+            smaller of the number of jobs and the number of processors
+            is used. Defaults to None.
+        num_thread: The number of threads each job may use. If None,
+            the processors are divided evenly among the workers.
+            Defaults to None.
+        report: The report to record the timings of the stages of all
+            the jobs and the number of rows in. The timings are summed
+            over the jobs. Defaults to None.
+
+    Returns:
+        The trained models in the order of `jobs`.
+
+    Raises:
+        ValueError: If two jobs have the same combination of the number
+            of players and the length of the game, or if the training
+            data of a job is invalid.
+    """
+    games = [(job.num_player, job.game_length) for job in jobs]
+    for i, game in enumerate(games):
+        if game in games[:i]:
+            msg = (
+                "More than one job trains a model for the same game."
+                f": {game[0]}-Player, {get_game_length_name(game[1])}"
+            )
+            raise ValueError(msg)
+
+    if report is None:
+        report = RunReport()
+    if not jobs:
+        return []
+
+    num_cpu = os.cpu_count() or 1
+    if num_worker is None:
+        num_worker = min(len(jobs), num_cpu)
+    if num_thread is None:
+        num_thread = max(num_cpu // num_worker, 1)
+    logger.info(
+        "Training %s models with %s workers of %s threads.",
+        len(jobs),
+        num_worker,
+        num_thread,
+    )
+
+    order = sorted(
+        range(len(jobs)),
+        key=lambda i: jobs[i].training_data_path.stat().st_size,
+        reverse=True,
+    )
+    with (
+        _worker_environment(num_thread),
+        ProcessPoolExecutor(num_worker, _MP_CONTEXT) as executor,
+    ):
+        futures = {
+            i: executor.submit(_run_training_job, jobs[i], num_thread)
+            for i in order
+        }
+        results = [futures[i].result() for i in range(len(jobs))]
+
+    models = []
+    for model, job_report in results:
+        report.merge(job_report)
+        models.append(model)
+    return models
+
+
+@dataclass(frozen=True)
+class UpdateSummary:
+    """The summary of an update of a model.
+
+    Attributes:
+        num_row: The number of new rows the model is updated with.
+        num_replay: The number of old rows replayed in the update.
+        num_added_iter: The number of iterations, such as the trees of
+            gradient boosting, added to the classifier.
+        update_seconds: The number of seconds the update took.
+        proba_change: The mean total variation distance between the
+            probabilities of the rank classes of the new rows before
+            and after the update.
+        coefficient_change: The norm of the change of the fitted
+            arrays of the classifier relative to their norm before the
+            update.
+        max_coefficient_change: The largest absolute change of an
+            element of the fitted arrays.
+        estimated_refit_seconds: The number of seconds a full refit
+            with all the rows is estimated to take, assuming that the
+            time grows linearly with the number of rows, or None if the
+            model does not record how long its fit took.
+    """
+
+    num_row: int
+    num_replay: int
+    num_added_iter: int
+    update_seconds: float
+    proba_change: float
+    coefficient_change: float
+    max_coefficient_change: float
+    estimated_refit_seconds: float | None
+
+
+UpdateMethod = Literal["partial_fit", "grow", "warm_start"]
+
+
+def _get_fitted_arrays(classifier: Classifier) -> dict[str, np.ndarray]:
+    return {
+        name: np.array(value, dtype=np.float64)
+        for name, value in vars(classifier).items()
+        if name.endswith("_")
+        and isinstance(value, np.ndarray)
+        and value.dtype.kind == "f"
+    }
+
+
+def _get_grown_param(classifier: Any) -> str | None:  # noqa: ANN401
+    # The parameter of the number of iterations of an ensemble, to which
+    # a fit with `warm_start` adds iterations instead of refitting.
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    if isinstance(classifier, HistGradientBoostingClassifier):
+        return "max_iter"
+    if "n_estimators" in getattr(classifier, "get_params", dict)():
+        return "n_estimators"
+    return None
+
+
+def get_update_method(
+    classifier: Any,  # noqa: ANN401
+    num_extra_iter: int = 0,
+    replay: bool = False,  # noqa: FBT001, FBT002
+) -> UpdateMethod:
+    """Gets how a classifier is continued from its fitted parameters.
+
+    - `partial_fit`: The classifier has `partial_fit`, which makes one
+      more pass over the rows.
+    - `grow`: The classifier is an ensemble, such as
+      `sklearn.ensemble.HistGradientBoostingClassifier`, and `fit` with
+      `warm_start` adds `num_extra_iter` iterations fitted to the rows,
+      keeping the old ones unchanged.
+    - `warm_start`: `fit` with `warm_start`, such as that of
+      `sklearn.linear_model.LogisticRegression`, only starts from the
+      fitted parameters and converges to a fit of the rows that it is
+      given, so old rows must be replayed to keep what the classifier
+      learned from them.
+
+    Args:
+        classifier: The fitted classifier.
+        num_extra_iter: The number of iterations to add to an ensemble.
+            Defaults to 0.
+        replay: Whether old rows are replayed, which the classifier
+            must accept `sample_weight` for. Defaults to False.
+
+    Returns:
+        The method.
+
+    Raises:
+        ValueError: If the classifier cannot be continued, or cannot be
+            continued with the given arguments.
+    """
+    name = type(classifier).__name__
+    params: dict[str, Any] = getattr(classifier, "get_params", dict)()
+    method: UpdateMethod
+    if "warm_start" in params and _get_grown_param(classifier) is not None:
+        if num_extra_iter <= 0:
+            msg = (
+                f"{name} adds nothing to its fitted iterations unless"
+                f" `num_extra_iter` is positive: {num_extra_iter}"
+            )
+            raise ValueError(msg)
+        method = "grow"
+    elif num_extra_iter:
+        msg = f"`num_extra_iter` applies only to ensembles: {name}"
+        raise ValueError(msg)
+    elif hasattr(classifier, "partial_fit"):
+        method = "partial_fit"
+    elif "warm_start" in params:
+        if not replay:
+            msg = (
+                f"{name} with `warm_start` converges to a fit of the new"
+                " rows only, so old rows must be replayed."
+            )
+            raise ValueError(msg)
+        method = "warm_start"
+    else:
+        msg = f"The classifier cannot be continued: {name}"
+        raise ValueError(msg)
+
+    fit_method = getattr(
+        classifier,
+        "partial_fit" if method == "partial_fit" else "fit",
+    )
+    if replay and "sample_weight" not in signature(fit_method).parameters:
+        msg = f"Replay needs a classifier that accepts `sample_weight`: {name}"
+        raise ValueError(msg)
+    return method
+
+
+def _continue_fit(
+    classifier: Any,  # noqa: ANN401
+    method: UpdateMethod,
+    feature: np.ndarray,
+    label: np.ndarray,
+    sample_weight: np.ndarray | None,
+    num_extra_iter: int,
+) -> None:
+    kwargs = {} if sample_weight is None else {"sample_weight": sample_weight}
+    if method == "partial_fit":
+        classifier.partial_fit(feature, label, **kwargs)
+        return
+
+    warm_start = classifier.get_params()["warm_start"]
+    if method == "grow":
+        # Early stopping may have fitted fewer iterations than the
+        # parameter.
+        param = _get_grown_param(classifier) or "n_estimators"
+        classifier.set_params(
+            **{param: _get_num_iter(classifier) + num_extra_iter},
+        )
+    classifier.set_params(warm_start=True)
+    try:
+        classifier.fit(feature, label, **kwargs)
+    finally:
+        classifier.set_params(warm_start=warm_start)
+
+
+def _get_num_iter(classifier: Any) -> int:  # noqa: ANN401
+    return int(
+        getattr(
+            classifier,
+            "n_iter_",
+            len(getattr(classifier, "estimators_", ())),
+        ),
+    )
+
+
+def update(
+    model: Model,
+    feature: np.ndarray,
+    label: np.ndarray,
+    report: RunReport | None = None,
+    replay_feature: np.ndarray | None = None,
+    replay_label: np.ndarray | None = None,
+    num_replay: int | None = None,
+    num_extra_iter: int = 0,
+    seed: int = 0,
+) -> tuple[Model, UpdateSummary]:
+    """Continues fitting a model with new rows.
+
+    The classifier is copied, and the copy is continued from its fitted
+    parameters as described in `get_update_method`, which is checked
+    before anything is fitted. Rows sampled from the old training data
+    can be replayed with the new rows. They are weighted to stand for
+    all the old rows, so the update approximates a full refit with the
+    old and the new rows, from a better start and with fewer rows.
+    Without replay, the old rows are not seen again: an ensemble keeps
+    its old iterations and adds new ones fitted to the new rows, and a
+    classifier with `partial_fit` makes one pass over them.
+
+    Args:
+        model: The model to update, which is not modified.
+        feature: The features of the new rows, extracted by `extract`
+            with the floating-point type of the model.
+        label: The labels of the new rows.
+        report: The report to record the timing of the `fit` stage in.
+            Defaults to None.
+        replay_feature: The features of the old training data to replay
+            rows of. If None, no rows are replayed. Defaults to None.
+        replay_label: The labels of the old training data. Required
+            with `replay_feature`. Defaults to None.
+        num_replay: The number of old rows to replay. If None, as many
+            as the new rows, up to all the old rows. Defaults to None.
+        num_extra_iter: The number of iterations to add to an ensemble.
+            Required to be positive for ensembles. Defaults to 0.
+        seed: The seed of the sampling of the replayed rows. Defaults
+            to 0.
+
+    Returns:
+        The updated model and the summary of the update.
+
+    Raises:
+        ValueError: If the floating-point type of `feature` does not
+            match the model, if `num_replay` is out of range, or if the
+            classifier cannot be continued with the given arguments.
+    """
+    dtype = _check_dtype(feature.dtype)
+    if dtype != model.dtype:
+        msg = (
+            "The floating-point type of the features does not match the"
+            f" model. model: {model.dtype}, features: {dtype}"
+        )
+        raise ValueError(msg)
+    if (replay_feature is None) != (replay_label is None):
+        msg = "`replay_feature` and `replay_label` must be given together."
+        raise ValueError(msg)
+
+    classifier = copy.deepcopy(model.classifier)
+    method = get_update_method(
+        classifier,
+        num_extra_iter,
+        replay=replay_label is not None,
+    )
+    if report is None:
+        report = RunReport()
+
+    sample_weight = None
+    fit_feature, fit_label = feature, label
+    num_replayed = 0
+    if replay_feature is not None and replay_label is not None:
+        if num_replay is None:
+            num_replay = min(len(label), len(replay_label))
+        if not 0 < num_replay <= len(replay_label):
+            msg = (
+                "`num_replay` must be positive and at most the number of"
+                f" old rows ({len(replay_label)}): {num_replay}"
+            )
+            raise ValueError(msg)
+        index = np.random.default_rng(seed).choice(
+            len(replay_label),
+            num_replay,
+            replace=False,
+        )
+        fit_feature = np.concatenate(
+            [feature, replay_feature[index].astype(dtype, copy=False)],
+        )
+        fit_label = np.concatenate([label, replay_label[index]])
+        sample_weight = np.concatenate(
+            [
+                np.ones(len(label)),
+                np.full(num_replay, len(replay_label) / num_replay),
+            ],
+        )
+        num_replayed = num_replay
+
+    before = _get_fitted_arrays(classifier)
+    proba_before = classifier.predict_proba(feature)
+    num_iter_before = _get_num_iter(classifier) if method == "grow" else 0
+    start = time.perf_counter()
+    with report.time("fit"):
+        _continue_fit(
+            classifier,
+            method,
+            fit_feature,
+            fit_label,
+            sample_weight,
+            num_extra_iter,
+        )
+    update_seconds = time.perf_counter() - start
+    if dtype == np.float32:
+        _cast_fitted_arrays(classifier, dtype)
+
+    proba_change = 0.5 * np.abs(
+        classifier.predict_proba(feature) - proba_before,
+    ).sum(axis=1)
+    after = _get_fitted_arrays(classifier)
+    names = [
+        name
+        for name, value in before.items()
+        if name in after and after[name].shape == value.shape
+    ]
+    change = np.concatenate(
+        [np.empty(0), *((after[n] - before[n]).ravel() for n in names)],
+    )
+    norm = np.linalg.norm(
+        np.concatenate([np.empty(0), *(before[n].ravel() for n in names)]),
+    )
+    coefficient_change = (
+        float(np.linalg.norm(change) / norm) if norm else float("nan")
+    )
+
+    num_row = model.num_row + len(label)
+    estimated_refit_seconds = (
+        model.fit_seconds / model.num_row * num_row
+        if model.num_row and model.fit_seconds
+        else None
+    )
+    updated = Model(
+        model.num_player,
+        model.game_length,
+        classifier,
+        dtype,
+        num_row=num_row if model.num_row else 0,
+        fit_seconds=estimated_refit_seconds or 0.0,
+    )
+    summary = UpdateSummary(
+        num_row=len(label),
+        num_replay=num_replayed,
+        num_added_iter=(
+            _get_num_iter(classifier) - num_iter_before
+            if num_iter_before
+            else 0
+        ),
+        update_seconds=update_seconds,
+        proba_change=float(np.mean(proba_change)) if len(label) else 0.0,
+        coefficient_change=coefficient_change,
+        max_coefficient_change=float(np.abs(change).max(initial=0.0)),
+        estimated_refit_seconds=estimated_refit_seconds,
+    )
+    return updated, summary
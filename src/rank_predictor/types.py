@@ -81,6 +81,8 @@ class DataName(StrEnum):
         NUM_RIICHI_DEPOSIT: "num_riichi_deposit"
         SCORE: "score"
         RANK_CLASS: "rank_class"
+        FINAL_SCORE: "final_score"
+        FINAL_RANK: "final_rank"
     """
 
     ROUND = "round"
@@ -88,3 +90,5 @@ class DataName(StrEnum):
     NUM_RIICHI_DEPOSIT = "num_riichi_deposit"
     SCORE = "score"
     RANK_CLASS = "rank_class"
+    FINAL_SCORE = "final_score"
+    FINAL_RANK = "final_rank"
@@ -1,8 +1,11 @@
 """Provides functionality to validate data."""
 
 from collections.abc import Sequence
+from enum import IntFlag
 from typing import Final, assert_never
 
+import numpy as np
+import numpy.typing as npt
 import polars as pl
 
 from rank_predictor.rank import RANK_CLASS_3, RANK_CLASS_4
@@ -18,6 +21,43 @@ TOTAL_SCORE_4: Final[int] = 1_000
 TOTAL_SCORE_3: Final[int] = 1_050
 
 
+class InvalidReason(IntFlag):
+    """Flags for the reasons why a state is invalid.
+
+    Attributes:
+        ROUND: 1. The round does not exist in the game.
+        NUM_COUNTER_STICK: 2. The number of counter sticks is negative.
+        NUM_RIICHI_DEPOSIT: 4. The number of riichi deposits is
+            negative.
+        SCORE_UNIT: 8. The last two digits of a score are not 0.
+        SCORE_RANGE: 16. A score is less than 0 or greater than the
+            total score.
+        TOTAL_SCORE: 32. The total score does not match the total score
+            required by the rules.
+    """
+
+    ROUND = 1
+    NUM_COUNTER_STICK = 2
+    NUM_RIICHI_DEPOSIT = 4
+    SCORE_UNIT = 8
+    SCORE_RANGE = 16
+    TOTAL_SCORE = 32
+
+
+_INVALID_REASON_MESSAGES: Final[dict[InvalidReason, str]] = {
+    InvalidReason.ROUND: "The round does not exist in the game.",
+    InvalidReason.NUM_COUNTER_STICK: (
+        "`num_counter_stick` must be greater than or equal to 0."
+    ),
+    InvalidReason.NUM_RIICHI_DEPOSIT: (
+        "The number of riichi deposit must be greater than or equal to 0."
+    ),
+    InvalidReason.SCORE_UNIT: "The last two digits of score must be 0.",
+    InvalidReason.SCORE_RANGE: "A score is incorrect.",
+    InvalidReason.TOTAL_SCORE: "The total score is incorrect.",
+}
+
+
 def validate_annotated_data(
     num_player: NumPlayer,
     game_length: GameLength,
@@ -327,6 +367,23 @@ def validate_input_scores(
     validate_scores(num_riichi_deposit, scores, num_player)
 
 
+def validate_num_counter_stick(num_counter_stick: int) -> None:
+    """Validates the number of counter sticks.
+
+    Args:
+        num_counter_stick: The number of counter sticks.
+
+    Raises:
+        ValueError: If the number of counter sticks is negative.
+    """
+    if num_counter_stick < 0:
+        msg = (
+            "`num_counter_stick` must be greater than or equal to 0.:"
+            f" {num_counter_stick}"
+        )
+        raise ValueError(msg)
+
+
 def validate_round(round_: Round, game_length: GameLength) -> None:
     """Validates round.
 
@@ -352,3 +409,143 @@ def validate_round(round_: Round, game_length: GameLength) -> None:
             f" {round_name}-1 do not exist."
         )
         raise ValueError(msg)
+
+
+def describe_invalid_reason(reason: int) -> str:
+    """Describes the reasons why a state is invalid.
+
+    Args:
+        reason: The flags of `InvalidReason`.
+
+    Returns:
+        The messages of the flags separated by spaces.
+    """
+    return " ".join(
+        message
+        for flag, message in _INVALID_REASON_MESSAGES.items()
+        if reason & flag
+    )
+
+
+def check_states(
+    rounds: npt.ArrayLike,
+    num_counter_sticks: npt.ArrayLike,
+    num_riichi_deposits: npt.ArrayLike,
+    scores: npt.ArrayLike,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Checks many states at once.
+
+    The array version of `validate_round`, `validate_num_counter_stick`
+    and `validate_scores`, which reports the invalid states instead of
+    raising. Omit the last two digits of the scores.
+
+    Args:
+        rounds: The rounds of the states.
+        num_counter_sticks: The numbers of counter sticks.
+        num_riichi_deposits: The numbers of riichi deposits.
+        scores: The players' scores, of shape (number of states, number
+            of players).
+        num_player: The number of players.
+        game_length: The length of the game.
+
+    Returns:
+        Whether each state is valid, and the `InvalidReason` flags of
+            each state as an array of `numpy.uint8`.
+
+    Raises:
+        ValueError: If the number of the columns of `scores` does not
+            match `num_player`, or if the other arrays do not have a row
+            per state.
+    """
+    score_matrix = np.asarray(scores, dtype=np.int64)
+    if score_matrix.ndim != 2 or score_matrix.shape[1] != num_player:  # noqa: PLR2004
+        msg = (
+            "The number of the scores does not match the `num_player`"
+            f": {score_matrix.shape}"
+        )
+        raise ValueError(msg)
+
+    num_state = len(score_matrix)
+    try:
+        round_column, num_counter_stick_column, num_riichi_deposit_column = (
+            np.broadcast_to(np.asarray(a, dtype=np.int64), (num_state,))
+            for a in (rounds, num_counter_sticks, num_riichi_deposits)
+        )
+    except ValueError as e:
+        msg = f"The arrays must have a row per state.: {e}"
+        raise ValueError(msg) from e
+
+    total_score = (
+        TOTAL_SCORE_4 if num_player == NumPlayer.FOUR else TOTAL_SCORE_3
+    )
+    invalid_round = (
+        Round.WEST_1 if game_length == GameLength.TONPU else (Round.WEST_4 + 1)
+    )
+    reasons = np.zeros(num_state, dtype=np.uint8)
+    for flag, invalid in (
+        (
+            InvalidReason.ROUND,
+            (round_column < Round.EAST_1) | (round_column >= invalid_round),
+        ),
+        (InvalidReason.NUM_COUNTER_STICK, num_counter_stick_column < 0),
+        (InvalidReason.NUM_RIICHI_DEPOSIT, num_riichi_deposit_column < 0),
+        (
+            InvalidReason.SCORE_RANGE,
+            ((score_matrix < 0) | (score_matrix > total_score)).any(axis=1),
+        ),
+        (
+            InvalidReason.TOTAL_SCORE,
+            num_riichi_deposit_column * 10 + score_matrix.sum(axis=1)
+            != total_score,
+        ),
+    ):
+        reasons[invalid] |= np.uint8(flag)
+    return reasons == 0, reasons
+
+
+def check_input_states(
+    rounds: npt.ArrayLike,
+    num_counter_sticks: npt.ArrayLike,
+    num_riichi_deposits: npt.ArrayLike,
+    input_scores: npt.ArrayLike,
+    num_player: NumPlayer,
+    game_length: GameLength,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Checks many states with input scores at once.
+
+    The array version of `validate_input_scores` for the scores, which
+    also checks the other values as `check_states` does.
+
+    Args:
+        rounds: The rounds of the states.
+        num_counter_sticks: The numbers of counter sticks.
+        num_riichi_deposits: The numbers of riichi deposits.
+        input_scores: The input players' scores, of shape (number of
+            states, number of players).
+        num_player: The number of players.
+        game_length: The length of the game.
+
+    Returns:
+        Whether each state is valid, and the `InvalidReason` flags of
+            each state as an array of `numpy.uint8`.
+
+    Raises:
+        ValueError: If the number of the columns of `input_scores` does
+            not match `num_player`, or if the other arrays do not have a
+            row per state.
+    """
+    scores, mods = np.divmod(np.asarray(input_scores, dtype=np.int64), 100)
+    valid, reasons = check_states(
+        rounds,
+        num_counter_sticks,
+        num_riichi_deposits,
+        scores,
+        num_player,
+        game_length,
+    )
+    invalid_unit = (mods != 0).any(axis=1)
+    reasons[invalid_unit] |= np.uint8(InvalidReason.SCORE_UNIT)
+    valid &= ~invalid_unit
+    return valid, reasons
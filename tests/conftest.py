@@ -0,0 +1,79 @@
+"""Provides the fixtures shared by the tests."""
+
+import warnings
+from pathlib import Path
+
+import polars as pl
+import pytest
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+
+from rank_predictor.generate import (
+    generate_annotated_data,
+    generate_game_records,
+)
+from rank_predictor.model import Model
+from rank_predictor.train import train
+from rank_predictor.types import GameLength, NumPlayer
+
+NUM_GAME = 20
+NUM_ANNOTATED_GAME = 2000
+
+
+@pytest.fixture(scope="session")
+def game_record_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Generates hanchan game records of four players once per session.
+
+    Returns:
+        The directory of the game records, which the tests must not
+            modify.
+    """
+    path = tmp_path_factory.mktemp("game_records")
+    generate_game_records(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        path,
+        "xml",
+        NUM_GAME,
+        num_worker=1,
+    )
+    return path
+
+
+@pytest.fixture(scope="session")
+def annotated_data(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Generates annotated data of hanchan games of four players.
+
+    Returns:
+        The path to the annotated data in CSV format, which the tests
+            must not modify.
+    """
+    path = tmp_path_factory.mktemp("annotated_data") / "annotated_data.csv"
+    generate_annotated_data(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        path,
+        NUM_ANNOTATED_GAME,
+        num_worker=1,
+        output_final_score=False,
+        output_filename=False,
+    )
+    return path
+
+
+@pytest.fixture(scope="session")
+def model(annotated_data: Path) -> Model:
+    """Trains a model of hanchan games of four players once per session.
+
+    Returns:
+        The model, which the tests must not modify.
+    """
+    # The features are not scaled, so lbfgs hits its iteration limit.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        return train(
+            NumPlayer.FOUR,
+            GameLength.HANCHAN,
+            pl.read_csv(annotated_data),
+            LogisticRegression(),
+        )
@@ -0,0 +1,107 @@
+"""Tests the single-file bundle of models."""
+
+import os
+import stat
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+from rank_predictor.bundle import (
+    ModelBundle,
+    is_model_bundle,
+    save_model_bundle,
+)
+from rank_predictor.model import Model
+from rank_predictor.types import GameLength, NumPlayer
+
+
+def _create_model(num_player: NumPlayer, game_length: GameLength) -> Model:
+    feature = np.zeros((4, 3 + num_player))
+    label = np.array([0, 1, 1, int(num_player)])
+    classifier = DummyClassifier(strategy="prior").fit(feature, label)
+    return Model(num_player, game_length, classifier, num_row=len(label))
+
+
+@pytest.fixture
+def umask() -> Iterator[int]:
+    """Sets the umask of the process for the test.
+
+    Yields:
+        The umask.
+    """
+    umask = 0o027
+    previous = os.umask(umask)
+    try:
+        yield umask
+    finally:
+        os.umask(previous)
+
+
+def test_bundle_loads_models_lazily(tmp_path: Path) -> None:
+    """Tests that each model is loaded once, when it is first used."""
+    models = [
+        _create_model(NumPlayer.FOUR, GameLength.HANCHAN),
+        _create_model(NumPlayer.THREE, GameLength.TONPU),
+    ]
+    path = tmp_path / "bundle.zip"
+    save_model_bundle(models, path)
+
+    bundle = ModelBundle(path)
+
+    assert is_model_bundle(path)
+    assert bundle.games == [
+        (NumPlayer.FOUR, GameLength.HANCHAN),
+        (NumPlayer.THREE, GameLength.TONPU),
+    ]
+    assert bundle.num_loaded == 0
+    model = bundle.load(NumPlayer.THREE, GameLength.TONPU)
+    assert bundle.num_loaded == 1
+    assert bundle.load(NumPlayer.THREE, GameLength.TONPU) is model
+    assert model.num_row == models[1].num_row
+    feature = np.zeros((1, 6))
+    np.testing.assert_array_equal(
+        model.classifier.predict_proba(feature),
+        models[1].classifier.predict_proba(feature),
+    )
+    assert (NumPlayer.FOUR, GameLength.TONPU) not in bundle
+    with pytest.raises(ValueError, match="no model"):
+        bundle.load(NumPlayer.FOUR, GameLength.TONPU)
+
+
+def test_save_rejects_models_for_the_same_game(tmp_path: Path) -> None:
+    """Tests that a bundle is not written with two models for a game."""
+    models = [_create_model(NumPlayer.FOUR, GameLength.HANCHAN)] * 2
+    path = tmp_path / "bundle.zip"
+
+    with pytest.raises(ValueError, match="more than one model"):
+        save_model_bundle(models, path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bundle_has_umask_permissions(tmp_path: Path, umask: int) -> None:
+    """Tests that a bundle is as accessible as a file made by `open`."""
+    path = tmp_path / "bundle.zip"
+    save_model_bundle([_create_model(NumPlayer.FOUR, GameLength.TONPU)], path)
+    reference = tmp_path / "reference"
+    reference.touch()
+
+    mode = stat.S_IMODE(path.stat().st_mode)
+    assert mode == 0o666 & ~umask
+    assert mode == stat.S_IMODE(reference.stat().st_mode)
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+
+def test_plain_zip_is_not_bundle(tmp_path: Path) -> None:
+    """Tests that a zip file without the index is not a bundle."""
+    path = tmp_path / "plain.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("4h.pickle", b"")
+
+    assert not is_model_bundle(path)
+    with pytest.raises(ValueError, match="not a bundle"):
+        ModelBundle(path)
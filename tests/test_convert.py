@@ -0,0 +1,108 @@
+"""Tests the conversion of game records into annotated data."""
+
+from pathlib import Path
+
+import pytest
+from defusedxml import ElementTree
+
+from rank_predictor.convert import (
+    _find_attributes,
+    _GameAttributes,
+    _scan_attributes,
+    convert,
+)
+from rank_predictor.generate import generate_annotated_data
+from rank_predictor.report import RunReport
+from rank_predictor.types import GameLength, NumPlayer
+
+_GAME_RECORD = (
+    b'<mjloggm ver="2.3"><GO type="169" lobby="0"/>'
+    b'<INIT seed="0,0,0,0,3,101" ten="250,250,250,250" oya="0"/>'
+    b'<AGARI ba="0,0" owari="250,0.0,250,0.0,250,0.0,250,0.0"/>'
+    b"</mjloggm>"
+)
+
+
+def _parse(data: bytes) -> _GameAttributes:
+    return _find_attributes(ElementTree.fromstring(data))
+
+
+def test_scan_attributes_matches_element_tree(game_record_dir: Path) -> None:
+    """Tests that the fast path reads what `ElementTree` reads."""
+    for file in sorted(game_record_dir.iterdir()):
+        data = file.read_bytes()
+        assert _scan_attributes(data) == _parse(data), file.name
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'<?xml version="1.0" encoding="UTF-8"?>\n' + _GAME_RECORD,
+        _GAME_RECORD.replace(b"<INIT ", b"<INIT\n  ") + b"\n",
+        _GAME_RECORD.replace(b'<AGARI ba="0,0" owari', b"<RYUUKYOKU owari"),
+        _GAME_RECORD.replace(b' owari="250,0.0,250,0.0,250,0.0,250,0.0"', b""),
+    ],
+)
+def test_scan_attributes_reads_regular_variants(data: bytes) -> None:
+    """Tests that the fast path reads well-formed variants of mjlogs."""
+    attributes = _scan_attributes(data)
+
+    assert attributes is not None
+    assert attributes == _parse(data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        _GAME_RECORD.replace(b'type="169"', b"type='169'"),
+        _GAME_RECORD.replace(b'ten="250,', b'ten="&#50;50,'),
+        _GAME_RECORD.replace(b"<GO ", b"<!-- comment --><GO "),
+        _GAME_RECORD.replace(b"mjloggm", b"mjlog"),
+        _GAME_RECORD.removesuffix(b"</mjloggm>"),
+    ],
+    ids=["single_quotes", "reference", "comment", "not_mjlog", "truncated"],
+)
+def test_scan_attributes_falls_back(data: bytes) -> None:
+    """Tests that the fast path gives up on irregular mjlogs."""
+    assert _scan_attributes(data) is None
+
+
+def test_fast_convert_matches_generated_annotated_data(
+    game_record_dir: Path,
+    tmp_path: Path,
+) -> None:
+    """Tests that the fast path converts the games as generated."""
+    num_game = len(list(game_record_dir.iterdir()))
+    expected = tmp_path / "expected.csv"
+    generate_annotated_data(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        expected,
+        num_game,
+        num_worker=1,
+        output_final_score=True,
+        output_filename=True,
+    )
+    actual = tmp_path / "actual.csv"
+    report = RunReport()
+    convert(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        game_record_dir,
+        "xml",
+        actual,
+        output_final_score=True,
+        output_filename=True,
+        report=report,
+        fast=True,
+        cross_check=1.0,
+    )
+
+    # The game records are converted in the order of the directory.
+    actual_lines = actual.read_text().splitlines()
+    expected_lines = expected.read_text().splitlines()
+    assert actual_lines[0] == expected_lines[0]
+    assert sorted(actual_lines[1:]) == sorted(expected_lines[1:])
+    counters = report.to_dict()["counters"]
+    assert counters["fast_path"] == {"hit": num_game}
+    assert counters["cross_checks"] == {"match": num_game}
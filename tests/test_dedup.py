@@ -0,0 +1,101 @@
+"""Tests the deduplication of game records by their content."""
+
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rank_predictor.convert import convert
+from rank_predictor.dedup import SeenSet, hash_file, hash_files
+from rank_predictor.report import RunReport
+from rank_predictor.types import GameLength, NumPlayer
+
+
+def _convert(
+    game_record_dir: Path,
+    annotated_data: Path,
+    seen_path: Path | None,
+) -> RunReport:
+    report = RunReport()
+    convert(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        game_record_dir,
+        "xml",
+        annotated_data,
+        output_final_score=False,
+        output_filename=False,
+        report=report,
+        seen_path=seen_path,
+    )
+    return report
+
+
+def test_hash_files_identifies_content(tmp_path: Path) -> None:
+    """Tests that files have the same digest only if they are equal."""
+    files = [tmp_path / f"{i}.xml" for i in range(3)]
+    for file, content in zip(files, ["a", "b", "a"], strict=True):
+        file.write_text(content)
+
+    digests = hash_files(files, num_thread=2)
+
+    assert digests == [hash_file(file) for file in files]
+    assert digests[0] == digests[2]
+    assert digests[0] != digests[1]
+
+
+def test_seen_set_appends_saved_digests(tmp_path: Path) -> None:
+    """Tests that the digests are kept between instances."""
+    path = tmp_path / "seen.txt"
+    seen = SeenSet(path)
+    seen.add("a")
+    seen.save()
+    seen = SeenSet(path)
+    seen.add("a")
+    seen.add("b")
+    seen.save()
+
+    assert path.read_text() == "a\nb\n"
+    seen = SeenSet(path)
+    assert len(seen) == 2
+    assert seen.find_duplicates(["c", "a", "d", "c"]) == [
+        False,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_convert_skips_copies_and_converted_game_records(
+    game_record_dir: Path,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Tests that each game is converted once over runs."""
+    expected = tmp_path / "expected.csv"
+    _convert(game_record_dir, expected, None)
+    records = shutil.copytree(game_record_dir, tmp_path / "records")
+    first = min(records.iterdir())
+    shutil.copy(first, records / f"copy.{first.name}")
+    seen_path = tmp_path / "seen.txt"
+
+    output = tmp_path / "0.csv"
+    report = _convert(records, output, seen_path)
+
+    assert sorted(output.read_text().splitlines()) == sorted(
+        expected.read_text().splitlines(),
+    )
+    counters = report.to_dict()["counters"]
+    assert counters["files_skipped"] == {"duplicate": 1}
+    num_game = len(list(game_record_dir.iterdir()))
+    assert len(SeenSet(seen_path)) == num_game
+
+    output = tmp_path / "1.csv"
+    with caplog.at_level(logging.WARNING):
+        report = _convert(records, output, seen_path)
+
+    assert len(output.read_text().splitlines()) == 1
+    counters = report.to_dict()["counters"]
+    assert counters["files_skipped"] == {"converted_before": num_game + 1}
+    assert "No rows are written" in caplog.text
@@ -0,0 +1,125 @@
+"""Tests the cache of the features extracted from annotated data."""
+
+import os
+import shutil
+import stat
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from rank_predictor.feature_cache import FeatureCache
+from rank_predictor.report import RunReport
+from rank_predictor.train import (
+    extract,
+    get_feature_columns,
+    load_training_arrays,
+)
+from rank_predictor.types import GameLength, NumPlayer
+
+
+def _key(digest: str, dtype: type[np.floating]) -> str:
+    return FeatureCache.key(
+        digest,
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        get_feature_columns(NumPlayer.FOUR),
+        np.dtype(dtype),
+    )
+
+
+def test_saved_entry_is_mapped(tmp_path: Path) -> None:
+    """Tests that an entry is loaded as read-only memory maps."""
+    cache = FeatureCache(tmp_path / "cache")
+    feature: np.ndarray = np.arange(12, dtype=np.float32).reshape(4, 3)
+    label: np.ndarray = np.arange(4, dtype=np.int8)
+    key = _key("0" * 32, np.float32)
+
+    assert cache.load(key) is None
+    cache.save(key, feature, label)
+    arrays = FeatureCache(tmp_path / "cache").load(key)
+
+    assert arrays is not None
+    for loaded, saved in zip(arrays, (feature, label), strict=True):
+        assert isinstance(loaded, np.memmap)
+        assert not loaded.flags.writeable
+        np.testing.assert_array_equal(loaded, saved)
+        assert loaded.dtype == saved.dtype
+
+
+def test_saved_entry_has_umask_permissions(tmp_path: Path) -> None:
+    """Tests that an entry is as accessible as one made by `mkdir`."""
+    cache = FeatureCache(tmp_path / "cache")
+    key = _key("0" * 32, np.float64)
+    previous = os.umask(0o022)
+    try:
+        cache.save(key, np.zeros((2, 3)), np.zeros(2, dtype=np.int8))
+    finally:
+        os.umask(previous)
+
+    entry = tmp_path / "cache" / key
+    assert stat.S_IMODE(entry.stat().st_mode) == 0o755
+    for file in entry.iterdir():
+        assert stat.S_IMODE(file.stat().st_mode) == 0o644
+
+
+def test_key_depends_on_content_and_dtype() -> None:
+    """Tests that an entry is not shared by different data or types."""
+    keys = {
+        _key("0" * 32, np.float64),
+        _key("1" * 32, np.float64),
+        _key("0" * 32, np.float32),
+    }
+
+    assert len(keys) == 3
+
+
+_Arrays = tuple[np.ndarray, np.ndarray]
+
+
+def _load(
+    data_path: Path,
+    cache_directory: Path,
+) -> tuple[_Arrays, dict[str, int]]:
+    report = RunReport()
+    arrays = load_training_arrays(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        data_path,
+        report,
+        np.float64,
+        cache_directory,
+    )
+    return arrays, report.to_dict()["counters"]["feature_cache"]
+
+
+def test_load_training_arrays_reuses_entry(
+    annotated_data: Path,
+    tmp_path: Path,
+) -> None:
+    """Tests that a second run maps the features of the first one."""
+    data_path = tmp_path / "data.csv"
+    shutil.copy(annotated_data, data_path)
+    cache_directory = tmp_path / "cache"
+    expected = extract(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        pl.read_csv(data_path),
+    )
+
+    results = []
+    for _ in range(2):
+        arrays, result = _load(data_path, cache_directory)
+        results.append(result)
+        for actual, array in zip(arrays, expected, strict=True):
+            np.testing.assert_array_equal(actual, array)
+
+    assert results == [{"miss": 1}, {"hit": 1}]
+
+    # The content, not the path, identifies the data.
+    lines = data_path.read_text().splitlines(keepends=True)
+    data_path.write_text("".join(lines[:-1]))
+    (feature, _), result = _load(data_path, cache_directory)
+
+    assert len(feature) == len(expected[0]) - 1
+    assert result == {"miss": 1}
@@ -0,0 +1,99 @@
+"""Tests the evaluation of the candidate results of a round."""
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+
+from rank_predictor.model import Model
+from rank_predictor.outcome import Outcomes, evaluate_outcomes
+from rank_predictor.predict import GameState, Predictor
+from rank_predictor.types import GameLength, NumPlayer, Round
+
+
+def test_expected_rank_of_two_results() -> None:
+    """Tests the expected ranks against hand-computed ones."""
+    # A classifier that always predicts rank class 0, where the players
+    # finish in seat order, with 0.75, and rank class 5, where they
+    # finish in reverse seat order, with 0.25.
+    classifier = DummyClassifier(strategy="prior").fit(
+        np.zeros((6, 5)),
+        np.arange(6),
+        sample_weight=[3, 0, 0, 0, 0, 1],
+    )
+    model = Model(NumPlayer.THREE, GameLength.HANCHAN, classifier)
+    predictor = Predictor(model, NumPlayer.THREE, GameLength.HANCHAN)
+    state = GameState(
+        round_=Round.SOUTH_3,
+        num_counter_stick=0,
+        num_riichi_deposit=1,
+        score=(350, 340, 350),
+    )
+    # Player 0 wins 1000 points from player 1 and the deposit, and the
+    # game goes on, or player 2 wins 10000 points from player 0 and the
+    # deposit, and the game ends.
+    outcomes = Outcomes(
+        score_delta=[[20, -10, 0], [-100, 0, 110]],
+        round_=Round.SOUTH_4,
+        num_counter_stick=0,
+        num_riichi_deposit=0,
+        game_over=[False, True],
+    )
+
+    evaluation = evaluate_outcomes(predictor, state, outcomes)
+
+    np.testing.assert_array_equal(evaluation.valid, [True, True])
+    np.testing.assert_array_equal(
+        evaluation.score,
+        [[370, 330, 350], [250, 340, 460]],
+    )
+    # 1 * 0.75 + 3 * 0.25 for player 0, and 3 * 0.75 + 1 * 0.25 for
+    # player 2.
+    np.testing.assert_allclose(evaluation.base.expected_rank, [1.5, 2.0, 2.5])
+    np.testing.assert_allclose(
+        evaluation.player_rank_proba[0],
+        [[0.75, 0.0, 0.25], [0.0, 1.0, 0.0], [0.25, 0.0, 0.75]],
+    )
+    # The final scores rank player 2 first and player 0 last.
+    np.testing.assert_allclose(
+        evaluation.player_rank_proba[1],
+        [[0.0, 0.0, 1.0], [0.0, 1.0, 0.0], [1.0, 0.0, 0.0]],
+    )
+    np.testing.assert_allclose(
+        evaluation.expected_rank,
+        [[1.5, 2.0, 2.5], [3.0, 2.0, 1.0]],
+    )
+    np.testing.assert_allclose(
+        evaluation.expected_rank_shift,
+        [[0.0, 0.0, 0.0], [1.5, 0.0, -1.5]],
+    )
+
+
+def test_invalid_result_is_nan() -> None:
+    """Tests that a result breaking the total score is not predicted."""
+    classifier = DummyClassifier(strategy="prior").fit(
+        np.zeros((6, 5)),
+        np.arange(6),
+    )
+    model = Model(NumPlayer.THREE, GameLength.HANCHAN, classifier)
+    predictor = Predictor(model, NumPlayer.THREE, GameLength.HANCHAN)
+    state = GameState(
+        round_=Round.EAST_1,
+        num_counter_stick=0,
+        num_riichi_deposit=0,
+        score=(350, 350, 350),
+    )
+
+    evaluation = evaluate_outcomes(
+        predictor,
+        state,
+        Outcomes(
+            score_delta=[[10, -10, 0], [10, 0, 0]],
+            round_=Round.EAST_2,
+            num_counter_stick=0,
+            num_riichi_deposit=0,
+        ),
+    )
+
+    np.testing.assert_array_equal(evaluation.valid, [True, False])
+    assert evaluation.reason[1] != 0
+    assert np.isnan(evaluation.expected_rank[1]).all()
+    np.testing.assert_allclose(evaluation.expected_rank[0], 2.0)
@@ -0,0 +1,154 @@
+"""Tests the classifier partitioned by round."""
+
+# ruff: noqa: N803, N806
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from rank_predictor.partition import RoundPartitionedClassifier
+from rank_predictor.types import Round
+
+
+def _make_data(
+    rounds: list[int],
+    num_row: int,
+    classes: list[int],
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Makes rows whose rank class is the bin of the second feature."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack(
+        [
+            rng.choice(rounds, num_row),
+            rng.uniform(0, len(classes), num_row),
+        ],
+    )
+    y = np.asarray(classes)[X[:, 1].astype(np.intp)]
+    return X, y
+
+
+def _fit(
+    X: np.ndarray,
+    y: np.ndarray,
+    partitions: list[list[int]],
+    min_num_row: int = 10,
+) -> RoundPartitionedClassifier:
+    classifier = RoundPartitionedClassifier(
+        LogisticRegression(),
+        partitions,
+        num_worker=1,
+        min_num_row=min_num_row,
+    )
+    return classifier.fit(X, y)
+
+
+def test_small_groups_are_merged() -> None:
+    """Tests that the groups with too few rows share a classifier."""
+    X_0, y_0 = _make_data([Round.EAST_1], 100, [0, 1, 2])
+    X_1, y_1 = _make_data([Round.EAST_2, Round.EAST_3], 4, [0, 1, 2], 1)
+
+    classifier = _fit(
+        np.concatenate([X_0, X_1]),
+        np.concatenate([y_0, y_1]),
+        [[Round.EAST_1], [Round.EAST_2], [Round.EAST_3]],
+    )
+
+    # The merged group comes first, and East 1 has its own group.
+    expected = np.zeros(len(Round), np.intp)
+    expected[Round.EAST_1] = 1
+    np.testing.assert_array_equal(classifier.partition_index_, expected)
+    assert len(classifier.estimators_) == 2
+
+
+def test_single_class_group_uses_frequencies() -> None:
+    """Tests that a group with one rank class has no classifier."""
+    X_0, y_0 = _make_data([Round.EAST_1], 60, [0, 1, 2])
+    X_1, _ = _make_data([Round.SOUTH_4], 40, [0, 1, 2], 1)
+    y_1 = np.full(len(X_1), 2)
+
+    classifier = _fit(
+        np.concatenate([X_0, X_1]),
+        np.concatenate([y_0, y_1]),
+        [[Round.EAST_1], [Round.SOUTH_4]],
+        min_num_row=1,
+    )
+
+    index = classifier.partition_index_[Round.SOUTH_4]
+    assert classifier.estimators_[index] is None
+    frequency = np.bincount(np.concatenate([y_0, y_1])) / 100
+    np.testing.assert_allclose(classifier.class_frequency_, frequency)
+    proba = classifier.predict_proba(X_1)
+    np.testing.assert_allclose(proba, np.tile(frequency, (len(X_1), 1)))
+
+
+def test_missing_class_is_expanded() -> None:
+    """Tests the probabilities of a group that lacks a rank class."""
+    X_0, y_0 = _make_data([Round.EAST_1], 60, [0, 1, 2])
+    X_1, y_1 = _make_data([Round.SOUTH_4], 60, [0, 1], 1)
+
+    classifier = _fit(
+        np.concatenate([X_0, X_1]),
+        np.concatenate([y_0, y_1]),
+        [[Round.EAST_1], [Round.SOUTH_4]],
+    )
+
+    np.testing.assert_array_equal(classifier.classes_, [0, 1, 2])
+    index = classifier.partition_index_[Round.SOUTH_4]
+    np.testing.assert_array_equal(classifier.columns_[index], [0, 1])
+    proba = classifier.predict_proba(X_1)
+    assert proba.shape == (len(X_1), 3)
+    np.testing.assert_array_equal(proba[:, 2], 0.0)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+@pytest.mark.parametrize("round_", [-1, len(Round)])
+def test_invalid_round(round_: int) -> None:
+    """Tests that a round outside of `Round` is rejected."""
+    X, y = _make_data([Round.EAST_1], 20, [0, 1])
+    classifier = _fit(X, y, [[Round.EAST_1]])
+    X_invalid = X.copy()
+    X_invalid[0, 0] = round_
+
+    with pytest.raises(ValueError, match="invalid round"):
+        classifier.predict_proba(X_invalid)
+    with pytest.raises(ValueError, match="invalid round"):
+        _fit(X_invalid, y, [[Round.EAST_1]])
+
+
+def test_batch_matches_single_rows() -> None:
+    """Tests that each row is predicted by its own classifier."""
+    X_0, y_0 = _make_data([Round.EAST_1], 60, [0, 1, 2])
+    # The opposite relation, so the groups predict differently.
+    X_1, y_1 = _make_data([Round.SOUTH_1, Round.SOUTH_4], 60, [2, 1, 0], 1)
+    X_2, y_2 = _make_data([Round.WEST_1], 5, [0, 1], 2)
+    X = np.concatenate([X_0, X_1, X_2])
+    y = np.concatenate([y_0, y_1, y_2])
+    classifier = _fit(
+        X,
+        y,
+        [[Round.EAST_1], [Round.SOUTH_1, Round.SOUTH_4], [Round.WEST_1]],
+    )
+    rng = np.random.default_rng(3)
+    batch = X[rng.permutation(len(X))[:30]]
+
+    proba = classifier.predict_proba(batch)
+
+    rounds = batch[:, 0].astype(np.intp)
+    assert len(np.unique(classifier.partition_index_[rounds])) > 1
+    expected = np.concatenate(
+        [classifier.predict_proba(batch[i : i + 1]) for i in range(30)],
+    )
+    np.testing.assert_allclose(proba, expected)
+    east = batch[:, 0] == Round.EAST_1
+    south = np.isin(batch[:, 0], [Round.SOUTH_1, Round.SOUTH_4])
+    assert east.any()
+    assert south.any()
+    estimator = classifier.estimators_[
+        classifier.partition_index_[Round.EAST_1]
+    ]
+    assert estimator is not None
+    np.testing.assert_allclose(
+        proba[east],
+        estimator.predict_proba(batch[east]),
+    )
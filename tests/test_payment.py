@@ -0,0 +1,205 @@
+"""Tests the point transfers of the results of a round."""
+
+import numpy as np
+import pytest
+
+from rank_predictor.model import Model
+from rank_predictor.outcome import evaluate_outcomes
+from rank_predictor.payment import (
+    RIICHI_COST,
+    PaymentTable,
+    expand_successors,
+    get_payment_table,
+)
+from rank_predictor.predict import GameState, Predictor
+from rank_predictor.types import GameLength, NumPlayer, Round
+
+
+def _find(
+    table: PaymentTable,
+    winner: int,
+    loser: int,
+    han: int = 1,
+    fu: int = 30,
+) -> int:
+    (index,) = np.flatnonzero(
+        (table.winner == winner)
+        & (table.loser == loser)
+        & (table.han == han)
+        & (table.fu == fu),
+    )
+    return int(index)
+
+
+def _find_draw(table: PaymentTable, tenpai: list[bool]) -> int:
+    (index,) = np.flatnonzero(
+        (table.winner == -1) & (table.tenpai == tenpai).all(axis=1),
+    )
+    return int(index)
+
+
+@pytest.mark.parametrize(
+    ("num_player", "winner", "loser", "han", "fu", "delta"),
+    [
+        # 1 han 30 fu is 240 basic points: 960 or, for the dealer, 1440.
+        (NumPlayer.FOUR, 1, 2, 1, 30, [0, 10, -10, 0]),
+        (NumPlayer.FOUR, 0, 3, 1, 30, [15, 0, 0, -15]),
+        (NumPlayer.FOUR, 2, 0, 5, 0, [-80, 0, 80, 0]),
+        (NumPlayer.FOUR, 0, 1, 13, 0, [480, -480, 0, 0]),
+        # The dealer pays double and the others pay 240, rounded up.
+        (NumPlayer.FOUR, 1, 1, 1, 30, [-5, 11, -3, -3]),
+        (NumPlayer.FOUR, 0, 0, 1, 30, [15, -5, -5, -5]),
+        (NumPlayer.FOUR, 3, 3, 5, 0, [-40, -20, -20, 80]),
+        # In 3-player, a tsumo is paid by the 2 other players only.
+        (NumPlayer.THREE, 1, 2, 1, 30, [0, 10, -10]),
+        (NumPlayer.THREE, 1, 1, 1, 30, [-5, 8, -3]),
+        (NumPlayer.THREE, 0, 0, 5, 0, [80, -40, -40]),
+    ],
+)
+def test_win_transfers_points(
+    num_player: NumPlayer,
+    winner: int,
+    loser: int,
+    han: int,
+    fu: int,
+    delta: list[int],
+) -> None:
+    """Tests the transfers of a ron and a tsumo with dealer seat 0."""
+    table = get_payment_table(num_player, 0)
+
+    index = _find(table, winner, loser, han, fu)
+
+    np.testing.assert_array_equal(table.delta[index], delta)
+    assert table.renchan[index] == (winner == 0)
+
+
+@pytest.mark.parametrize("num_player", list(NumPlayer))
+def test_transfers_conserve_score(num_player: NumPlayer) -> None:
+    """Tests that every result moves points between the players only."""
+    for dealer in range(num_player):
+        table = get_payment_table(num_player, dealer)
+
+        np.testing.assert_array_equal(table.delta.sum(axis=1), 0)
+        np.testing.assert_array_equal(
+            table.counter_stick_delta.sum(axis=1),
+            0,
+        )
+
+
+def test_counter_sticks_are_paid_by_the_losers() -> None:
+    """Tests the transfers of a counter stick for a ron and a tsumo."""
+    table = get_payment_table(NumPlayer.FOUR, 0)
+    three_player = get_payment_table(NumPlayer.THREE, 0)
+
+    np.testing.assert_array_equal(
+        table.counter_stick_delta[_find(table, 1, 2)],
+        [0, 3, -3, 0],
+    )
+    np.testing.assert_array_equal(
+        table.counter_stick_delta[_find(table, 1, 1)],
+        [-1, 3, -1, -1],
+    )
+    np.testing.assert_array_equal(
+        three_player.counter_stick_delta[_find(three_player, 1, 1)],
+        [-1, 2, -1],
+    )
+
+
+def test_draw_transfers_noten_penalty() -> None:
+    """Tests the tenpai payments of a draw."""
+    table = get_payment_table(NumPlayer.FOUR, 1)
+    three_player = get_payment_table(NumPlayer.THREE, 1)
+
+    cases = [
+        (table, [True, False, False, False], [30, -10, -10, -10], False),
+        (table, [False, True, True, False], [-15, 15, 15, -15], True),
+        (table, [True, True, True, True], [0, 0, 0, 0], True),
+        (three_player, [True, False, False], [20, -10, -10], False),
+    ]
+    for payment_table, tenpai, delta, renchan in cases:
+        index = _find_draw(payment_table, tenpai)
+        np.testing.assert_array_equal(payment_table.delta[index], delta)
+        assert payment_table.renchan[index] == renchan
+
+
+def test_successors_transfer_deposits_and_counter_sticks() -> None:
+    """Tests the deposits and counter sticks of the successors."""
+    state = GameState(
+        round_=Round.EAST_2,
+        num_counter_stick=2,
+        num_riichi_deposit=1,
+        score=(250, 240, 260, 240),
+    )
+
+    successors = expand_successors(
+        state,
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        riichi=(2,),
+    )
+
+    outcomes = successors.outcomes
+    score_delta = np.asarray(outcomes.score_delta)
+    num_riichi_deposit = np.asarray(outcomes.num_riichi_deposit)
+    # The deposits on the table are counted in the total.
+    np.testing.assert_array_equal(
+        score_delta.sum(axis=1)
+        + (num_riichi_deposit - state.num_riichi_deposit) * RIICHI_COST,
+        0,
+    )
+
+    results = successors.results
+    index = _find(results, 0, 3)
+    np.testing.assert_array_equal(
+        score_delta[index],
+        # 960 for the ron of a non-dealer, 600 for the counter sticks,
+        # and the deposit on the table and the one of player 2.
+        [10 + 6 + 2 * RIICHI_COST, 0, -RIICHI_COST, -10 - 6],
+    )
+    assert num_riichi_deposit[index] == 0
+    assert np.asarray(outcomes.round_)[index] == Round.EAST_3
+    assert np.asarray(outcomes.num_counter_stick)[index] == 0
+
+    is_draw = results.winner == -1
+    assert results.tenpai[is_draw, 2].all()
+    np.testing.assert_array_equal(num_riichi_deposit[is_draw], 2)
+    np.testing.assert_array_equal(
+        np.asarray(outcomes.num_counter_stick)[is_draw],
+        3,
+    )
+
+
+def test_riichi_needs_riichi_cost() -> None:
+    """Tests that a player with less than the riichi cost is refused."""
+    state = GameState(
+        round_=Round.EAST_1,
+        num_counter_stick=0,
+        num_riichi_deposit=0,
+        score=(350, RIICHI_COST - 1, 341, 300),
+    )
+
+    with pytest.raises(ValueError, match="enough score"):
+        expand_successors(state, NumPlayer.FOUR, GameLength.HANCHAN, (1,))
+    with pytest.raises(ValueError, match="seat"):
+        expand_successors(state, NumPlayer.FOUR, GameLength.HANCHAN, (4,))
+    expand_successors(state, NumPlayer.FOUR, GameLength.HANCHAN, (0,))
+
+
+def test_successor_probabilities_sum_to_one(model: Model) -> None:
+    """Tests that the ranks of each successor are distributions."""
+    predictor = Predictor(model, NumPlayer.FOUR, GameLength.HANCHAN)
+    state = GameState(
+        round_=Round.SOUTH_4,
+        num_counter_stick=1,
+        num_riichi_deposit=0,
+        score=(300, 280, 220, 200),
+    )
+    successors = expand_successors(state, NumPlayer.FOUR, GameLength.HANCHAN)
+
+    evaluation = evaluate_outcomes(predictor, state, successors.outcomes)
+
+    assert evaluation.valid.all()
+    assert np.asarray(successors.outcomes.game_over).any()
+    proba = evaluation.player_rank_proba
+    np.testing.assert_allclose(proba.sum(axis=2), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, rtol=1e-6)
@@ -0,0 +1,114 @@
+"""Tests the cache of the predictions."""
+
+import copy
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from rank_predictor.model import Model
+from rank_predictor.predict import (
+    GameState,
+    Prediction,
+    PredictionCache,
+    Predictor,
+)
+from rank_predictor.types import GameLength, NumPlayer, Round
+
+
+def _prediction(value: float) -> Prediction:
+    return Prediction(
+        player_rank_proba=np.full((4, 4), value),
+        expected_rank=np.full(4, value),
+    )
+
+
+def _state(score_0: int) -> GameState:
+    return GameState(
+        round_=Round.SOUTH_1,
+        num_counter_stick=0,
+        num_riichi_deposit=0,
+        score=(score_0, 250, 250, 500 - score_0),
+    )
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Tests that a lookup keeps a prediction from being evicted."""
+    cache = PredictionCache(2)
+    cache.put((0,), _prediction(0.0))
+    cache.put((1,), _prediction(1.0))
+
+    assert cache.get((0,)) is not None
+    cache.put((2,), _prediction(2.0))
+
+    assert len(cache) == 2
+    assert cache.get((1,)) is None
+    assert cache.get((0,)) is not None
+    assert cache.get((2,)) is not None
+    assert cache.evictions == 1
+
+    cache.put((3,), _prediction(3.0))
+
+    assert cache.get((0,)) is None
+    assert cache.evictions == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_cache_needs_capacity() -> None:
+    """Tests that a cache without capacity is rejected."""
+    with pytest.raises(ValueError, match="capacity"):
+        PredictionCache(0)
+
+
+def test_predictor_counts_hits_and_misses(model: Model) -> None:
+    """Tests that each distinct state is predicted once."""
+    predictor = Predictor(model, NumPlayer.FOUR, GameLength.HANCHAN, 8)
+    uncached = Predictor(model, NumPlayer.FOUR, GameLength.HANCHAN)
+    cache = predictor.cache
+    assert cache is not None
+    states = [_state(200), _state(300), _state(200)]
+
+    first = predictor.predict_many(states)
+
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 2)
+
+    second = predictor.predict_many(states)
+
+    assert (cache.hits, cache.misses) == (2, 2)
+    expected = uncached.predict_many(states)
+    for prediction in (first, second):
+        np.testing.assert_allclose(
+            prediction.player_rank_proba,
+            expected.player_rank_proba,
+        )
+        np.testing.assert_allclose(
+            prediction.expected_rank,
+            expected.expected_rank,
+        )
+
+
+def test_setting_model_invalidates_cache(model: Model) -> None:
+    """Tests that the predictions of a replaced model are not reused."""
+    predictor = Predictor(model, NumPlayer.FOUR, GameLength.HANCHAN, 8)
+    cache = predictor.cache
+    assert cache is not None
+    state = _state(200)
+    before = predictor.predict(state)
+
+    other = copy.deepcopy(model)
+    assert isinstance(other.classifier, LogisticRegression)
+    intercept = other.classifier.intercept_
+    other.classifier.intercept_ = intercept + np.arange(len(intercept))
+    predictor.model = other
+
+    assert cache.invalidations == 1
+    assert len(cache) == 0
+
+    after = predictor.predict(state)
+
+    assert (cache.hits, cache.misses) == (0, 2)
+    expected = Predictor(other, NumPlayer.FOUR, GameLength.HANCHAN).predict(
+        state,
+    )
+    np.testing.assert_allclose(after.expected_rank, expected.expected_rank)
+    assert not np.allclose(after.expected_rank, before.expected_rank)
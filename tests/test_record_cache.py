@@ -0,0 +1,119 @@
+"""Tests the cache of the records parsed from game records."""
+
+import os
+import stat
+from pathlib import Path
+
+import numpy as np
+
+from rank_predictor.convert import convert
+from rank_predictor.record_cache import (
+    ParsedRecord,
+    ParsedRecordCache,
+    SkippedRecord,
+)
+from rank_predictor.report import RunReport
+from rank_predictor.types import GameLength, NumPlayer
+
+
+def _create_record(num_player: NumPlayer, num_round: int) -> ParsedRecord:
+    rng = np.random.default_rng(num_round)
+    return ParsedRecord(
+        num_player=num_player,
+        game_length=GameLength.TONPU,
+        states=rng.integers(0, 8, (num_round, 3), dtype=np.int32),
+        scores=rng.integers(
+            -10000,
+            60000,
+            (num_round, num_player),
+            dtype=np.int32,
+        ),
+        result=rng.integers(-10000, 60000, num_player, dtype=np.int32),
+    )
+
+
+def test_saved_records_are_loaded(tmp_path: Path) -> None:
+    """Tests that the records survive saving and loading the cache."""
+    files = [tmp_path / f"{i}.xml" for i in range(3)]
+    for file in files:
+        file.write_text(file.name)
+    records: list[ParsedRecord | SkippedRecord] = [
+        _create_record(NumPlayer.FOUR, 5),
+        SkippedRecord(counter="files_skipped", reason="not_mjlog"),
+        _create_record(NumPlayer.THREE, 2),
+    ]
+
+    cache = ParsedRecordCache(tmp_path / "cache.npz")
+    for file, record in zip(files, records, strict=True):
+        cache.put(file, record)
+    cache.save()
+
+    loaded = ParsedRecordCache(tmp_path / "cache.npz")
+    assert len(loaded) == len(files)
+    for file, record in zip(files, records, strict=True):
+        cached = loaded.get(file)
+        if isinstance(record, SkippedRecord):
+            assert cached == record
+            continue
+        assert isinstance(cached, ParsedRecord)
+        assert cached.num_player == record.num_player
+        assert cached.game_length == record.game_length
+        np.testing.assert_array_equal(cached.states, record.states)
+        np.testing.assert_array_equal(cached.scores, record.scores)
+        np.testing.assert_array_equal(cached.result, record.result)
+
+
+def test_changed_game_record_is_not_served(tmp_path: Path) -> None:
+    """Tests that a game record changed after caching is not served."""
+    file = tmp_path / "0.xml"
+    file.write_text("old")
+    cache = ParsedRecordCache(tmp_path / "cache.npz")
+    cache.put(file, _create_record(NumPlayer.FOUR, 3))
+    cache.save()
+
+    file.write_text("new content")
+
+    assert ParsedRecordCache(tmp_path / "cache.npz").get(file) is None
+
+
+def test_convert_with_cache_matches_without(
+    game_record_dir: Path,
+    tmp_path: Path,
+) -> None:
+    """Tests that a cached conversion writes the same annotated data."""
+    cache_path = tmp_path / "cache.npz"
+    outputs = [tmp_path / f"{i}.csv" for i in range(3)]
+    reports = [RunReport() for _ in outputs]
+    for i, (output, report) in enumerate(zip(outputs, reports, strict=True)):
+        convert(
+            NumPlayer.FOUR,
+            GameLength.HANCHAN,
+            game_record_dir,
+            "xml",
+            output,
+            output_final_score=True,
+            output_filename=True,
+            report=report,
+            cache_path=None if i == 0 else cache_path,
+        )
+
+    assert outputs[1].read_bytes() == outputs[0].read_bytes()
+    assert outputs[2].read_bytes() == outputs[0].read_bytes()
+    assert "files_cached" not in reports[1].to_dict()["counters"]
+    num_file = len(list(game_record_dir.iterdir()))
+    assert reports[2].to_dict()["counters"]["files_cached"] == num_file
+
+
+def test_saved_cache_has_umask_permissions(tmp_path: Path) -> None:
+    """Tests that the cache is as accessible as a file from `open`."""
+    file = tmp_path / "0.xml"
+    file.write_text("content")
+    cache = ParsedRecordCache(tmp_path / "cache.npz")
+    cache.put(file, SkippedRecord(counter="files", reason="test"))
+    previous = os.umask(0o022)
+    try:
+        cache.save()
+    finally:
+        os.umask(previous)
+
+    assert stat.S_IMODE((tmp_path / "cache.npz").stat().st_mode) == 0o644
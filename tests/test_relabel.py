@@ -0,0 +1,80 @@
+"""Tests the relabeling of annotated data."""
+
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from rank_predictor.convert import convert
+from rank_predictor.relabel import relabel
+from rank_predictor.types import DataName, GameLength, NumPlayer
+
+
+@pytest.fixture(scope="module")
+def converted(
+    game_record_dir: Path,
+    tmp_path_factory: pytest.TempPathFactory,
+) -> Path:
+    """Converts the game records with the final scores.
+
+    Returns:
+        The path to the annotated data.
+    """
+    path = tmp_path_factory.mktemp("converted") / "annotated_data.csv"
+    convert(
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+        game_record_dir,
+        "xml",
+        path,
+        output_final_score=True,
+        output_filename=True,
+    )
+    return path
+
+
+def test_relabel_matches_convert(converted: Path, tmp_path: Path) -> None:
+    """Tests that the labels from the final scores match `convert`."""
+    expected = pl.read_csv(converted)
+    # Relabeling must not depend on the labels it replaces.
+    unlabeled = tmp_path / "unlabeled.csv"
+    expected.with_columns(pl.lit(0).alias(DataName.RANK_CLASS)).write_csv(
+        unlabeled,
+    )
+    relabeled = tmp_path / "relabeled.csv"
+
+    relabel(NumPlayer.FOUR, unlabeled, relabeled, output_final_rank=False)
+
+    actual = pl.read_csv(relabeled)
+    assert actual.columns == expected.columns
+    assert expected[DataName.RANK_CLASS].n_unique() > 1
+    assert actual.equals(expected)
+
+
+def test_relabel_outputs_final_ranks(converted: Path, tmp_path: Path) -> None:
+    """Tests that the final ranks order the players by final score."""
+    relabeled = tmp_path / "relabeled.csv"
+
+    relabel(NumPlayer.FOUR, converted, relabeled, output_final_rank=True)
+
+    data = pl.read_csv(relabeled)
+    for row in data.iter_rows(named=True):
+        scores = [row[f"{DataName.FINAL_SCORE}_{i}"] for i in range(4)]
+        ranks = [row[f"{DataName.FINAL_RANK}_{i}"] for i in range(4)]
+        # Ties are broken by seat order.
+        order = sorted(range(4), key=lambda i: (-scores[i], i))
+        assert [order.index(i) for i in range(4)] == ranks
+
+
+def test_relabel_needs_final_scores(
+    annotated_data: Path,
+    tmp_path: Path,
+) -> None:
+    """Tests that data without the final scores is rejected."""
+    with pytest.raises(ValueError, match="missing columns"):
+        relabel(
+            NumPlayer.FOUR,
+            annotated_data,
+            tmp_path / "relabeled.csv",
+            output_final_rank=False,
+        )
@@ -0,0 +1,161 @@
+"""Tests the update of a model with new data."""
+
+import math
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from rank_predictor.backend import create_classifier
+from rank_predictor.model import Classifier, Model
+from rank_predictor.train import extract, get_update_method, train, update
+from rank_predictor.types import GameLength, NumPlayer
+
+
+@pytest.fixture(scope="module")
+def split_data(
+    annotated_data: Path,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Splits the annotated data into old and new rows.
+
+    Returns:
+        The old two thirds and the new third of the rows.
+    """
+    data = pl.read_csv(annotated_data)
+    num_old = len(data) * 2 // 3
+    return data[:num_old], data[num_old:]
+
+
+def _train(data: pl.DataFrame, classifier: Classifier) -> Model:
+    return train(NumPlayer.FOUR, GameLength.HANCHAN, data, classifier)
+
+
+def _extract(data: pl.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    return extract(NumPlayer.FOUR, GameLength.HANCHAN, data)
+
+
+@pytest.mark.parametrize(
+    ("classifier", "num_extra_iter", "replay"),
+    [
+        (LogisticRegression(), 0, False),
+        (LogisticRegression(), 5, True),
+        (HistGradientBoostingClassifier(), 0, False),
+        (create_classifier("mlp", {}, None), 0, True),
+    ],
+    ids=["lr_without_replay", "lr_extra_iter", "hgb_no_iter", "mlp"],
+)
+def test_get_update_method_rejects_unsupported_update(
+    classifier: Classifier,
+    num_extra_iter: int,
+    replay: bool,  # noqa: FBT001
+) -> None:
+    """Tests that an update that cannot continue the fit is rejected."""
+    with pytest.raises(
+        ValueError,
+        match=r"cannot|ensembles|iterations|replay",
+    ):
+        get_update_method(classifier, num_extra_iter, replay=replay)
+
+
+def test_get_update_method_continues_supported_classifiers() -> None:
+    """Tests the method of each kind of classifier."""
+    assert get_update_method(SGDClassifier()) == "partial_fit"
+    assert get_update_method(HistGradientBoostingClassifier(), 5) == "grow"
+    assert get_update_method(LogisticRegression(), replay=True) == (
+        "warm_start"
+    )
+
+
+def test_update_adds_iterations_to_ensemble(
+    split_data: tuple[pl.DataFrame, pl.DataFrame],
+) -> None:
+    """Tests that an ensemble keeps its iterations and adds new ones."""
+    old, new = split_data
+    model = _train(
+        old,
+        HistGradientBoostingClassifier(
+            max_iter=10,
+            early_stopping=False,
+            random_state=0,
+        ),
+    )
+    feature, label = _extract(new)
+
+    updated, summary = update(model, feature, label, num_extra_iter=5)
+
+    for fitted, num_iter in ((model, 10), (updated, 15)):
+        assert isinstance(fitted.classifier, HistGradientBoostingClassifier)
+        assert fitted.classifier.n_iter_ == num_iter
+    assert summary.num_added_iter == 5
+    assert summary.num_row == len(label)
+    assert summary.proba_change > 0.0
+    assert updated.num_row == len(old) + len(new)
+    # The old trees are kept, and the new ones have nothing to compare.
+    assert math.isnan(summary.coefficient_change)
+
+
+def _get_distance(a: Model, b: Model, feature: np.ndarray) -> float:
+    # The mean total variation distance between the probabilities.
+    proba_a = a.classifier.predict_proba(feature)
+    proba_b = b.classifier.predict_proba(feature)
+    return float(0.5 * np.abs(proba_a - proba_b).sum(axis=1).mean())
+
+
+def _get_coefficients(model: Model) -> np.ndarray:
+    classifier = model.classifier
+    assert isinstance(classifier, LogisticRegression)
+    return np.concatenate([classifier.coef_.ravel(), classifier.intercept_])
+
+
+# The features are not scaled, so lbfgs stops at its iteration limit.
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_update_with_full_replay_approaches_refit(
+    split_data: tuple[pl.DataFrame, pl.DataFrame],
+) -> None:
+    """Tests that replaying all the old rows approaches a refit."""
+    old, new = split_data
+    model = _train(old, LogisticRegression())
+    refit = _train(pl.concat([old, new]), LogisticRegression())
+    feature, label = _extract(new)
+    replay_feature, replay_label = _extract(old)
+
+    updated, summary = update(
+        model,
+        feature,
+        label,
+        replay_feature=replay_feature,
+        replay_label=replay_label,
+        num_replay=len(replay_label),
+    )
+
+    assert summary.num_replay == len(old)
+    before = _get_coefficients(model)
+    after = _get_coefficients(updated)
+    assert summary.coefficient_change == pytest.approx(
+        np.linalg.norm(after - before) / np.linalg.norm(before),
+    )
+    assert summary.max_coefficient_change == pytest.approx(
+        np.abs(after - before).max(),
+    )
+    assert summary.coefficient_change > 0.0
+    assert summary.estimated_refit_seconds == pytest.approx(
+        model.fit_seconds / model.num_row * updated.num_row,
+    )
+    assert _get_distance(updated, refit, feature) < (
+        _get_distance(model, refit, feature) / 4
+    )
+
+
+def test_update_rejects_other_dtype(
+    split_data: tuple[pl.DataFrame, pl.DataFrame],
+) -> None:
+    """Tests that features of another floating-point type fail."""
+    old, new = split_data
+    model = _train(old, SGDClassifier(loss="log_loss", random_state=0))
+    feature, label = _extract(new)
+
+    with pytest.raises(ValueError, match="floating-point type"):
+        update(model, feature.astype(np.float32), label)
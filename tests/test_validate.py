@@ -0,0 +1,212 @@
+"""Tests the validation of the states."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from rank_predictor.types import GameLength, NumPlayer, Round
+from rank_predictor.validate import (
+    InvalidReason,
+    check_input_states,
+    check_states,
+    describe_invalid_reason,
+    validate_input_scores,
+    validate_num_counter_stick,
+    validate_round,
+)
+
+
+def _check_one(
+    round_: int,
+    num_counter_stick: int,
+    num_riichi_deposit: int,
+    input_scores: list[int],
+    num_player: NumPlayer = NumPlayer.FOUR,
+    game_length: GameLength = GameLength.HANCHAN,
+) -> int:
+    valid, reasons = check_input_states(
+        [round_],
+        [num_counter_stick],
+        [num_riichi_deposit],
+        [input_scores],
+        num_player,
+        game_length,
+    )
+    assert valid[0] == (reasons[0] == 0)
+    return int(reasons[0])
+
+
+@pytest.mark.parametrize(
+    ("state", "reason"),
+    [
+        ((Round.WEST_4, 0, 0, [25000] * 4), 0),
+        ((Round.WEST_4 + 1, 0, 0, [25000] * 4), InvalidReason.ROUND),
+        ((-1, 0, 0, [25000] * 4), InvalidReason.ROUND),
+        ((0, -1, 0, [25000] * 4), InvalidReason.NUM_COUNTER_STICK),
+        (
+            (0, 0, -1, [25000, 25000, 25000, 26000]),
+            InvalidReason.NUM_RIICHI_DEPOSIT,
+        ),
+        ((0, 0, 0, [25050, 25000, 25000, 25000]), InvalidReason.SCORE_UNIT),
+        (
+            (0, 0, 0, [-1000, 51000, 25000, 25000]),
+            InvalidReason.SCORE_RANGE,
+        ),
+        ((0, 0, 0, [25000, 25000, 25000, 24000]), InvalidReason.TOTAL_SCORE),
+        ((0, 0, 1, [25000, 25000, 25000, 24000]), 0),
+    ],
+)
+def test_each_flag(
+    state: tuple[int, int, int, list[int]],
+    reason: int,
+) -> None:
+    """Tests that each invalid value sets its own flag only."""
+    assert _check_one(*state) == reason
+
+
+def test_tonpu_rounds() -> None:
+    """Tests that the rounds after South 4 are invalid in Tonpu."""
+    scores = [25000] * 4
+
+    assert (
+        _check_one(Round.SOUTH_4, 0, 0, scores, game_length=GameLength.TONPU)
+        == 0
+    )
+    assert _check_one(
+        Round.WEST_1,
+        0,
+        0,
+        scores,
+        game_length=GameLength.TONPU,
+    ) == (InvalidReason.ROUND)
+
+
+def test_three_player_total() -> None:
+    """Tests the total score of 3-player."""
+    assert _check_one(0, 0, 0, [35000] * 3, NumPlayer.THREE) == 0
+    assert _check_one(0, 0, 0, [25000] * 3, NumPlayer.THREE) == (
+        InvalidReason.TOTAL_SCORE
+    )
+
+
+def test_multiple_flags() -> None:
+    """Tests that a state with many invalid values sets every flag."""
+    reason = _check_one(Round.WEST_4 + 1, -1, -1, [25050, -100, 25000, 0])
+
+    assert reason == (
+        InvalidReason.ROUND
+        | InvalidReason.NUM_COUNTER_STICK
+        | InvalidReason.NUM_RIICHI_DEPOSIT
+        | InvalidReason.SCORE_UNIT
+        | InvalidReason.SCORE_RANGE
+        | InvalidReason.TOTAL_SCORE
+    )
+    assert describe_invalid_reason(reason).count(".") == len(InvalidReason)
+
+
+def test_scalars_broadcast() -> None:
+    """Tests that a scalar value applies to every state."""
+    valid, reasons = check_states(
+        0,
+        [0, -1],
+        0,
+        [[250] * 4, [250] * 4],
+        NumPlayer.FOUR,
+        GameLength.HANCHAN,
+    )
+
+    np.testing.assert_array_equal(valid, [True, False])
+    np.testing.assert_array_equal(
+        reasons,
+        [0, InvalidReason.NUM_COUNTER_STICK],
+    )
+
+
+def test_shape_mismatch() -> None:
+    """Tests that arrays of the wrong shape are rejected."""
+    with pytest.raises(ValueError, match="num_player"):
+        check_states(
+            [0],
+            [0],
+            [0],
+            [[250] * 3],
+            NumPlayer.FOUR,
+            GameLength.HANCHAN,
+        )
+    with pytest.raises(ValueError, match="num_player"):
+        check_states(
+            [0],
+            [0],
+            [0],
+            [250] * 4,
+            NumPlayer.FOUR,
+            GameLength.HANCHAN,
+        )
+    with pytest.raises(ValueError, match="a row per state"):
+        check_input_states(
+            [0, 0, 0],
+            [0],
+            [0],
+            [[25000] * 4, [25000] * 4],
+            NumPlayer.FOUR,
+            GameLength.HANCHAN,
+        )
+
+
+def _validate_one(
+    round_: Round,
+    num_counter_stick: int,
+    num_riichi_deposit: int,
+    input_scores: list[int],
+    game_length: GameLength,
+) -> bool:
+    try:
+        validate_round(round_, game_length)
+        validate_num_counter_stick(num_counter_stick)
+        validate_input_scores(
+            num_riichi_deposit,
+            input_scores,
+            NumPlayer.FOUR,
+        )
+    except ValueError:
+        return False
+    return True
+
+
+def test_agrees_with_scalar_validation() -> None:
+    """Tests that the flags agree with the scalar validation."""
+    score_choices = [
+        [25000] * 4,
+        [26000, 25000, 25000, 24000],
+        [25000, 25000, 25000, 24000],
+        [25000, 25000, 26000, 24050],
+        [52000, -2000, 25000, 25000],
+    ]
+    states = list(
+        itertools.product(
+            [Round.EAST_1, Round.SOUTH_4, Round.WEST_1, Round.WEST_4],
+            [0, -1],
+            [0, 1, -1],
+            score_choices,
+        ),
+    )
+    rounds, num_counter_sticks, num_riichi_deposits, input_scores = zip(
+        *states,
+        strict=True,
+    )
+
+    for game_length in GameLength:
+        valid, _ = check_input_states(
+            rounds,
+            num_counter_sticks,
+            num_riichi_deposits,
+            input_scores,
+            NumPlayer.FOUR,
+            game_length,
+        )
+
+        expected = [_validate_one(*s, game_length) for s in states]
+        np.testing.assert_array_equal(valid, expected)
+        assert valid.any()
+        assert not valid.all()